@@ -0,0 +1,200 @@
+"""
+A local stand-in for the Groq chat completions API, answering the prompts of `LLMInference` with
+well-formed JSON after a configurable latency, and failing a configurable share of the requests.
+
+It understands the documents of `benchmarks/synthetic.py`: translation requests get the English text of
+the document, and sectioning requests are split with the keywords of the sections. Questions are
+answered with "N/A". Point the pipeline at it with `base_url` in the `[GROQ]` section:
+
+    python benchmarks/fake_groq.py --port 8766 --latency-ms 300 --error-rate 0.05
+"""
+import argparse
+import ast
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.utils.section_utils import split_sections
+from synthetic import translate_to_english
+
+SECTIONS_PATTERN = re.compile(r"The sections are: (\[.*?\])")
+QUESTION_ID_PATTERN = re.compile(r"^\s*(q\d+):", re.MULTILINE)
+
+
+def _page_text(text):
+    # `isolate_sections` is given the translation result, a dictionary holding the text.
+    try:
+        value = ast.literal_eval(text)
+        if isinstance(value, dict):
+            return value.get("text", "")
+    except (ValueError, SyntaxError):
+        pass
+    return text
+
+
+def answer(messages):
+    """
+    Builds the answer of a chat request from the prompts of `LLMInference`.
+
+    Args:
+        messages (list): The chat messages of the request.
+
+    Returns:
+        tuple: The name of the `LLMInference` method the prompt belongs to, and the JSON answer.
+    """
+
+    system, user = messages[0]["content"], messages[-1]["content"]
+    match = SECTIONS_PATTERN.search(system)
+    sections = {section: {} for section in ast.literal_eval(match.group(1))} if match else {}
+
+    if "The text to be translated and sectioned:" in user:
+        lang, text = translate_to_english(user.split("The text to be translated and sectioned:", 1)[1].strip())
+        return "translate_and_isolate_sections", {"lang": lang, "sections": split_sections(text, sections)[0]}
+    if "The text to be translated:" in user:
+        lang, text = translate_to_english(user.split("The text to be translated:", 1)[1].strip())
+        return "determine_language_and_translate", {"lang": lang, "text": text}
+    if "The text to be sectioned:" in user:
+        text = _page_text(user.split("The text to be sectioned:", 1)[1].strip())
+        return "isolate_sections", split_sections(text, sections)[0]
+    if "The questions:" in user:
+        ids = QUESTION_ID_PATTERN.findall(user.split("The text:", 1)[0])
+        return "answer_questions", {qid: {"text": "N/A", "score": 0.0} for qid in ids}
+    if "multiple answers" in system:
+        return "find_multiple_answers", {"answer": []}
+    return "answer_question", {"text": "N/A", "score": 0.0}
+
+
+class FakeGroqHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, self.server.stats())
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path: {self.path}"}})
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path: {self.path}"}})
+            return
+
+        server = self.server
+        time.sleep(max(random.gauss(server.latency, server.jitter), 0.0))
+        method, content = answer(payload["messages"])
+
+        if random.random() < server.error_rate:
+            status = random.choice(server.error_statuses)
+            server.count("errors", method)
+            headers = {"retry-after": str(server.retry_after)} if status == 429 else None
+            self._send_json(status, {"error": {"message": "Injected error", "type": "injected"}}, headers)
+            return
+
+        server.count("calls", method)
+        prompt_tokens = sum(len(message["content"]) for message in payload["messages"]) // 4
+        completion = json.dumps(content)
+        self._send_json(200, {
+            "id": f"chatcmpl-{random.getrandbits(64):x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": payload.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": completion}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(completion) // 4,
+                      "total_tokens": prompt_tokens + len(completion) // 4},
+        })
+
+
+class FakeGroqServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency_ms=200, jitter_ms=50, error_rate=0.0, error_statuses=(429, 503),
+                 retry_after=0.5):
+        super().__init__(address, FakeGroqHandler)
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.error_statuses = list(error_statuses)
+        self.retry_after = retry_after
+        self._counters = {"calls": Counter(), "errors": Counter()}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def count(self, kind, method):
+        with self._lock:
+            self._counters[kind][method] += 1
+
+    def stats(self):
+        with self._lock:
+            calls, errors = dict(self._counters["calls"]), dict(self._counters["errors"])
+        return {"calls": calls, "errors": errors, "total_calls": sum(calls.values()),
+                "total_errors": sum(errors.values())}
+
+
+def start_server(port=0, **kwargs):
+    """
+    Starts a fake Groq server in a background thread.
+
+    Args:
+        port (int): The port to listen on, 0 for any free port.
+        **kwargs: The latency and error settings of `FakeGroqServer`.
+
+    Returns:
+        FakeGroqServer: The running server. Call `shutdown()` to stop it.
+    """
+
+    server = FakeGroqServer(("127.0.0.1", port), **kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Groq-compatible server for offline benchmarks.")
+    parser.add_argument("--port", type=int, default=0, help="Port to listen on (default: any free port)")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Mean latency of a request (default: 200)")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="Standard deviation of the latency (default: 50)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of failed requests (default: 0)")
+    parser.add_argument("--error-statuses", type=int, nargs="+", default=[429, 503],
+                        help="HTTP statuses of the failed requests (default: 429 503)")
+    parser.add_argument("--retry-after", type=float, default=0.5,
+                        help="Retry-After of the 429 errors, in seconds (default: 0.5)")
+    args = parser.parse_args()
+
+    server = FakeGroqServer(("127.0.0.1", args.port), latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                            error_rate=args.error_rate, error_statuses=args.error_statuses,
+                            retry_after=args.retry_after)
+    # The first line gives the URL to the parent process of the benchmark.
+    print(server.url, flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Measures the time it takes to import the entry points of the project, and checks that no heavy
+dependency is imported on the way.
+
+The import runs in a fresh interpreter, so the measure is not affected by modules already loaded.
+The script exits with a non-zero status if the import is slower than the budget or loads a heavy
+dependency, so it can be run in CI to stop regressions:
+
+    python benchmarks/import_time.py --budget 0.5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["torch", "transformers", "gliner", "onnxruntime", "groq", "httpx", "pdfplumber"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+import src.Extraction_engine
+import src.batch_runner
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "heavy_modules": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def measure(repeat):
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT_DIR, check=True,
+                                capture_output=True, text=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "seconds": min(run["seconds"] for run in runs),
+        "heavy_modules": sorted({module for run in runs for module in run["heavy_modules"]}),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmark of the project entry points.")
+    parser.add_argument("--budget", type=float, default=0.5, help="Maximum import time in seconds (default: 0.5)")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of fresh interpreters to time (default: 5)")
+    args = parser.parse_args()
+
+    result = measure(args.repeat)
+    print(json.dumps(result))
+
+    failed = False
+    if result["heavy_modules"]:
+        print(f"Heavy modules imported at startup: {result['heavy_modules']}", file=sys.stderr)
+        failed = True
+    if result["seconds"] > args.budget:
+        print(f"Import took {result['seconds']:.3f}s, over the budget of {args.budget:.3f}s", file=sys.stderr)
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
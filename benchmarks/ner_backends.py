@@ -0,0 +1,111 @@
+"""
+Compares the accuracy and latency of the GLiNER inference backends (torch fp32, ONNX Runtime fp32 and
+ONNX Runtime int8) on a fixed set of booking confirmation snippets.
+
+The ONNX models are exported on first use (see `python main.py --export-ner`), and the export time is
+not part of the measure. For each backend the script reports the share of samples answered exactly,
+the share of answers identical to the torch backend, and the latency of a batch:
+
+    python benchmarks/ner_backends.py --backends torch onnx int8 --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+from src.config import ConfigUtility
+from src.utils.model_registry import get_gliner_model
+from src.utils.ner_utils import NerModel
+
+# (question, section text, expected answer)
+SAMPLES = [
+    (NerModel.build_question("booking_number"),
+     "BOOKING CONFIRMATION\nBooking No: POSU6396610410\nService Contract: APT24017", "POSU6396610410"),
+    (NerModel.build_question("service_contract_number"),
+     "BOOKING CONFIRMATION\nBooking No: POSU6396610410\nService Contract: APT24017", "APT24017"),
+    (NerModel.build_question("location", sub_section="origin", section="shipment_route"),
+     "Place of Receipt: Shanghai, China\nPort of Loading: Shanghai / Yangshan\nPort of Discharge: Fremantle",
+     "Shanghai, China"),
+    (NerModel.build_question("location", sub_section="destination", section="shipment_route"),
+     "Port of Loading: Singapore / Pasir Panjang\nFinal Destination: Fremantle, Western Australia",
+     "Fremantle, Western Australia"),
+    (NerModel.build_question("cargo_description"),
+     "Commodity: Chemical Absorbent Pad\nCargo Type: General\nGross Weight: 6000 KG", "Chemical Absorbent Pad"),
+    (NerModel.build_question("total_weight"),
+     "Commodity: Chemical Absorbent Pad\nCargo Type: General\nGross Weight: 6000 KG", "6000 KG"),
+    (NerModel.build_question("vessel_name"),
+     "Vessel / Voyage: XIN HUI ZHOU 190S\nETD: 04 Oct 2024 21:00\nETA: 25 Oct 2024 14:00", "XIN HUI ZHOU"),
+    (NerModel.build_question("estimated_departure"),
+     "Vessel / Voyage: XIN HUI ZHOU 190S\nETD: 04 Oct 2024 21:00\nETA: 25 Oct 2024 14:00", "04 Oct 2024 21:00"),
+    (NerModel.build_question("estimated_arrival"),
+     "Vessel / Voyage: XIN HUI ZHOU 190S\nETD: 04 Oct 2024 21:00\nETA: 25 Oct 2024 14:00", "25 Oct 2024 14:00"),
+    (NerModel.build_question("name", sub_section="shipper", section="parties_information"),
+     "Shipper: Winmore Logistics China Limited\nTEL: 4029601910\nConsignee: Fremantle Freight Pty Ltd",
+     "Winmore Logistics China Limited"),
+]
+
+
+def normalize(text):
+    return " ".join(str(text).lower().split()) if text is not None else None
+
+
+def predict(model, texts):
+    results = model.batch_predict_entities(texts, ["answer"])
+    return [max(res, key=lambda x: x["score"])["text"] if res else None for res in results]
+
+
+def measure(backend, repeat):
+    start = time.perf_counter()
+    model = get_gliner_model(backend=backend)
+    load_seconds = time.perf_counter() - start
+
+    texts = [question + text for question, text, _ in SAMPLES]
+    answers = predict(model, texts)  # Warm-up, and the answers the accuracy is measured on.
+
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        predict(model, texts)
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        "backend": backend,
+        "load_seconds": round(load_seconds, 3),
+        "batch_seconds_median": round(statistics.median(latencies), 4),
+        "batch_seconds_min": round(min(latencies), 4),
+        "samples_per_second": round(len(texts) / statistics.median(latencies), 2),
+        "accuracy": round(sum(normalize(answer) == normalize(expected)
+                              for answer, (_, _, expected) in zip(answers, SAMPLES)) / len(SAMPLES), 3),
+        "answers": answers,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accuracy-vs-latency comparison of the GLiNER backends.")
+    parser.add_argument("--backends", nargs="+", default=["torch", "onnx", "int8"],
+                        choices=["torch", "onnx", "int8"], help="Backends to compare (default: all)")
+    parser.add_argument("--repeat", type=int, default=5, help="Number of timed batches per backend (default: 5)")
+    parser.add_argument("--output", help="JSON file the results are written to")
+    args = parser.parse_args()
+
+    results = [measure(backend, args.repeat) for backend in args.backends]
+    reference = next((result["answers"] for result in results if result["backend"] == "torch"), None)
+    for result in results:
+        if reference is not None:
+            result["agreement_with_torch"] = round(sum(normalize(a) == normalize(b) for a, b in
+                                                       zip(result["answers"], reference)) / len(SAMPLES), 3)
+        print(json.dumps({key: value for key, value in result.items() if key != "answers"}))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            json.dump({"model": ConfigUtility.GLINER_MODEL, "samples": len(SAMPLES), "results": results}, output,
+                      indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
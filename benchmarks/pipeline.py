@@ -0,0 +1,288 @@
+"""
+Offline end-to-end benchmark of `ExtractionEngine.process_pdf`.
+
+A corpus of synthetic booking confirmations (see `benchmarks/synthetic.py`) is processed against the
+fake Groq server (see `benchmarks/fake_groq.py`), with the LLM cache and the result store disabled so
+that every document is processed from scratch. The script reports the latency of each stage, the
+throughput, the LLM calls and errors by method and the peak RSS of the process:
+
+    python benchmarks/pipeline.py --docs 20 --pages 1 5 40 --latency-ms 300 --save-baseline benchmarks/baselines/default.json
+    python benchmarks/pipeline.py --docs 20 --pages 1 5 40 --latency-ms 300 --compare benchmarks/baselines/default.json
+
+With `--compare`, the script exits with a non-zero status if a metric is worse than the baseline by more
+than the tolerance. `--stub-ner` replaces GLiNER with a keyword matcher, to measure the rest of the
+pipeline on machines without the model.
+
+`--record` saves the LLM calls of a run to a cassette, and `--replay` serves them from it instead of the
+fake server, so that the CPU side of the pipeline can be profiled in isolation, with `--zero-latency`:
+
+    python benchmarks/pipeline.py --docs 20 --record benchmarks/cassettes/default.jsonl
+    python benchmarks/pipeline.py --docs 20 --replay benchmarks/cassettes/default.jsonl --zero-latency
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from src.config import ConfigUtility
+from src.Extraction_engine import ExtractionEngine
+from src.utils import ner_utils
+from src.utils.cassette_utils import get_cassette, read_unmatched, unmatched_path
+from synthetic import LABELS, generate_corpus
+
+STAGES = {
+    "extract": "PDF text extraction, per document",
+    "page": "translation and sectioning, per page",
+    "ner": "batched NER pass, per document",
+    "resolve": "LLM fallbacks, per section",
+    "document": "whole document",
+}
+
+
+class StubGliner:
+    """
+    Answers a question with the value of the "label: value" line sharing the most words with it.
+    """
+
+    def batch_predict_entities(self, texts, labels):
+        results = []
+        for text in texts:
+            question, _, body = text.partition("\n")
+            words = set(question.lower().replace("_", " ").replace("?", "").split()) - {"what", "is", "the", "of"}
+            best, best_overlap, offset = None, 0, len(question) + 1
+            for line in body.split("\n"):
+                label, sep, value = line.partition(":")
+                overlap = len(words & set(label.lower().split()))
+                if sep and value.strip() and overlap > best_overlap:
+                    start = offset + len(label) + 1 + (len(value) - len(value.lstrip()))
+                    best, best_overlap = {"text": value.strip(), "start": start, "end": start + len(value.strip()),
+                                          "label": labels[0], "score": 0.95}, overlap
+                offset += len(line) + 1
+            results.append([best] if best else [])
+        return results
+
+
+class StageTimer:
+    def __init__(self):
+        self.durations = {stage: [] for stage in STAGES}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.durations[stage].append(seconds)
+
+    def wrap(self, stage, func):
+        def _timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return _timed
+
+    def wrap_generator(self, stage, func):
+        # Only the time spent producing the items is counted, not the time the consumer holds them.
+        def _timed(*args, **kwargs):
+            iterator, elapsed = func(*args, **kwargs), 0.0
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    self.add(stage, elapsed + time.perf_counter() - start)
+                    return
+                elapsed += time.perf_counter() - start
+                yield item
+        return _timed
+
+    def summary(self):
+        summary = {}
+        for stage, durations in self.durations.items():
+            if not durations:
+                continue
+            ordered = sorted(durations)
+            summary[stage] = {
+                "count": len(durations),
+                "mean_seconds": round(statistics.mean(durations), 4),
+                "p50_seconds": round(ordered[len(ordered) // 2], 4),
+                "p95_seconds": round(ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)], 4),
+            }
+        return summary
+
+
+def start_fake_groq(args):
+    command = [sys.executable, os.path.join(BENCHMARKS_DIR, "fake_groq.py"), "--latency-ms", str(args.latency_ms),
+               "--jitter-ms", str(args.jitter_ms), "--error-rate", str(args.error_rate)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    return process, process.stdout.readline().strip()
+
+
+def configure(args, base_url):
+    ConfigUtility.GROQ_BASE_URL = base_url
+    ConfigUtility.GROQ_API_KEY = ConfigUtility.GROQ_API_KEY or "benchmark"
+    ConfigUtility.GROQ_REQUESTS_PER_MINUTE = args.requests_per_minute
+    ConfigUtility.GROQ_TOKENS_PER_MINUTE = args.tokens_per_minute
+    ConfigUtility.GROQ_RETRY_BASE_DELAY = 0.2
+    ConfigUtility.LLM_CACHE_ENABLED = False
+    ConfigUtility.RESULT_CACHE_ENABLED = False
+    if args.record or args.replay:
+        ConfigUtility.LLM_CASSETTE_MODE = "record" if args.record else "replay"
+        ConfigUtility.LLM_CASSETTE_PATH = args.record or args.replay
+        ConfigUtility.LLM_CASSETTE_REPLAY_LATENCY = "zero" if args.zero_latency else "original"
+    if args.stub_ner:
+        ConfigUtility.NER_WARM_UP = False
+        ConfigUtility.NER_SERVER_ENABLED = False
+        ner_utils.get_gliner_model = lambda: StubGliner()
+
+
+def run(args):
+    data_dir = args.data_dir or tempfile.mkdtemp(prefix="benchmark_")
+    manifest = generate_corpus(data_dir, args.docs, args.pages, args.languages, seed=args.seed)
+
+    # Both files are appended to, so the ones of a previous run are removed first.
+    for path in (args.record, args.replay and unmatched_path(args.replay)):
+        if path and os.path.exists(path):
+            os.remove(path)
+    # A replayed run never reaches the server, so none is started.
+    process, base_url = start_fake_groq(args) if not args.replay else (None, "http://127.0.0.1:9")
+    try:
+        configure(args, base_url)
+        timer = StageTimer()
+        engine = ExtractionEngine()
+        engine.iter_pages = timer.wrap_generator("extract", engine.iter_pages)
+        engine.process_page = timer.wrap("page", engine.process_page)
+        engine.predict_sections = timer.wrap("ner", engine.predict_sections)
+        engine.resolve_section = timer.wrap("resolve", engine.resolve_section)
+        process_pdf = timer.wrap("document", engine.process_pdf)
+
+        start = time.perf_counter()
+        engine.warm_up()
+        warm_up_seconds = time.perf_counter() - start
+
+        failed = 0
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            futures = [executor.submit(process_pdf, entry["path"], raise_errors=True) for entry in manifest]
+            for future in futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"Document failed: {type(e).__name__}: {e}", file=sys.stderr)
+        elapsed = time.perf_counter() - start
+
+        if args.replay:
+            report = get_cassette().report()
+            llm_stats = {"total_calls": report["played"], "unmatched": len(read_unmatched(args.replay))}
+        else:
+            with urllib.request.urlopen(base_url + "/stats") as res:
+                llm_stats = json.loads(res.read())
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    return {
+        "settings": {key: value for key, value in vars(args).items()
+                     if key not in ("save_baseline", "compare", "tolerance", "data_dir", "record", "replay")},
+        "documents": len(manifest),
+        "pages": sum(entry["pages"] for entry in manifest),
+        "failed": failed,
+        "warm_up_seconds": round(warm_up_seconds, 3),
+        "elapsed_seconds": round(elapsed, 3),
+        "documents_per_second": round(len(manifest) / elapsed, 3) if elapsed else 0.0,
+        "stages": timer.summary(),
+        "llm": llm_stats,
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def compare(result, baseline, tolerance):
+    """
+    Compares a result with a baseline.
+
+    Args:
+        result (dict): The result of this run.
+        baseline (dict): A result saved with `--save-baseline`.
+        tolerance (float): The relative change above which a metric is a regression.
+
+    Returns:
+        list: The regressions, as human-readable strings.
+    """
+
+    # (name, current value, baseline value, higher is better)
+    metrics = [("documents_per_second", result["documents_per_second"], baseline["documents_per_second"], True),
+               ("llm.total_calls", result["llm"]["total_calls"], baseline["llm"]["total_calls"], False),
+               ("peak_rss_mb", result["peak_rss_mb"], baseline["peak_rss_mb"], False)]
+    for stage, stats in result["stages"].items():
+        if stage in baseline["stages"]:
+            metrics.append((f"stages.{stage}.p50_seconds", stats["p50_seconds"],
+                            baseline["stages"][stage]["p50_seconds"], False))
+
+    regressions = []
+    for name, current, previous, higher_is_better in metrics:
+        if not previous:
+            continue
+        change = (current - previous) / previous
+        print(f"{name}: {previous} -> {current} ({change:+.1%})")
+        if (change < -tolerance) if higher_is_better else (change > tolerance):
+            regressions.append(f"{name} regressed from {previous} to {current} ({change:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of the extraction pipeline.")
+    parser.add_argument("--docs", type=int, default=12, help="Number of documents (default: 12)")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 5, 20], help="Page counts, used in turn")
+    parser.add_argument("--languages", nargs="+", default=list(LABELS), choices=list(LABELS),
+                        help="Languages, used in turn (default: all)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the corpus (default: 0)")
+    parser.add_argument("--workers", type=int, default=4, help="Documents processed concurrently (default: 4)")
+    parser.add_argument("--latency-ms", type=float, default=200, help="Mean latency of the fake LLM (default: 200)")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="Jitter of the fake LLM latency (default: 50)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of failed LLM requests (default: 0)")
+    parser.add_argument("--requests-per-minute", type=int, default=0, help="Client-side request budget (default: none)")
+    parser.add_argument("--tokens-per-minute", type=int, default=0, help="Client-side token budget (default: none)")
+    parser.add_argument("--stub-ner", action="store_true", help="Replace GLiNER with a keyword matcher")
+    cassette = parser.add_mutually_exclusive_group()
+    cassette.add_argument("--record", help="Cassette file the LLM calls are recorded to")
+    cassette.add_argument("--replay", help="Cassette file the LLM calls are replayed from, without the fake server")
+    parser.add_argument("--zero-latency", action="store_true", help="Replay the LLM calls without their latency")
+    parser.add_argument("--data-dir", help="Directory the PDFs are written to (default: a temporary directory)")
+    parser.add_argument("--save-baseline", help="JSON file the result is saved to")
+    parser.add_argument("--compare", help="Baseline JSON file the result is compared with")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Relative change above which a metric is a regression (default: 0.2)")
+    args = parser.parse_args()
+
+    result = run(args)
+    print(json.dumps(result, indent=2))
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w", encoding="utf-8") as output:
+            json.dump(result, output, indent=2)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as baseline_file:
+            regressions = compare(result, json.load(baseline_file), args.tolerance)
+        for regression in regressions:
+            print(regression, file=sys.stderr)
+        sys.exit(1 if regressions or result["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""
+Generates synthetic booking confirmation PDFs matching the extraction schema of `ExtractionEngine`,
+in several languages and with a terms and conditions appendix of any number of pages.
+
+The PDFs are written by hand with the standard Helvetica font, so no PDF library is needed:
+
+    python benchmarks/synthetic.py --output-dir /tmp/confirmations --docs 20 --pages 1 5 40 --languages en de fr es
+"""
+import argparse
+import json
+import os
+import random
+
+LABELS = {
+    "en": {
+        "title": "BOOKING CONFIRMATION", "booking_details": "Booking Details", "booking_number": "Booking No",
+        "service_contract_number": "Service Contract", "shipment_route": "Routing",
+        "origin": "Place of Receipt", "origin_terminal": "Origin Terminal", "destination": "Final Destination",
+        "destination_terminal": "Destination Terminal", "transit_port": "Transit Port", "eta": "ETA",
+        "cargo_information": "Cargo Details", "cargo_type": "Cargo Type", "cargo_description": "Commodity",
+        "container": "Container", "total_weight": "Gross Weight", "vessel_information": "Vessel Information",
+        "vessel_name": "Vessel", "vessel_voyage": "Voyage", "etd": "ETD", "parties_information": "Parties",
+        "shipper": "Shipper", "carrier": "Carrier", "contact": "Contact", "terms": "Terms and Conditions",
+    },
+    "de": {
+        "title": "BUCHUNGSBESTÄTIGUNG", "booking_details": "Buchungsdetails", "booking_number": "Buchungsnummer",
+        "service_contract_number": "Servicevertrag", "shipment_route": "Route",
+        "origin": "Übernahmeort", "origin_terminal": "Abgangsterminal", "destination": "Bestimmungsort",
+        "destination_terminal": "Zielterminal", "transit_port": "Umschlaghafen", "eta": "Ankunft",
+        "cargo_information": "Ladungsdetails", "cargo_type": "Ladungsart", "cargo_description": "Ware",
+        "container": "Behälter", "total_weight": "Bruttogewicht", "vessel_information": "Schiffsangaben",
+        "vessel_name": "Schiff", "vessel_voyage": "Reise", "etd": "Abfahrt", "parties_information": "Beteiligte",
+        "shipper": "Versender", "carrier": "Frachtführer", "contact": "Kontakt", "terms": "Geschäftsbedingungen",
+    },
+    "fr": {
+        "title": "CONFIRMATION DE RÉSERVATION", "booking_details": "Détails de la réservation",
+        "booking_number": "Numéro de réservation", "service_contract_number": "Contrat de service",
+        "shipment_route": "Itinéraire", "origin": "Lieu de réception", "origin_terminal": "Terminal de départ",
+        "destination": "Destination finale", "destination_terminal": "Terminal d'arrivée",
+        "transit_port": "Port de transbordement", "eta": "Arrivée prévue", "cargo_information": "Détails de la cargaison",
+        "cargo_type": "Type de cargaison", "cargo_description": "Marchandise", "container": "Conteneur",
+        "total_weight": "Poids brut", "vessel_information": "Informations sur le navire", "vessel_name": "Navire",
+        "vessel_voyage": "Voyage", "etd": "Départ prévu", "parties_information": "Parties", "shipper": "Expéditeur",
+        "carrier": "Transporteur", "contact": "Coordonnées", "terms": "Conditions générales",
+    },
+    "es": {
+        "title": "CONFIRMACIÓN DE RESERVA", "booking_details": "Detalles de la reserva",
+        "booking_number": "Número de reserva", "service_contract_number": "Contrato de servicio",
+        "shipment_route": "Ruta", "origin": "Lugar de recepción", "origin_terminal": "Terminal de origen",
+        "destination": "Destino final", "destination_terminal": "Terminal de destino",
+        "transit_port": "Puerto de transbordo", "eta": "Llegada estimada", "cargo_information": "Detalles de la carga",
+        "cargo_type": "Tipo de carga", "cargo_description": "Mercancía", "container": "Contenedor",
+        "total_weight": "Peso bruto", "vessel_information": "Información del buque", "vessel_name": "Buque",
+        "vessel_voyage": "Viaje", "etd": "Salida estimada", "parties_information": "Partes", "shipper": "Embarcador",
+        "carrier": "Transportista", "contact": "Contacto", "terms": "Términos y condiciones",
+    },
+}
+
+TERMS = {
+    "en": ["The carrier shall not be liable for any loss or damage arising from delay in delivery.",
+           "All goods are carried subject to the terms of the carrier's bill of lading.",
+           "The merchant shall be responsible for the accuracy of the particulars furnished."],
+    "de": ["Der Frachtführer haftet nicht für Verluste oder Schäden, die durch verspätete Lieferung entstehen.",
+           "Alle Waren werden gemäß den Bedingungen des Konnossements des Frachtführers befördert.",
+           "Der Händler ist für die Richtigkeit der gemachten Angaben verantwortlich."],
+    "fr": ["Le transporteur ne sera pas responsable des pertes ou dommages résultant d'un retard de livraison.",
+           "Toutes les marchandises sont transportées selon les conditions du connaissement du transporteur.",
+           "Le marchand est responsable de l'exactitude des informations fournies."],
+    "es": ["El transportista no será responsable de pérdidas o daños derivados del retraso en la entrega.",
+           "Todas las mercancías se transportan según los términos del conocimiento de embarque del transportista.",
+           "El comerciante será responsable de la exactitud de los datos facilitados."],
+}
+
+PORTS = [("Shanghai, China", "Yangshan Terminal"), ("Singapore", "Pasir Panjang"),
+         ("Fremantle, Western Australia", "DP World"), ("Rotterdam, Netherlands", "Maasvlakte II"),
+         ("Hamburg, Germany", "Burchardkai"), ("Valencia, Spain", "MSC Terminal"),
+         ("Le Havre, France", "Port 2000"), ("Busan, Korea", "New Port")]
+VESSELS = ["XIN HUI ZHOU", "MSC ANNA", "CMA CGM MARCO POLO", "EVER GIVEN", "MAERSK ESSEN"]
+COMMODITIES = ["Chemical Absorbent Pad", "Machine Parts", "Frozen Seafood", "Cotton Textiles", "Ceramic Tiles"]
+COMPANIES = ["Winmore Logistics China Limited", "Oceanic Freight GmbH", "Transports Durand SA",
+             "Navieras del Sur SL", "Pacific Carriers Pte Ltd"]
+
+LINES_PER_PAGE = 50
+
+
+def make_document(seed, lang="en", pages=1):
+    """
+    Builds the text of a synthetic booking confirmation and the values it holds.
+
+    Args:
+        seed (int): The seed of the random values, so that the same seed gives the same document.
+        lang (str): The language of the document, one of `LABELS`.
+        pages (int): The number of pages. The pages after the first hold the terms and conditions.
+
+    Returns:
+        tuple: The text of each page, and a dictionary of the expected values following the extraction schema.
+    """
+
+    rng = random.Random(seed)
+    labels = LABELS[lang]
+    origin, transit, destination = rng.sample(PORTS, 3)
+    departure = f"{rng.randint(1, 28):02d} Oct 2024 {rng.randint(0, 23):02d}:00"
+    transit_eta = f"{rng.randint(1, 28):02d} Nov 2024 {rng.randint(0, 23):02d}:00"
+    arrival = f"{rng.randint(1, 28):02d} Dec 2024 {rng.randint(0, 23):02d}:00"
+    vessel = rng.choice(VESSELS)
+    shipper, carrier = rng.sample(COMPANIES, 2)
+
+    truth = {
+        "booking_details": {"booking_number": f"BK{rng.randint(10 ** 9, 10 ** 10 - 1)}",
+                            "service_contract_number": f"SC{rng.randint(10000, 99999)}"},
+        "shipment_route": {"origin": {"location": origin[0], "terminal": origin[1]},
+                           "destination": {"location": destination[0], "terminal": destination[1]},
+                           "transit_ports": [{"port_name": transit[0], "eta": transit_eta}]},
+        "cargo_information": {"cargo_type": rng.choice(["General", "Reefer", "Dangerous"]),
+                              "cargo_description": rng.choice(COMMODITIES),
+                              "container_details": {"quantity": str(rng.randint(1, 5)),
+                                                    "size": rng.choice(["20'", "40'"]),
+                                                    "type": rng.choice(["Dry", "Hi-Cube", "Reefer"])},
+                              "total_weight": f"{rng.randint(1, 30) * 1000} KG"},
+        "vessel_information": {"vessel_name": vessel, "vessel_voyage": f"{vessel} {rng.randint(100, 999)}S",
+                               "estimated_departure": departure, "estimated_arrival": arrival},
+        "parties_information": {"shipper": {"name": shipper, "contact_details": f"TEL: {rng.randint(10 ** 9, 10 ** 10 - 1)}"},
+                                "carrier": {"name": carrier, "contact_details": f"TEL: {rng.randint(10 ** 9, 10 ** 10 - 1)}"}},
+    }
+
+    booking, route = truth["booking_details"], truth["shipment_route"]
+    cargo, vessel_info = truth["cargo_information"], truth["vessel_information"]
+    parties, container = truth["parties_information"], truth["cargo_information"]["container_details"]
+    first_page = [
+        labels["title"],
+        labels["booking_details"],
+        f"{labels['booking_number']}: {booking['booking_number']}",
+        f"{labels['service_contract_number']}: {booking['service_contract_number']}",
+        labels["shipment_route"],
+        f"{labels['origin']}: {route['origin']['location']}",
+        f"{labels['origin_terminal']}: {route['origin']['terminal']}",
+        f"{labels['transit_port']}: {route['transit_ports'][0]['port_name']} {labels['eta']}: {route['transit_ports'][0]['eta']}",
+        f"{labels['destination']}: {route['destination']['location']}",
+        f"{labels['destination_terminal']}: {route['destination']['terminal']}",
+        labels["cargo_information"],
+        f"{labels['cargo_type']}: {cargo['cargo_type']}",
+        f"{labels['cargo_description']}: {cargo['cargo_description']}",
+        f"{labels['container']}: {container['quantity']} X {container['size']} {container['type']}",
+        f"{labels['total_weight']}: {cargo['total_weight']}",
+        labels["vessel_information"],
+        f"{labels['vessel_name']}: {vessel_info['vessel_name']}",
+        f"{labels['vessel_voyage']}: {vessel_info['vessel_voyage']}",
+        f"{labels['etd']}: {vessel_info['estimated_departure']}",
+        f"{labels['eta']}: {vessel_info['estimated_arrival']}",
+        labels["parties_information"],
+        f"{labels['shipper']}: {parties['shipper']['name']}",
+        f"{labels['contact']}: {parties['shipper']['contact_details']}",
+        f"{labels['carrier']}: {parties['carrier']['name']}",
+        f"{labels['contact']}: {parties['carrier']['contact_details']}",
+    ]
+
+    page_texts = ["\n".join(first_page)]
+    for page in range(1, pages):
+        lines = [f"{labels['terms']} ({page})"]
+        lines += [f"{idx}. {rng.choice(TERMS[lang])}" for idx in range(1, LINES_PER_PAGE)]
+        page_texts.append("\n".join(lines))
+    return page_texts, truth
+
+
+def translate_to_english(text):
+    """
+    Translates the text of a synthetic document into English, and removes its terms and conditions,
+    as the LLM is asked to. Used by the fake Groq server.
+
+    Args:
+        text (str): The text of a synthetic document, in any language of `LABELS`.
+
+    Returns:
+        tuple: The detected language name and the English text.
+    """
+
+    names = {"en": "English", "de": "German", "fr": "French", "es": "Spanish"}
+    scores = {lang: sum(label in text for label in labels.values()) for lang, labels in LABELS.items()}
+    lang = max(scores, key=scores.get)
+
+    terms = {sentence for sentences in TERMS.values() for sentence in sentences}
+    pairs = sorted(((LABELS[lang][key], LABELS["en"][key]) for key in LABELS[lang]), key=lambda x: -len(x[0]))
+    lines = []
+    for line in text.split("\n"):
+        if any(sentence in line for sentence in terms) or any(line.startswith(LABELS[code]["terms"]) for code in LABELS):
+            continue
+        for foreign, english in pairs:
+            line = line.replace(foreign, english)
+        lines.append(line)
+    return names[lang], "\n".join(lines)
+
+
+def _pdf_string(text):
+    encoded = text.encode("cp1252", errors="replace").decode("latin-1")
+    return "(" + encoded.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def write_pdf(path, page_texts):
+    """
+    Writes a minimal PDF with one page per text, in 10pt Helvetica.
+
+    Args:
+        path (str): The path of the PDF file.
+        page_texts (list): The text of each page. Lines are separated by newlines.
+    """
+
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    kids = []
+    for text in page_texts:
+        lines = " ".join(f"{_pdf_string(line)} Tj T*" for line in text.split("\n"))
+        stream = f"BT /F1 10 Tf 13 TL 40 800 Td {lines} ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    content = b"%PDF-1.4\n"
+    offsets = []
+    for number, obj in enumerate(objects, start=1):
+        offsets.append(len(content))
+        body = obj if isinstance(obj, bytes) else obj.encode("latin-1")
+        content += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(content)
+    content += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    content += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    content += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+
+    with open(path, "wb") as pdf:
+        pdf.write(content)
+
+
+def generate_corpus(output_dir, docs, pages, languages, seed=0):
+    """
+    Writes a corpus of synthetic PDFs and a `manifest.jsonl` with the path, language, page count and
+    expected values of each of them.
+
+    Args:
+        output_dir (str): The directory the PDFs are written to.
+        docs (int): The number of documents.
+        pages (list): The page counts, used in turn.
+        languages (list): The languages, used in turn.
+        seed (int): The seed of the corpus.
+
+    Returns:
+        list: The manifest entries.
+    """
+
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = []
+    for idx in range(docs):
+        lang, page_count = languages[idx % len(languages)], pages[idx % len(pages)]
+        page_texts, truth = make_document(seed * 100003 + idx, lang=lang, pages=page_count)
+        path = os.path.join(output_dir, f"confirmation_{idx:04d}_{lang}_{page_count}p.pdf")
+        write_pdf(path, page_texts)
+        manifest.append({"path": path, "lang": lang, "pages": page_count, "expected": truth})
+
+    with open(os.path.join(output_dir, "manifest.jsonl"), "w", encoding="utf-8") as output:
+        for entry in manifest:
+            output.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic booking confirmation PDFs.")
+    parser.add_argument("--output-dir", required=True, help="Directory the PDFs are written to")
+    parser.add_argument("--docs", type=int, default=10, help="Number of documents (default: 10)")
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 3], help="Page counts, used in turn")
+    parser.add_argument("--languages", nargs="+", default=list(LABELS), choices=list(LABELS),
+                        help="Languages, used in turn (default: all)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the corpus (default: 0)")
+    args = parser.parse_args()
+
+    manifest = generate_corpus(args.output_dir, args.docs, args.pages, args.languages, seed=args.seed)
+    print(f"Wrote {len(manifest)} PDFs to {args.output_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,13 @@
+import argparse
+import json
 import logging
 
+from src.batch_runner import collect_pdf_paths, run_batch
+from src.ner_server import serve
 from src.Extraction_engine import ExtractionEngine
+from src.utils.cache_utils import hash_file
+from src.utils.model_registry import export_onnx_model
+from src.utils.pdf_utils import iter_pdf_pages
 
 logging.basicConfig(
     level=logging.INFO,
@@ -10,12 +17,66 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Extract shipping booking confirmations from PDFs.")
+    parser.add_argument("inputs", nargs="*",
+                        help="PDF files, directories, glob patterns or manifest files (.txt or .jsonl)")
+    parser.add_argument("-o", "--output", default="results.jsonl",
+                        help="JSONL file the results are appended to (default: results.jsonl)")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Number of workers (default: 1)")
+    parser.add_argument("--pages", help="Pages printed by --dump-text, such as 1-3,7 (default: all)")
+    parser.add_argument("--executor", choices=["process", "thread"], default="process",
+                        help="Run the workers as processes or threads (default: process)")
+
+    # These modes never load the models.
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--validate-schema", action="store_true", help="Validate the extraction schema and exit")
+    mode.add_argument("--dump-text", action="store_true", help="Print the extracted text of each page and exit")
+    mode.add_argument("--lookup", action="store_true", help="Print the stored results of the PDFs and exit")
+    mode.add_argument("--export-ner", action="store_true",
+                      help="Export the GLiNER model to ONNX and int8 for the onnx and int8 NER backends and exit")
+    mode.add_argument("--serve-ner", action="store_true",
+                      help="Run the NER inference server shared by the pipeline workers (see [NER_SERVER])")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
-    ext_engine_inst = ExtractionEngine()
-    # V1
-    # print(ext_engine_inst.process_pdf_v1(pdf_path="Posco_Logistics.pdf"))
-    # V2
-    print(ext_engine_inst.process_pdf(pdf_path="Posco_Logistics.pdf"))
+    args = parse_args()
+
+    if args.validate_schema:
+        errors = ExtractionEngine.validate_extraction_model(ExtractionEngine.init_extraction_model())
+        for error in errors:
+            logger.error(error)
+        raise SystemExit(1 if errors else 0)
+
+    if args.export_ner:
+        logger.info(f"GLiNER model exported to {export_onnx_model(quantize=True)}")
+        raise SystemExit(0)
+
+    if args.serve_ner:
+        serve()
+        raise SystemExit(0)
+
+    pdf_paths = collect_pdf_paths(args.inputs)
+    if not pdf_paths:
+        raise SystemExit("No PDF to process.")
+
+    if args.dump_text:
+        for pdf_path in pdf_paths:
+            if args.pages:
+                pages = ((page.number, page.text) for page in iter_pdf_pages(pdf_path, pages=args.pages))
+            else:
+                pages = enumerate(ExtractionEngine.iter_pages(pdf_path, pdf_hash=hash_file(pdf_path)), start=1)
+            for page_number, page in pages:
+                print(f"===== {pdf_path} - page {page_number} =====")
+                print(page)
+    elif args.lookup:
+        engine = ExtractionEngine()
+        for pdf_path in pdf_paths:
+            print(json.dumps({"pdf_path": pdf_path, "result": engine.lookup_result(pdf_path)}, ensure_ascii=False))
+    else:
+        run_batch(pdf_paths=pdf_paths, output_path=args.output, workers=args.workers, executor=args.executor)
 
 
 
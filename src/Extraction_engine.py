@@ -1,17 +1,130 @@
+import asyncio
 import json
 import logging
-from src.utils.pdf_utils import extract_text_from_pdf
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from src.config import ConfigUtility
+from src.utils.pdf_utils import iter_pdf_pages
 from src.utils.ner_utils import NerModel
-from src.utils.llm_utils import LLMInference
+from src.utils.extraction_plan import ExtractionPlan, load_extraction_model
+from src.utils.model_registry import get_llm_inference, get_async_llm_inference
+from src.utils.lang_utils import build_label_phrases, needs_translation, split_blocks
+from src.utils.section_utils import build_keywords, split_sections, strip_terms
+from src.utils.task_graph import TaskGraph
+from src.utils.cache_utils import get_result_store, hash_file, make_cache_key
+from src.utils.metrics_utils import collect_metrics, inc, submit, timed
 
 logger = logging.getLogger(__name__)
 
+# The version of the extraction code and prompts, part of the fingerprint of the stored results. Bump it
+# whenever a change of the code or of a prompt changes the result of a document.
+PIPELINE_VERSION = 3
+
 
 class ExtractionEngine:
     def __init__(self):
-        self.ner_inst = NerModel()
-        self.llm_inst = LLMInference()
+        self._ner_inst = None
+        self._ner_lock = threading.Lock()
         self.extraction_model = self.init_extraction_model()
+        self.plan = ExtractionPlan(self.extraction_model)
+        self.page_concurrency = ConfigUtility.PAGE_CONCURRENCY
+        self.local_language_detection = ConfigUtility.LOCAL_LANGUAGE_DETECTION
+        self.english_threshold = ConfigUtility.ENGLISH_THRESHOLD
+        self.english_labels = build_label_phrases(self.extraction_model)
+        self.combined_translate_section = ConfigUtility.COMBINED_TRANSLATE_SECTION
+        self.local_sectioning = ConfigUtility.LOCAL_SECTIONING
+        self.sectioning_threshold = ConfigUtility.SECTIONING_THRESHOLD
+        self.section_keywords = build_keywords(self.extraction_model)
+
+    @property
+    def ner_inst(self):
+        """
+        The NER model, loaded on first use so that documents served from the result store never load it.
+        """
+
+        if self._ner_inst is None:
+            with self._ner_lock:
+                if self._ner_inst is None:
+                    self._ner_inst = NerModel()
+        return self._ner_inst
+
+    @property
+    def llm_inst(self):
+        return get_llm_inference()
+
+    @property
+    def async_llm_inst(self):
+        return get_async_llm_inference()
+
+    def warm_up(self):
+        """
+        Loads and warms up the NER model now instead of on the first document that needs it.
+        """
+
+        return self.ner_inst
+
+    def fingerprint(self):
+        """
+        Fingerprints everything that influences the result of a document besides the PDF itself.
+
+        Every setting that can change the result of a document must be part of the fingerprint, along with
+        `PIPELINE_VERSION`, so that a change never serves a stale stored result.
+
+        Returns:
+            str: A hash of the pipeline version, the extraction schema, the GLiNER model, backend and windows,
+                 the Groq model, the NER threshold, the language detection, translation and sectioning settings,
+                 whether the pattern extractors are used, and the retrieval and batching settings of the LLM
+                 fallbacks.
+        """
+
+        return make_cache_key(PIPELINE_VERSION, self.extraction_model, ConfigUtility.GLINER_MODEL,
+                              ConfigUtility.NER_BACKEND, ConfigUtility.GROQ_MODEL, ConfigUtility.NER_THRESHOLD,
+                              self.local_language_detection, self.english_threshold, self.combined_translate_section,
+                              self.local_sectioning, self.sectioning_threshold, ConfigUtility.PATTERN_EXTRACTION,
+                              ConfigUtility.RETRIEVAL_ENABLED, ConfigUtility.RETRIEVAL_TOP_K,
+                              ConfigUtility.RETRIEVAL_TOKEN_BUDGET, ConfigUtility.RETRIEVAL_CHUNK_WORDS,
+                              ConfigUtility.RETRIEVAL_OVERLAP_WORDS, ConfigUtility.GROQ_BATCH_FALLBACK,
+                              ConfigUtility.GROQ_BATCH_FALLBACK_SIZE, ConfigUtility.NER_MAX_WORDS,
+                              ConfigUtility.NER_WINDOW_OVERLAP)
+
+    @staticmethod
+    def validate_extraction_model(extraction_model):
+        """
+        Checks that an extraction model has a shape the section processors can handle.
+
+        Sections map fields to either an empty dictionary (a single answer), a dictionary of empty
+        dictionaries (a subsection of single answers), or a list holding one such dictionary (a list of answers).
+        The model is compiled into an `ExtractionPlan`, which rejects any other shape.
+
+        Args:
+            extraction_model (dict): The extraction model to be checked.
+
+        Returns:
+            list: The problem found, as a human-readable string. The list is empty if the model is valid.
+        """
+
+        try:
+            ExtractionPlan(extraction_model)
+        except ValueError as e:
+            return [str(e)]
+        return []
+
+    def lookup_result(self, pdf_path):
+        """
+        Looks up the stored result of a PDF without loading any model.
+
+        Args:
+            pdf_path (str): The file path to the PDF document.
+
+        Returns:
+            dict: The stored result, or None if the PDF has not been processed with the current configuration.
+        """
+
+        store = get_result_store()
+        if store is None:
+            return None
+        return store.get_result(hash_file(pdf_path), self.fingerprint())
 
     # @staticmethod
     # def init_extraction_model():
@@ -34,254 +147,312 @@ class ExtractionEngine:
 
     @staticmethod
     def init_extraction_model():
-        return {
-    "booking_details": {
-      "booking_number":  {},
-      "service_contract_number": {}
-    },
-    "shipment_route": {
-      "origin": {
-        "location": {},
-        "terminal": {}
-      },
-      "destination": {
-        "location": {},
-        "terminal": {}
-      },
-      "transit_ports": [
-        {
-          "port_name": {},
-          "eta": {}
-        }
-      ]
-    },
-    "cargo_information": {
-      "cargo_type":  {},
-      "cargo_description": {},
-      "container_details": {
-        "quantity": {},
-        "size": {},
-        "type": {}
-      },
-      "total_weight": {}
-    },
-    "vessel_information": {
-      "vessel_name":  {},
-      "vessel_voyage": {},
-      "estimated_departure": {},
-      "estimated_arrival": {}
-    },
-    "parties_information": {
-      "shipper": {
-        "name": {},
-        "contact_details": {}
-      },
-      "carrier": {
-        "name": {},
-        "contact_details": {}
-      }
-    }
-}
-
-
-    def aggregate_sections(self, pages):
-        """
-        Aggregates text content from multiple pages into predefined sections.
-
-        This function processes a list of pages, isolates specific sections from each page using a language model,
-        and combines the content of the same sections across pages into a single aggregated result.
+        """
+        Loads the extraction model of the documents from the JSON schema set in the configuration.
+
+        Returns:
+            dict: The sections of the documents, mapping their fields to either an empty dictionary (a single
+                  answer), a dictionary of empty dictionaries (a subsection) or a list holding one such dictionary.
+        """
+
+        return load_extraction_model(ConfigUtility.EXTRACTION_SCHEMA_PATH)
+
+    def plan_translation(self, page):
+        """
+        Decides locally which parts of a page must be sent to the LLM for translation.
+
+        Pages that are mostly non-English are translated as a whole. Pages that are mostly English are split
+        into line blocks, and only the non-English blocks are translated.
 
         Args:
-            pages (list): A list of strings where each string represents the text content of a page.
+            page (str): The text content of the page.
 
         Returns:
-            dict: A dictionary where the keys are section names (defined in `self.extraction_model`)
-                  and the values are the aggregated text content for each section.
+            list: A list of (needs_translation, block_text) tuples which, joined with newlines, give back the page.
         """
 
-        try:
-            res = {}
-            sections = list(self.extraction_model.keys())
-            for page in pages:
-                _secs = self.llm_inst.isolate_sections(sections=sections, text=page)
-
-                for _sec in _secs:
-                    if _sec in res:
-                        res[_sec] += "\n" + _secs[_sec]
-                    else:
-                        res[_sec] = _secs[_sec]
+        if not self.local_language_detection or needs_translation(page, threshold=self.english_threshold,
+                                                                   label_phrases=self.english_labels):
+            return [(True, page)]
+        return split_blocks(page, threshold=self.english_threshold, label_phrases=self.english_labels)
 
-            return res
-        except Exception as e:
-            logger.error(f"Error aggregating sections: {e}")
+    @staticmethod
+    def join_translation(blocks, translations):
+        """
+        Puts a page back together from its blocks and the LLM translations of the non-English blocks.
+
+        The translation prompt drops the terms and conditions, so they are also dropped from the pages and
+        blocks kept as they are.
 
-    def process_booking_details(self, text, entire_text):
+        Args:
+            blocks (list): The (needs_translation, block_text) tuples returned by `plan_translation`.
+            translations (list): The LLM translation of each block, or None for the blocks kept as they are.
+
+        Returns:
+            dict: A dictionary with the language ("lang") and the English text ("text") of the page.
         """
-        Processes booking details from a given text.
 
-        This function extracts booking-related information by applying a named entity recognition (NER)
-        model to the provided section text and the entire text. It uses predefined questions
-        from the "booking_details" section of the extraction model to guide the extraction process.
+        if len(blocks) == 1 and blocks[0][0]:
+            return translations[0]
+
+        texts = []
+        for (flag, block), translation in zip(blocks, translations):
+            texts.append(translation.get("text", block) if flag else block)
+        lang = "English" if not any(flag for flag, _ in blocks) else "Mixed"
+        return {"lang": lang, "text": strip_terms("\n".join(texts))}
+
+    @timed("stage", stage="translate_page")
+    def translate_page(self, page):
+        """
+        Translates a page into English, passing English pages and line blocks straight through.
 
         Args:
-            text (str): The specific section text containing booking details.
-            entire_text (str): The full text from which the section was extracted.
+            page (str): The text content of the page.
 
         Returns:
-            dict: A dictionary containing the extracted booking details, where the keys are
-                  predefined questions and the values are the corresponding extracted information.
+            dict: A dictionary with the language ("lang") and the English text ("text") of the page.
         """
 
-        try:
-            logger.info("Processing booking details...")
-            questions = list(self.extraction_model["booking_details"].keys())
-            return self.ner_inst.process_section_l1(questions=questions, section_text=text, entire_text=entire_text)
-        except Exception as e:
-            logger.error(f"Error processing booking details: {e}")
+        blocks = self.plan_translation(page)
+        translations = [self.llm_inst.determine_language_and_translate(text=block) if flag else None
+                        for flag, block in blocks]
+        return self.join_translation(blocks, translations)
+
+    async def translate_page_async(self, page):
+        """
+        The asyncio counterpart of `translate_page`.
 
-    def process_shipment_route(self, text, entire_text):
+        Args:
+            page (str): The text content of the page.
+
+        Returns:
+            dict: A dictionary with the language ("lang") and the English text ("text") of the page.
         """
-        Processes shipment route information from a given text.
 
-        This function extracts details related to the shipment route, including the origin, destination,
-        and transit ports. It uses a named entity recognition (NER) model for structured extraction
-        of origin and destination details and a language model (LLM) to identify multiple answers
-        for transit ports.
+        async def _translate(flag, block):
+            if flag:
+                return await self.async_llm_inst.determine_language_and_translate(text=block)
+
+        blocks = self.plan_translation(page)
+        translations = await asyncio.gather(*[_translate(flag, block) for flag, block in blocks])
+        return self.join_translation(blocks, translations)
+
+    def use_combined_call(self, page):
+        """
+        Decides whether a page is translated and sectioned with a single LLM call.
 
         Args:
-            text (str): The specific section text containing shipment route details.
-            entire_text (str): The full text from which the section was extracted.
+            page (str): The text content of the page.
 
         Returns:
-            dict: A dictionary containing the following keys:
-                - "origin": Extracted details about the origin section.
-                - "destination": Extracted details about the destination section.
-                - "transit_ports": A list of answers with port names and estimated times of arrival (ETA).
+            bool: True if the combined mode is enabled and some part of the page needs translation.
         """
 
-        try:
-            logger.info("Processing shipment route...")
-            return {
-                "origin": self.ner_inst.process_section_l2(questions=list(self.extraction_model["shipment_route"]["origin"].keys()),
-                                                           sub_section="origin",
-                                                           section="shipment_route",
-                                                           section_text=text,
-                                                           entire_text=entire_text),
-                "destination": self.ner_inst.process_section_l2(questions=list(self.extraction_model["shipment_route"]["destination"].keys()),
-                                                                sub_section="destination",
-                                                                section="shipment_route",
-                                                                section_text=text,
-                                                                entire_text=entire_text),
-                "transit_ports": self.llm_inst.find_multiple_answers(question="What are port_name and eta of all the transit_ports?",
-                                                                     text=entire_text)
-            }
-        except Exception as e:
-            logger.error(f"Error processing shipment route: {e}")
+        return self.combined_translate_section and any(flag for flag, _ in self.plan_translation(page))
+
+    def validate_combined_sections(self, res):
+        """
+        Checks the response of a combined translate-and-section call.
 
-    def process_cargo_information(self, text, entire_text):
+        Args:
+            res (dict): The response of `translate_and_isolate_sections`.
+
+        Returns:
+            dict: The sections of the page, or None if the response is incomplete and the page must go
+                  through the separate translation and sectioning calls instead.
         """
-        Processes cargo information from a given text.
 
-        This function extracts cargo-related details such as cargo type, description,
-        total weight, and container details. It uses a named entity recognition (NER)
-        model for structured extraction of these elements.
+        sections = res.get("sections") if isinstance(res, dict) else None
+        if not isinstance(sections, dict):
+            logger.info("Combined translate-and-section response has no sections, falling back to two calls.")
+            return None
+
+        missing = [sec for sec in self.extraction_model if not isinstance(sections.get(sec), str)]
+        if missing:
+            logger.info(f"Combined translate-and-section response is missing {missing}, falling back to two calls.")
+            return None
+        return {sec: sections[sec] for sec in self.extraction_model}
+
+    def split_page_locally(self, translated_page):
+        """
+        Isolates the sections of a translated page with the local rule-based splitter.
 
         Args:
-            text (str): The specific section text containing cargo information.
-            entire_text (str): The full text from which the section was extracted.
+            translated_page (dict): The language ("lang") and the English text ("text") of the page.
 
         Returns:
-            dict: A dictionary containing the following keys:
-                - "cargo_type": The type of cargo.
-                - "cargo_description": A description of the cargo.
-                - "container_details": Detailed information about the cargo containers.
-                - "total_weight": The total weight of the cargo.
+            dict: The sections of the page, or None if local sectioning is disabled or its coverage score is
+                  below the threshold and the page must be sent to the LLM instead.
         """
 
-        try:
-            logger.info("Processing cargo information...")
-            questions = ["cargo_type", "cargo_description", "total_weight"]
-            answers = self.ner_inst.process_section_l1(questions=questions, section_text=text, entire_text=entire_text)
-
-            cargo_doc = {
-                "cargo_type": answers["cargo_type"],
-                "cargo_description": answers["cargo_description"],
-                "container_details": self.ner_inst.process_section_l2(questions=list(self.extraction_model["cargo_information"]["container_details"].keys()),
-                                                                      sub_section="container_details",
-                                                                      section="cargo_information",
-                                                                      section_text=text,
-                                                                      entire_text=entire_text),
-                "total_weight": answers["total_weight"]
-            }
-
-            return cargo_doc
-        except Exception as e:
-            logger.error(f"Error processing cargo information: {e}")
+        if not self.local_sectioning:
+            return None
+
+        text = translated_page.get("text", "") if isinstance(translated_page, dict) else str(translated_page)
+        sections, score = split_sections(text, self.extraction_model, keywords=self.section_keywords)
+        if score < self.sectioning_threshold:
+            logger.info(f"Local sectioning coverage {score:.2f} is below {self.sectioning_threshold}, "
+                        f"isolating the sections with the LLM.")
+            inc("local_sectioning", result="rejected")
+            return None
+        inc("local_sectioning", result="accepted")
+        return sections
+
+    @timed("stage", stage="process_page")
+    def process_page(self, page):
+        """
+        Translates a single page if needed and isolates its sections.
+
+        The sections are isolated by the local splitter when its coverage score is high enough, and by the LLM
+        otherwise. In the combined mode, a page that needs translation is translated and sectioned with one LLM call,
+        falling back to the separate calls if the response is incomplete.
+
+        Args:
+            page (str): The text content of the page.
 
-    def process_vessel_information(self, text, entire_text):
+        Returns:
+            dict: A dictionary mapping the section names to the text of that section on this page.
         """
-        Processes vessel information from a given text.
 
-        This function extracts vessel-related details such as vessel name, voyage,
-        and estimated timings. It uses a named entity recognition (NER) model
-        to process the section text based on predefined questions.
+        sections = list(self.extraction_model.keys())
+        if self.use_combined_call(page):
+            try:
+                res = self.validate_combined_sections(self.llm_inst.translate_and_isolate_sections(sections=sections,
+                                                                                                   text=page))
+                if res is not None:
+                    return res
+            except Exception as e:
+                logger.error(f"Error in combined translate-and-section call, falling back to two calls: {e}")
+
+        translated_page = self.translate_page(page)
+        local_sections = self.split_page_locally(translated_page)
+        if local_sections is not None:
+            return local_sections
+        return self.llm_inst.isolate_sections(sections=sections, text=translated_page)
+
+    async def process_page_async(self, page):
+        """
+        The asyncio counterpart of `process_page`.
 
         Args:
-            text (str): The specific section text containing vessel information.
-            entire_text (str): The full text from which the section was extracted.
+            page (str): The text content of the page.
 
         Returns:
-            dict: A dictionary containing the extracted vessel information,
-                  where the keys are predefined questions from the "vessel_information" section
-                  of the extraction model and the values are the corresponding extracted data.
+            dict: A dictionary mapping the section names to the text of that section on this page.
         """
 
-        try:
-            logger.info("Processing vessel information...")
-            return self.ner_inst.process_section_l1(questions=list(self.extraction_model["vessel_information"].keys()),
-                                                    section_text=text,
-                                                    entire_text=entire_text)
-        except Exception as e:
-            logger.error(f"Error processing vessel information: {e}")
+        sections = list(self.extraction_model.keys())
+        if self.use_combined_call(page):
+            try:
+                res = self.validate_combined_sections(
+                    await self.async_llm_inst.translate_and_isolate_sections(sections=sections, text=page))
+                if res is not None:
+                    return res
+            except Exception as e:
+                logger.error(f"Error in combined translate-and-section call, falling back to two calls: {e}")
+
+        translated_page = await self.translate_page_async(page)
+        local_sections = self.split_page_locally(translated_page)
+        if local_sections is not None:
+            return local_sections
+        return await self.async_llm_inst.isolate_sections(sections=sections, text=translated_page)
 
-    def process_parties_information(self, text, entire_text):
+    @staticmethod
+    def iter_pages(pdf_path, pdf_hash=None, pages=None):
         """
-        Processes parties information from a given text.
+        Yields the text of each page of a PDF, reusing the text stored for the same PDF bytes if any.
 
-        This function extracts details about the shipper and carrier involved in the shipment.
-        It uses a named entity recognition (NER) model to process and retrieve structured information
-        for each party based on predefined questions.
+        Pages that cannot be parsed are logged with their number and yielded as empty strings, and the text of
+        a PDF with such pages is not stored, so that it is extracted again next time.
 
         Args:
-            text (str): The specific section text containing parties information.
-            entire_text (str): The full text from which the section was extracted.
+            pdf_path (str): The file path to the PDF document.
+            pdf_hash (str, optional): The hash of the PDF bytes. Without it, the store is not used.
+            pages (str, optional): The pages to extract, such as "1-3,7". The store is only used for whole documents.
+
+        Yields:
+            str: The extracted text of each page, in page order.
+        """
+
+        store = get_result_store() if pdf_hash is not None and pages is None else None
+        stored_pages = store.get_pages(pdf_hash) if store is not None else None
+        if stored_pages is not None:
+            logger.info(f"Using the stored text of the PDF: {pdf_path}")
+            inc("stored_pages", len(stored_pages))
+            yield from stored_pages
+            return
+
+        texts, errors = [], 0
+        for page in iter_pdf_pages(pdf_path, pages=pages):
+            if page.error is not None:
+                logger.error(f"Page {page.number} of {pdf_path} could not be extracted: {page.error}")
+                errors += 1
+                inc("pdf_page_errors")
+            inc("pdf_pages")
+            if store is not None:
+                texts.append(page.text)
+            yield page.text
+        if store is not None and not errors:
+            store.set_pages(pdf_hash, texts)
+
+    @timed("stage", stage="process_pages")
+    def process_pages(self, pdf_path, pdf_hash=None):
+        """
+        Extracts, translates and sections the pages of a PDF as a pipeline.
+
+        Each page is handed to a pool of `self.page_concurrency` workers as soon as it has been extracted, and
+        moves through translation and sectioning on its own, so the pages are processed concurrently instead
+        of waiting for every page to be translated before any is sectioned.
+
+        Args:
+            pdf_path (str): The file path to the PDF document.
+            pdf_hash (str, optional): The hash of the PDF bytes, used to reuse the stored page text.
 
         Returns:
-            dict: A dictionary containing the following keys:
-                - "shipper": Extracted details about the shipper.
-                - "carrier": Extracted details about the carrier.
+            list: A list of dictionaries, one per page in page order, mapping section names to their text.
         """
 
-        try:
-            logger.info("Processing parties information...")
-            return {
-                "shipper": self.ner_inst.process_section_l2(questions=list(self.extraction_model["parties_information"]["shipper"].keys()),
-                                                            sub_section="shipper",
-                                                            section="parties_information",
-                                                            section_text=text,
-                                                            entire_text=entire_text),
-                "carrier": self.ner_inst.process_section_l2(questions=list(self.extraction_model["parties_information"]["carrier"].keys()),
-                                                            sub_section="carrier",
-                                                            section="parties_information",
-                                                            section_text=text,
-                                                            entire_text=entire_text)
+        with ThreadPoolExecutor(max_workers=self.page_concurrency) as executor:
+            futures = [submit(executor, self.process_page, page) for page in self.iter_pages(pdf_path, pdf_hash)]
+            return [future.result() for future in futures]
 
-            }
-        except Exception as e:
-            logger.error(f"Error processing parties information: {e}")
+    @staticmethod
+    def merge_sections(page_sections):
+        """
+        Combines the sections isolated from each page, in page order.
 
+        Args:
+            page_sections (list): A list of dictionaries, one per page, mapping section names to their text.
 
+        Returns:
+            dict: A dictionary mapping each section name to the text of that section across all pages.
+        """
 
+        res = {}
+        for _secs in page_sections:
+            for _sec in _secs:
+                if _sec in res:
+                    res[_sec] += "\n" + _secs[_sec]
+                else:
+                    res[_sec] = _secs[_sec]
+        return res
+
+    def collect_ner_queries(self, agg_sections):
+        """
+        Collects the NER queries for every leaf field of the extraction model across all sections.
+
+        List fields (such as the transit ports) are skipped, as they are answered by the language model.
+
+        Args:
+            agg_sections (dict): A dictionary mapping section names to their aggregated text.
+
+        Returns:
+            list: A list of (path, question, section_text) tuples in `self.plan.leaf_fields` order, where path
+                  is the tuple of keys locating the field in the output document.
+        """
+
+        return [(leaf.path, question, text)
+                for leaf, (question, text) in zip(self.plan.leaf_fields, self.plan.ner_queries(agg_sections))]
 
     # def process_pdf_v1(self, pdf_path):
     #     pages = extract_text_from_pdf(pdf_path)
@@ -302,7 +473,179 @@ class ExtractionEngine:
     #     return final_doc
 
 
-    def process_pdf(self, pdf_path):
+    @timed("stage", stage="predict_sections")
+    def predict_sections(self, agg_sections):
+        """
+        Runs the batched NER pass over the questions of all sections, without the LLM fallbacks.
+
+        Args:
+            agg_sections (dict): A dictionary mapping section names to their aggregated text.
+
+        Returns:
+            list: A list of (path, question, prediction) tuples in `self.plan.leaf_fields` order, where
+                  prediction is None when the LLM must be used as a fallback.
+        """
+
+        queries = self.collect_ner_queries(agg_sections)
+        predictions = self.ner_inst.predict_questions([(question, text) for _, question, text in queries],
+                                                      fields=[path for path, _, _ in queries])
+        return [(path, question, pred) for (path, question, _), pred in zip(queries, predictions)]
+
+    def resolve_section(self, section, ner_predictions, entire_text):
+        """
+        Builds the output of one section from the NER predictions, answering its low-confidence fields with the LLM.
+
+        Args:
+            section (str): The name of the section to be resolved.
+            ner_predictions (list): The (path, question, prediction) tuples returned by `predict_sections`.
+            entire_text (str): The full text of the document.
+
+        Returns:
+            dict: The extracted section, structured as per `self.extraction_model`, without the list fields,
+                  or None if it could not be resolved. The other sections are not affected.
+        """
+
+        try:
+            with timed("stage", stage="resolve_section", section=section):
+                indices = self.plan.section_fields[section]
+                answers = self.ner_inst.resolve_predictions(questions=[ner_predictions[idx][1] for idx in indices],
+                                                            predictions=[ner_predictions[idx][2] for idx in indices],
+                                                            entire_text=entire_text)
+                return self.plan.build_section(section, answers)
+        except Exception as e:
+            logger.error(f"Error processing {section}: {e}")
+
+    async def resolve_section_async(self, section, ner_predictions, entire_text):
+        """
+        The asyncio counterpart of `resolve_section`.
+
+        Args:
+            section (str): The name of the section to be resolved.
+            ner_predictions (list): The (path, question, prediction) tuples returned by `predict_sections`.
+            entire_text (str): The full text of the document.
+
+        Returns:
+            dict: The extracted section, structured as per `self.extraction_model`, without the list fields,
+                  or None if it could not be resolved. The other sections are not affected.
+        """
+
+        try:
+            with timed("stage", stage="resolve_section", section=section):
+                indices = self.plan.section_fields[section]
+                answers = await self.ner_inst.resolve_predictions_async(
+                    questions=[ner_predictions[idx][1] for idx in indices],
+                    predictions=[ner_predictions[idx][2] for idx in indices],
+                    entire_text=entire_text)
+                return self.plan.build_section(section, answers)
+        except Exception as e:
+            logger.error(f"Error processing {section}: {e}")
+
+    def store_result(self, store, pdf_hash, pdf_path, doc):
+        """
+        Stores the result of a document, unless part of it failed.
+
+        A section or list field that failed (for example because the LLM was unavailable) is None in the
+        result. Such a result is not stored, so that the document is processed again next time instead of
+        serving the failure for as long as the store is kept.
+
+        Args:
+            store (ResultStore): The result store.
+            pdf_hash (str): The hash of the PDF bytes.
+            pdf_path (str): The file path to the PDF document, for logging.
+            doc (dict): The extracted document.
+        """
+
+        if not self.plan.is_complete(doc):
+            logger.warning(f"Not storing the result of the PDF, as part of it failed: {pdf_path}")
+            inc("incomplete_results")
+            return
+        store.set_result(pdf_hash, self.fingerprint(), doc)
+
+    @staticmethod
+    def attach_metrics(doc, metrics):
+        """
+        Adds the metrics of a document to its result as a `_metrics` block, if enabled in the configuration.
+
+        Args:
+            doc (dict): The extracted document.
+            metrics (Metrics): The metrics collected while processing it.
+
+        Returns:
+            dict: The document, with its metrics if enabled. The stored result is left unchanged.
+        """
+
+        if not ConfigUtility.METRICS_IN_OUTPUT:
+            return doc
+        return {**doc, "_metrics": metrics.to_dict()}
+
+    def build_task_graph(self):
+        """
+        Describes the processing of a PDF as a graph of tasks.
+
+        The list fields of the plan, such as the transit ports, are searched as soon as the entire text is
+        known, in parallel with the NER pass, and the sections then resolve their low-confidence fields in
+        parallel, so the latency of a document is set by its slowest section.
+
+        Returns:
+            TaskGraph: The graph, to be run with the `pdf_path` and `pdf_hash` inputs. Its "document" task holds the result.
+        """
+
+        graph = TaskGraph()
+        graph.add_task("page_sections", self.process_pages, ["pdf_path", "pdf_hash"])
+        graph.add_task("agg_sections", self.merge_sections, ["page_sections"])
+        graph.add_task("entire_text", self.plan.entire_text, ["agg_sections"])
+
+        # List fields are named by their dotted path, which never clashes with the name of a section.
+        list_tasks = {".".join(field.path): field for field in self.plan.list_fields}
+        for name, field in list_tasks.items():
+            graph.add_task(name, partial(self.find_list_field, field.question), ["entire_text"])
+        graph.add_task("ner_predictions", self.predict_sections, ["agg_sections"])
+
+        for section in self.plan.sections:
+            graph.add_task(section, partial(self.resolve_section, section), ["ner_predictions", "entire_text"])
+
+        def _build_document(**results):
+            return self.plan.assemble(section_docs={section: results[section] for section in self.plan.sections},
+                                      list_answers={field.path: results[name] for name, field in list_tasks.items()})
+
+        graph.add_task("document", _build_document, list(list_tasks) + self.plan.sections)
+        return graph
+
+    def find_list_field(self, question, entire_text):
+        """
+        Answers a list field of the plan, such as the transit ports, with the LLM.
+
+        Args:
+            question (str): The question compiled for the field.
+            entire_text (str): The full text of the document.
+
+        Returns:
+            list: The items found, each holding the item fields of the list, or None if the search failed.
+        """
+
+        try:
+            return self.llm_inst.find_multiple_answers(question=question, text=entire_text)
+        except Exception as e:
+            logger.error(f"Error finding the answers to '{question}': {e}")
+
+    async def find_list_field_async(self, question, entire_text):
+        """
+        The asyncio counterpart of `find_list_field`.
+
+        Args:
+            question (str): The question compiled for the field.
+            entire_text (str): The full text of the document.
+
+        Returns:
+            list: The items found, each holding the item fields of the list, or None if the search failed.
+        """
+
+        try:
+            return await self.async_llm_inst.find_multiple_answers(question=question, text=entire_text)
+        except Exception as e:
+            logger.error(f"Error finding the answers to '{question}': {e}")
+
+    def process_pdf(self, pdf_path, raise_errors=False):
         """
         Processes a PDF document to extract and structure relevant shipment-related information.
 
@@ -312,6 +655,7 @@ class ExtractionEngine:
 
         Args:
             pdf_path (str): The file path to the PDF document.
+            raise_errors (bool): Whether errors are raised to the caller instead of being logged.
 
         Returns:
             dict: A dictionary containing the following keys:
@@ -323,32 +667,96 @@ class ExtractionEngine:
 
         Steps:
             1. Extracts text from the PDF file.
-            2. Translates each page if needed.
-            3. Aggregates the text into predefined sections.
-            4. Processes each section to extract relevant information.
+            2. Translates each page if needed and isolates its sections, pipelining the pages concurrently.
+            3. Aggregates the sections of all pages in page order.
+            4. Runs a single batched NER pass over all sections while the LLM answers the list fields.
+            5. Resolves the sections in parallel, falling back to the LLM for low-confidence answers.
+
+        The steps are run as the task graph described by `build_task_graph`. If the same PDF bytes have
+        already been processed with the same configuration, the stored result is returned instead.
+        """
+
+        try:
+            with collect_metrics() as metrics:
+                with timed("document"):
+                    logger.info(f"Processing PDF: {pdf_path}")
+                    store = get_result_store()
+                    pdf_hash = hash_file(pdf_path) if store is not None else None
+                    doc = store.get_result(pdf_hash, self.fingerprint()) if store is not None else None
+                    if doc is not None:
+                        logger.info(f"Using the stored result of the PDF: {pdf_path}")
+                        inc("result_store_hits")
+                    else:
+                        doc = self.build_task_graph().run(pdf_path=pdf_path, pdf_hash=pdf_hash)["document"]
+                        if store is not None:
+                            self.store_result(store, pdf_hash, pdf_path, doc)
+                inc("documents")
+                return self.attach_metrics(doc, metrics)
+        except Exception as e:
+            inc("document_errors")
+            if raise_errors:
+                raise
+            logger.error(f"Error processing PDF: {e}")
+
+    async def process_pdf_async(self, pdf_path, raise_errors=False):
+        """
+        The asyncio counterpart of `process_pdf`.
+
+        Every page is translated and sectioned on its own, all pages concurrently, the low-confidence answers
+        are awaited concurrently, and the list fields are answered while the NER pass is running. Many documents
+        can be processed at the same time on one event loop, sharing the connection pool of the async client.
+
+        Args:
+            pdf_path (str): The file path to the PDF document.
+            raise_errors (bool): Whether errors are raised to the caller instead of being logged.
+
+        Returns:
+            dict: The same structure as returned by `process_pdf`.
         """
 
         try:
-            logger.info(f"Processing PDF: {pdf_path}")
-            pages = extract_text_from_pdf(pdf_path)
-
-            translated_pages = [self.llm_inst.determine_language_and_translate(text=page) for page in pages]
-
-            agg_sections = self.aggregate_sections(pages=translated_pages)
-
-            entire_text = "\n".join(value for value in agg_sections.values())
-
-            return {
-                "booking_details": self.process_booking_details(text=agg_sections["booking_details"],
-                                                                entire_text=entire_text),
-                "shipment_route": self.process_shipment_route(text=agg_sections["shipment_route"],
-                                                              entire_text=entire_text),
-                "cargo_information": self.process_cargo_information(text=agg_sections["cargo_information"],
-                                                                    entire_text=entire_text),
-                "vessel_information": self.process_vessel_information(text=agg_sections["vessel_information"],
-                                                                      entire_text=entire_text),
-                "parties_information": self.process_parties_information(text=agg_sections["parties_information"],
-                                                                        entire_text=entire_text)
-            }
+            with collect_metrics() as metrics:
+                with timed("document"):
+                    logger.info(f"Processing PDF: {pdf_path}")
+                    store = get_result_store()
+                    pdf_hash = await asyncio.to_thread(hash_file, pdf_path) if store is not None else None
+                    doc = store.get_result(pdf_hash, self.fingerprint()) if store is not None else None
+                    if doc is not None:
+                        logger.info(f"Using the stored result of the PDF: {pdf_path}")
+                        inc("result_store_hits")
+                    else:
+                        doc = await self._process_pdf_async(pdf_path, pdf_hash)
+                        if store is not None:
+                            self.store_result(store, pdf_hash, pdf_path, doc)
+                inc("documents")
+                return self.attach_metrics(doc, metrics)
         except Exception as e:
+            inc("document_errors")
+            if raise_errors:
+                raise
             logger.error(f"Error processing PDF: {e}")
+
+    async def _process_pdf_async(self, pdf_path, pdf_hash):
+        pages = await asyncio.to_thread(lambda: list(self.iter_pages(pdf_path, pdf_hash)))
+
+        page_sections = await asyncio.gather(*[self.process_page_async(page) for page in pages])
+
+        agg_sections = self.merge_sections(page_sections)
+
+        entire_text = self.plan.entire_text(agg_sections)
+
+        list_tasks = [asyncio.create_task(self.find_list_field_async(field.question, entire_text))
+                      for field in self.plan.list_fields]
+        try:
+            ner_predictions = await asyncio.to_thread(self.predict_sections, agg_sections)
+            section_docs = await asyncio.gather(*[self.resolve_section_async(section, ner_predictions, entire_text)
+                                                  for section in self.plan.sections])
+            list_answers = await asyncio.gather(*list_tasks)
+        finally:
+            # If the NER pass fails, the list fields still being answered are cancelled rather than left running.
+            for task in list_tasks:
+                task.cancel()
+            await asyncio.gather(*list_tasks, return_exceptions=True)
+        return self.plan.assemble(section_docs=dict(zip(self.plan.sections, section_docs)),
+                                  list_answers={field.path: answer
+                                                for field, answer in zip(self.plan.list_fields, list_answers)})
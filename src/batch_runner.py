@@ -0,0 +1,172 @@
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from src.config import ConfigUtility
+from src.Extraction_engine import ExtractionEngine
+from src.utils.cassette_utils import read_unmatched, unmatched_path
+from src.utils.metrics_utils import Metrics, collect_metrics
+from src.utils.model_registry import preload_models
+from src.utils.rate_limiter import set_rate_limiter_share
+
+logger = logging.getLogger(__name__)
+
+_worker_engine = None
+
+
+def collect_pdf_paths(inputs):
+    """
+    Resolves the inputs of a batch run into a list of PDF paths.
+
+    Each input may be a PDF file, a directory (searched recursively for PDFs), a glob pattern, or a
+    manifest file: a `.txt` file with one path per line or a `.jsonl` file with a "path" key per line.
+    Relative paths inside a manifest are resolved against the directory of the manifest.
+
+    Args:
+        inputs (list): The inputs given on the command line.
+
+    Returns:
+        list: The PDF paths, without duplicates, in the order they were found.
+    """
+
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            paths.extend(sorted(glob.glob(os.path.join(item, "**", "*.pdf"), recursive=True)))
+        elif item.endswith((".txt", ".jsonl")) and os.path.isfile(item):
+            base_dir = os.path.dirname(os.path.abspath(item))
+            with open(item, "r", encoding="utf-8") as manifest:
+                for line in manifest:
+                    line = line.strip()
+                    if not line or line.startswith("#"):
+                        continue
+                    path = json.loads(line)["path"] if item.endswith(".jsonl") else line
+                    paths.append(path if os.path.isabs(path) else os.path.join(base_dir, path))
+        elif os.path.isfile(item):
+            paths.append(item)
+        else:
+            matches = sorted(glob.glob(item, recursive=True))
+            if not matches:
+                logger.warning(f"No PDF found for input: {item}")
+            paths.extend(matches)
+
+    return list(dict.fromkeys(paths))
+
+
+def _init_worker(workers):
+    global _worker_engine
+    # The workers share the rate limits of the API key.
+    set_rate_limiter_share(1 / workers)
+    _worker_engine = ExtractionEngine()
+    _worker_engine.warm_up()
+
+
+def _process_document(pdf_path, engine=None):
+    engine = engine or _worker_engine
+    start = time.perf_counter()
+    with collect_metrics() as metrics:
+        try:
+            result = engine.process_pdf(pdf_path=pdf_path, raise_errors=True)
+            record = {"pdf_path": pdf_path, "status": "ok", "result": result}
+        except Exception as e:
+            record = {"pdf_path": pdf_path, "status": "error", "error": f"{type(e).__name__}: {e}"}
+    # The metrics go back to the parent process with the record, and are removed before it is written.
+    return {**record, "elapsed_seconds": round(time.perf_counter() - start, 3), "_metrics": metrics.to_dict()}
+
+
+def run_batch(pdf_paths, output_path, workers=1, executor="process"):
+    """
+    Processes a list of PDFs with a pool of workers and streams the results to a JSONL file.
+
+    With the "process" executor every worker process builds its own `ExtractionEngine` once and reuses it
+    for all its documents; where the platform can fork, the GLiNER model is loaded before the workers are
+    started so that they all share its weights. With the "thread" executor all the threads share a single
+    engine. The model is warmed up before the first document in both cases. A line is written to the
+    output as soon as a document finishes, holding either its result or its error, including the errors
+    of a worker that died. The metrics of the documents are added up, and written to the configured
+    Prometheus file after each document.
+
+    Args:
+        pdf_paths (list): The PDF paths to be processed.
+        output_path (str): The path of the JSONL file the results are appended to.
+        workers (int): The number of worker processes or threads.
+        executor (str): Either "process" or "thread".
+
+    Returns:
+        dict: A summary with the number of "documents", "succeeded" and "failed" documents, the
+              "elapsed_seconds" of the run, its throughput in "documents_per_second", and the
+              "ner_fallback_rate" and "llm_cache_hit_rate" of the run when they are defined. Replayed runs
+              also report the number of "unmatched_llm_requests" missing from the cassette.
+    """
+
+    total = len(pdf_paths)
+    succeeded = failed = 0
+    run_metrics = Metrics()
+    replaying = ConfigUtility.LLM_CASSETTE_MODE == "replay"
+    if replaying and os.path.exists(unmatched_path(ConfigUtility.LLM_CASSETTE_PATH)):
+        # The workers append the requests missing from the cassette to this report.
+        os.remove(unmatched_path(ConfigUtility.LLM_CASSETTE_PATH))
+    start = time.perf_counter()
+
+    if executor == "process":
+        mp_context = None
+        if ConfigUtility.NER_PRELOAD and "fork" in multiprocessing.get_all_start_methods():
+            # The workers are forked after the model is loaded, so they share its weights copy-on-write.
+            preload_models()
+            mp_context = multiprocessing.get_context("fork")
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(workers,),
+                                   mp_context=mp_context)
+        submit = lambda path: pool.submit(_process_document, path)
+    elif executor == "thread":
+        engine = ExtractionEngine()
+        engine.warm_up()
+        pool = ThreadPoolExecutor(max_workers=workers)
+        submit = lambda path: pool.submit(_process_document, path, engine)
+    else:
+        raise ValueError(f"Unknown executor: {executor}")
+
+    logger.info(f"Processing {total} PDFs with {workers} {executor} workers...")
+    with pool, open(output_path, "a", encoding="utf-8") as output:
+        futures = {submit(path): path for path in pdf_paths}
+        for done, future in enumerate(as_completed(futures), start=1):
+            try:
+                record = future.result()
+            except Exception as e:
+                # The worker itself failed (for example a process killed by the OS breaks the pool), so the
+                # document gets an error record and the other documents are still drained.
+                record = {"pdf_path": futures[future], "status": "error", "error": f"{type(e).__name__}: {e}",
+                          "elapsed_seconds": None}
+            if "_metrics" in record:
+                run_metrics.merge(record.pop("_metrics"))
+            if ConfigUtility.METRICS_PROMETHEUS_PATH:
+                run_metrics.write_prometheus(ConfigUtility.METRICS_PROMETHEUS_PATH)
+            output.write(json.dumps(record, ensure_ascii=False) + "\n")
+            output.flush()
+
+            if record["status"] == "ok":
+                succeeded += 1
+            else:
+                failed += 1
+                logger.error(f"Failed to process {record['pdf_path']}: {record['error']}")
+
+            elapsed = time.perf_counter() - start
+            logger.info(f"[{done}/{total}] {record['status']} {record['pdf_path']} "
+                        f"({record['elapsed_seconds']}s, {done / elapsed:.2f} docs/s)")
+
+    elapsed = time.perf_counter() - start
+    summary = {
+        "documents": total,
+        "succeeded": succeeded,
+        "failed": failed,
+        "elapsed_seconds": round(elapsed, 3),
+        "documents_per_second": round(total / elapsed, 3) if elapsed else 0.0,
+        **run_metrics.derived(),
+    }
+    if replaying:
+        summary["unmatched_llm_requests"] = len(read_unmatched(ConfigUtility.LLM_CASSETTE_PATH))
+    logger.info(f"Batch finished: {summary}")
+    return summary
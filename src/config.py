@@ -9,4 +9,68 @@ class ConfigUtility:
     OPENAI_API_KEY = config.get('OPENAI', 'open_ai_api_key')
 
     GROQ_API_KEY = config.get('GROQ', 'groq_api_key')
-    GROQ_MODEL = "llama3-8b-8192"
\ No newline at end of file
+    GROQ_MODEL = "llama3-8b-8192"
+    GROQ_BASE_URL = config.get('GROQ', 'base_url', fallback='') or None
+    GROQ_MAX_CONCURRENCY = config.getint('GROQ', 'max_concurrency', fallback=4)
+    GROQ_MAX_CONNECTIONS = config.getint('GROQ', 'max_connections', fallback=20)
+    GROQ_REQUESTS_PER_MINUTE = config.getint('GROQ', 'requests_per_minute', fallback=30)
+    GROQ_TOKENS_PER_MINUTE = config.getint('GROQ', 'tokens_per_minute', fallback=30000)
+    GROQ_COMPLETION_TOKENS_ESTIMATE = config.getint('GROQ', 'completion_tokens_estimate', fallback=512)
+    GROQ_MAX_RETRIES = config.getint('GROQ', 'max_retries', fallback=5)
+    GROQ_RETRY_BASE_DELAY = config.getfloat('GROQ', 'retry_base_delay', fallback=1.0)
+    GROQ_RETRY_MAX_DELAY = config.getfloat('GROQ', 'retry_max_delay', fallback=60.0)
+    GROQ_BATCH_FALLBACK = config.getboolean('GROQ', 'batch_fallback', fallback=True)
+    GROQ_BATCH_FALLBACK_SIZE = config.getint('GROQ', 'batch_fallback_size', fallback=10)
+
+    GLINER_MODEL = config.get('NER', 'model', fallback='knowledgator/gliner-multitask-v1.0')
+    NER_BACKEND = config.get('NER', 'backend', fallback='torch')
+    NER_ONNX_DIR = config.get('NER', 'onnx_dir', fallback='.cache/onnx')
+    NER_THRESHOLD = config.getfloat('NER', 'threshold', fallback=0.9)
+    NER_BATCH_SIZE = config.getint('NER', 'batch_size', fallback=8)
+    NER_WARM_UP = config.getboolean('NER', 'warm_up', fallback=True)
+    NER_PRELOAD = config.getboolean('NER', 'preload', fallback=True)
+    NER_MAX_WORDS = config.getint('NER', 'max_words', fallback=0)
+    NER_WINDOW_OVERLAP = config.getint('NER', 'window_overlap', fallback=64)
+
+    NER_SERVER_ENABLED = config.getboolean('NER_SERVER', 'enabled', fallback=False)
+    NER_SERVER_URL = config.get('NER_SERVER', 'url', fallback='http://127.0.0.1:8765')
+    NER_SERVER_REPLICAS = config.getint('NER_SERVER', 'replicas', fallback=1)
+    NER_SERVER_MAX_BATCH_SIZE = config.getint('NER_SERVER', 'max_batch_size', fallback=16)
+    NER_SERVER_MAX_WAIT_MS = config.getfloat('NER_SERVER', 'max_wait_ms', fallback=10)
+    NER_SERVER_WAIT_TIMEOUT = config.getfloat('NER_SERVER', 'wait_timeout', fallback=50)
+    NER_SERVER_TIMEOUT = config.getfloat('NER_SERVER', 'timeout', fallback=60)
+
+    EXTRACTION_SCHEMA_PATH = os.path.join(os.path.dirname(__file__), 'config',
+                                          config.get('PIPELINE', 'schema', fallback='booking_confirmation.json'))
+    PAGE_CONCURRENCY = config.getint('PIPELINE', 'page_concurrency', fallback=4)
+    LOCAL_LANGUAGE_DETECTION = config.getboolean('PIPELINE', 'local_language_detection', fallback=True)
+    ENGLISH_THRESHOLD = config.getfloat('PIPELINE', 'english_threshold', fallback=0.5)
+    COMBINED_TRANSLATE_SECTION = config.getboolean('PIPELINE', 'combined_translate_section', fallback=False)
+    LOCAL_SECTIONING = config.getboolean('PIPELINE', 'local_sectioning', fallback=True)
+    SECTIONING_THRESHOLD = config.getfloat('PIPELINE', 'sectioning_threshold', fallback=0.7)
+    PATTERN_EXTRACTION = config.getboolean('PIPELINE', 'pattern_extraction', fallback=True)
+
+    PDF_WORKERS = config.getint('PDF', 'workers', fallback=4)
+    PDF_PARALLEL_MIN_PAGES = config.getint('PDF', 'parallel_min_pages', fallback=30)
+    PDF_CHUNK_PAGES = config.getint('PDF', 'chunk_pages', fallback=10)
+
+    LLM_CACHE_ENABLED = config.getboolean('CACHE', 'llm_cache_enabled', fallback=True)
+    LLM_CACHE_PATH = config.get('CACHE', 'llm_cache_path', fallback='.cache/llm_cache.sqlite')
+    LLM_CACHE_MAX_ENTRIES = config.getint('CACHE', 'llm_cache_max_entries', fallback=10000)
+    LLM_CACHE_TTL_SECONDS = config.getint('CACHE', 'llm_cache_ttl_seconds', fallback=7 * 24 * 3600)
+
+    RESULT_CACHE_ENABLED = config.getboolean('CACHE', 'result_cache_enabled', fallback=True)
+    RESULT_CACHE_PATH = config.get('CACHE', 'result_cache_path', fallback='.cache/results.sqlite')
+
+    LLM_CASSETTE_MODE = config.get('CASSETTE', 'mode', fallback='off')
+    LLM_CASSETTE_PATH = config.get('CASSETTE', 'path', fallback='.cache/llm_cassette.jsonl')
+    LLM_CASSETTE_REPLAY_LATENCY = config.get('CASSETTE', 'replay_latency', fallback='original')
+
+    RETRIEVAL_ENABLED = config.getboolean('RETRIEVAL', 'enabled', fallback=True)
+    RETRIEVAL_TOP_K = config.getint('RETRIEVAL', 'top_k', fallback=4)
+    RETRIEVAL_TOKEN_BUDGET = config.getint('RETRIEVAL', 'token_budget', fallback=800)
+    RETRIEVAL_CHUNK_WORDS = config.getint('RETRIEVAL', 'chunk_words', fallback=60)
+    RETRIEVAL_OVERLAP_WORDS = config.getint('RETRIEVAL', 'overlap_words', fallback=15)
+
+    METRICS_IN_OUTPUT = config.getboolean('METRICS', 'attach_to_output', fallback=False)
+    METRICS_PROMETHEUS_PATH = config.get('METRICS', 'prometheus_path', fallback='') or None
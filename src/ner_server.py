@@ -0,0 +1,341 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from socketserver import ThreadingMixIn, UnixStreamServer
+from types import SimpleNamespace
+from urllib.parse import urlparse
+
+from src.config import ConfigUtility
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    Collects the texts sent by many concurrent callers into dynamic batches for a few GLiNER replicas.
+
+    Each replica is served by its own thread. A thread takes the oldest pending text, then waits at most
+    `max_wait` seconds for more until it holds `max_batch_size` texts, and runs them in one forward pass.
+    Texts asking for different labels are run in separate passes of the same batch. Callers wait at most
+    `timeout` seconds for their entities.
+    """
+
+    def __init__(self, models, max_batch_size, max_wait, timeout=None):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.timeout = timeout
+        self.queue = queue.Queue()
+
+        self._lock = threading.Lock()
+        self._running = len(models)
+        self._failure = None
+        self._metrics = {"requests": 0, "texts": 0, "batches": 0, "errors": 0, "max_queue_depth": 0,
+                         "wait_seconds": 0.0, "inference_seconds": 0.0}
+        self._workers = [threading.Thread(target=self._run, args=(model,), daemon=True) for model in models]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, texts, labels, timeout=None):
+        """
+        Queues texts for inference and waits for their entities.
+
+        Args:
+            texts (list): The input texts.
+            labels (list): The entity labels to predict.
+            timeout (float, optional): The maximum number of seconds to wait. Defaults to the timeout of the batcher.
+
+        Returns:
+            list: The predicted entities of each text, in the same order.
+
+        Raises:
+            TimeoutError: If the entities are not predicted in time. The texts still queued are dropped.
+            RuntimeError: If every replica thread has stopped on an error.
+        """
+
+        if self._failure is not None:
+            raise RuntimeError(f"The NER batcher has stopped: {self._failure}")
+
+        futures = []
+        for text in texts:
+            future = Future()
+            self.queue.put((text, tuple(labels), time.monotonic(), future))
+            futures.append(future)
+
+        with self._lock:
+            self._metrics["requests"] += 1
+            self._metrics["texts"] += len(texts)
+            self._metrics["max_queue_depth"] = max(self._metrics["max_queue_depth"], self.queue.qsize())
+        timeout = self.timeout if timeout is None else timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            return [future.result(timeout=None if deadline is None else max(deadline - time.monotonic(), 0))
+                    for future in futures]
+        except FuturesTimeoutError:
+            for future in futures:
+                future.cancel()
+            raise TimeoutError(f"No NER entities within {timeout} seconds") from None
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self.queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self, model):
+        batch = []
+        try:
+            self._serve(model, batch)
+        except Exception as e:
+            logger.error(f"NER replica thread stopped on an error: {e}")
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            with self._lock:
+                self._running -= 1
+                if self._running:
+                    return
+                self._failure = e
+            # No replica is left to serve the queue: fail every pending caller instead of leaving it waiting.
+            while True:
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not _STOP and item[3].set_running_or_notify_cancel():
+                    item[3].set_exception(e)
+
+    def _serve(self, model, batch):
+        while True:
+            first = self.queue.get()
+            if first is _STOP:
+                return
+            batch[:] = [first]
+            # Texts whose caller has given up are dropped.
+            batch[:] = [item for item in self._collect(first) if item[3].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            groups = {}
+            for item in batch:
+                groups.setdefault(item[1], []).append(item)
+
+            start = time.monotonic()
+            errors = 0
+            for labels, items in groups.items():
+                try:
+                    results = model.batch_predict_entities([text for text, *_ in items], list(labels))
+                    for (*_, future), res in zip(items, results):
+                        future.set_result(res)
+                except Exception as e:
+                    logger.error(f"Error while predicting NER labels for a batch of {len(items)} texts: {e}")
+                    errors += 1
+                    for *_, future in items:
+                        if not future.done():
+                            future.set_exception(e)
+
+            with self._lock:
+                self._metrics["batches"] += 1
+                self._metrics["errors"] += errors
+                self._metrics["wait_seconds"] += sum(start - queued_at for _, _, queued_at, _ in batch)
+                self._metrics["inference_seconds"] += time.monotonic() - start
+
+    def metrics(self):
+        """
+        Returns the counters of the batcher.
+
+        Returns:
+            dict: The current "queue_depth", its maximum, the number of "requests", "texts", "batches" and
+                  batch "errors", the "average_batch_size", and the average seconds a text waited in the queue
+                  ("average_wait_seconds") and a batch took to run ("average_inference_seconds").
+        """
+
+        with self._lock:
+            metrics = dict(self._metrics)
+        batches, texts = metrics["batches"], metrics["texts"]
+        return {
+            "queue_depth": self.queue.qsize(),
+            "max_queue_depth": metrics["max_queue_depth"],
+            "requests": metrics["requests"],
+            "texts": texts,
+            "batches": batches,
+            "errors": metrics["errors"],
+            "replicas": len(self._workers),
+            "average_batch_size": round(texts / batches, 3) if batches else 0.0,
+            "average_wait_seconds": round(metrics["wait_seconds"] / texts, 6) if texts else 0.0,
+            "average_inference_seconds": round(metrics["inference_seconds"] / batches, 6) if batches else 0.0,
+        }
+
+    def close(self):
+        for _ in self._workers:
+            self.queue.put(_STOP)
+        for worker in self._workers:
+            worker.join()
+
+
+class NerRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def address_string(self):
+        # Unix socket clients have no address.
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} - {format % args}")
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send_json(200, self.server.batcher.metrics())
+        elif self.path == "/info":
+            self._send_json(200, {"model": ConfigUtility.GLINER_MODEL, "backend": ConfigUtility.NER_BACKEND,
+                                  "max_len": self.server.max_len})
+        else:
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/predict":
+            self._send_json(404, {"error": f"Unknown path: {self.path}"})
+            return
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            results = self.server.batcher.submit(payload["texts"], payload["labels"])
+            self._send_json(200, {"results": results})
+        except Exception as e:
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+
+class ThreadingUnixHTTPServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+def load_replicas(count):
+    """
+    Loads the GLiNER replicas of the server. The first one is the process-wide model.
+
+    Args:
+        count (int): The number of replicas.
+
+    Returns:
+        list: The loaded models.
+    """
+
+    from src.utils.model_registry import get_gliner_model, load_gliner_model, warm_up_gliner_model
+
+    warm_up_gliner_model()
+    models = [get_gliner_model()]
+    for _ in range(count - 1):
+        model = load_gliner_model(ConfigUtility.GLINER_MODEL, ConfigUtility.NER_BACKEND)
+        model.batch_predict_entities(["What is the booking number?\nBooking number: ABC123"], ["answer"])
+        models.append(model)
+    return models
+
+
+def serve(url=None, replicas=None, max_batch_size=None, max_wait_ms=None):
+    """
+    Runs the NER inference server until it is interrupted.
+
+    Args:
+        url (str, optional): "http://127.0.0.1:<port>" or "unix:///path/to/socket". Defaults to the configured URL.
+        replicas (int, optional): The number of GLiNER replicas. Defaults to the configured number.
+        max_batch_size (int, optional): The maximum number of texts per batch.
+        max_wait_ms (float, optional): The maximum time a batch waits for more texts, in milliseconds.
+    """
+
+    url = urlparse(url or ConfigUtility.NER_SERVER_URL)
+    models = load_replicas(replicas or ConfigUtility.NER_SERVER_REPLICAS)
+    batcher = MicroBatcher(models, max_batch_size=max_batch_size or ConfigUtility.NER_SERVER_MAX_BATCH_SIZE,
+                           max_wait=(max_wait_ms or ConfigUtility.NER_SERVER_MAX_WAIT_MS) / 1000,
+                           timeout=ConfigUtility.NER_SERVER_WAIT_TIMEOUT)
+
+    if url.scheme == "unix":
+        if os.path.exists(url.path):
+            os.remove(url.path)
+        server = ThreadingUnixHTTPServer(url.path, NerRequestHandler)
+    else:
+        server = ThreadingHTTPServer((url.hostname, url.port), NerRequestHandler)
+    server.batcher = batcher
+    server.max_len = getattr(getattr(models[0], "config", None), "max_len", 384)
+
+    logger.info(f"NER server listening on {url.geturl()} with {len(models)} replicas...")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        batcher.close()
+        if url.scheme == "unix" and os.path.exists(url.path):
+            os.remove(url.path)
+
+
+class NerServiceClient:
+    """
+    A client of the NER inference server, usable by `NerModel` in place of a local GLiNER model.
+
+    It keeps a pool of connections shared by all the threads of the process.
+    """
+
+    def __init__(self, url=None, timeout=None):
+        import httpx
+
+        url = urlparse(url or ConfigUtility.NER_SERVER_URL)
+        timeout = timeout or ConfigUtility.NER_SERVER_TIMEOUT
+        if url.scheme == "unix":
+            self.http_client = httpx.Client(transport=httpx.HTTPTransport(uds=url.path), base_url="http://ner",
+                                            timeout=timeout)
+        else:
+            self.http_client = httpx.Client(base_url=url.geturl(), timeout=timeout)
+        self._config = None
+
+    @property
+    def config(self):
+        """
+        The configuration of the served model, holding its maximum length ("max_len").
+        """
+
+        if self._config is None:
+            try:
+                res = self.http_client.get("/info")
+                res.raise_for_status()
+                info = res.json()
+            except Exception as e:
+                logger.error(f"Error while reading the NER server info, assuming a maximum length of 384: {e}")
+                info = {}
+            self._config = SimpleNamespace(max_len=info.get("max_len", 384))
+        return self._config
+
+    def batch_predict_entities(self, texts, labels):
+        res = self.http_client.post("/predict", json={"texts": texts, "labels": labels})
+        if res.status_code != 200:
+            raise RuntimeError(f"NER server error {res.status_code}: {res.json().get('error')}")
+        return res.json()["results"]
+
+    def metrics(self):
+        res = self.http_client.get("/metrics")
+        res.raise_for_status()
+        return res.json()
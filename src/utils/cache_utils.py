@@ -0,0 +1,309 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from src.config import ConfigUtility
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def normalize_prompt(value):
+    """
+    Normalizes a prompt so that insignificant whitespace differences map to the same cache key.
+
+    Args:
+        value: A string, or a list/dict of strings such as chat messages.
+
+    Returns:
+        The same structure with every string stripped and its whitespace runs collapsed to a single space.
+    """
+
+    if isinstance(value, str):
+        return WHITESPACE_PATTERN.sub(" ", value).strip()
+    if isinstance(value, dict):
+        return {key: normalize_prompt(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_prompt(item) for item in value]
+    return value
+
+
+def make_cache_key(*parts):
+    """
+    Builds a content-addressed key from the given parts.
+
+    Args:
+        *parts: JSON-serializable values, such as the model name, the method name and the prompt.
+
+    Returns:
+        str: The SHA-256 hex digest of the parts.
+    """
+
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    A disk-backed cache of LLM responses, stored in SQLite.
+
+    Entries expire after `ttl_seconds`, and once the cache holds more than `max_entries` the least recently
+    used entries are evicted. Hits, misses and evictions are counted for the lifetime of the instance.
+    """
+
+    def __init__(self, path, max_entries=10000, ttl_seconds=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, method TEXT, value TEXT, created_at REAL, last_access REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_last_access ON llm_cache (last_access)")
+        self._conn.commit()
+        self.purge_expired()
+
+    def _is_expired(self, created_at, now):
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def get(self, key):
+        """
+        Looks up a response in the cache.
+
+        Args:
+            key (str): The key built with `make_cache_key`.
+
+        Returns:
+            The cached response, or None if there is no valid entry for the key.
+        """
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None or self._is_expired(row[1], now):
+                if row is not None:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key, value, method=None):
+        """
+        Stores a response in the cache, evicting the least recently used entries if the cache is full.
+
+        Args:
+            key (str): The key built with `make_cache_key`.
+            value: The JSON-serializable response.
+            method (str, optional): The name of the method that produced the response, kept for inspection.
+        """
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, method, value, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, method, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            count = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+            if self.max_entries and count > self.max_entries:
+                excess = count - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_access LIMIT ?)",
+                    (excess,),
+                )
+                self.evictions += excess
+            self._conn.commit()
+
+    def purge_expired(self):
+        """
+        Removes the entries older than the TTL.
+
+        Returns:
+            int: The number of removed entries.
+        """
+
+        if self.ttl_seconds is None:
+            return 0
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            self._conn.commit()
+            self.evictions += cursor.rowcount
+            return cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def stats(self):
+        """
+        Returns the counters of the cache.
+
+        Returns:
+            dict: The number of "hits", "misses", "evictions" and stored "entries".
+        """
+
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions, "entries": entries}
+
+
+class ResultStore:
+    """
+    A disk-backed store of whole-document results and of the text extracted from each PDF, stored in SQLite.
+
+    Results are keyed by the hash of the PDF bytes and a fingerprint of everything that influences the
+    extraction (pipeline version, schema, models and result-affecting settings), so that a change of code or
+    configuration never serves a stale result.
+    The extracted page text only depends on the PDF bytes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "pdf_hash TEXT, fingerprint TEXT, value TEXT, created_at REAL, PRIMARY KEY (pdf_hash, fingerprint))"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS pages (pdf_hash TEXT PRIMARY KEY, value TEXT, created_at REAL)")
+        self._conn.commit()
+
+    def get_result(self, pdf_hash, fingerprint):
+        """
+        Looks up the result of a document.
+
+        Args:
+            pdf_hash (str): The hash of the PDF bytes, as returned by `hash_file`.
+            fingerprint (str): The fingerprint of the extraction configuration.
+
+        Returns:
+            dict: The stored result, or None if the document has not been processed with this configuration.
+        """
+
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM results WHERE pdf_hash = ? AND fingerprint = ?",
+                                     (pdf_hash, fingerprint)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set_result(self, pdf_hash, fingerprint, value):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO results (pdf_hash, fingerprint, value, created_at) VALUES (?, ?, ?, ?)",
+                               (pdf_hash, fingerprint, json.dumps(value, ensure_ascii=False), time.time()))
+            self._conn.commit()
+
+    def get_pages(self, pdf_hash):
+        """
+        Looks up the extracted text of a PDF.
+
+        Args:
+            pdf_hash (str): The hash of the PDF bytes, as returned by `hash_file`.
+
+        Returns:
+            list: The text of each page, or None if the PDF has not been extracted yet.
+        """
+
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM pages WHERE pdf_hash = ?", (pdf_hash,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def set_pages(self, pdf_hash, pages):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO pages (pdf_hash, value, created_at) VALUES (?, ?, ?)",
+                               (pdf_hash, json.dumps(pages, ensure_ascii=False), time.time()))
+            self._conn.commit()
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """
+    Hashes the content of a file without reading it into memory at once.
+
+    Args:
+        path (str): The path of the file.
+        chunk_size (int): The number of bytes read at a time.
+
+    Returns:
+        str: The SHA-256 hex digest of the file content.
+    """
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def _get_per_process(name, factory):
+    # SQLite connections must not be shared with a forked child process, so each process opens its own.
+    with _instances_lock:
+        instance, pid = _instances.get(name, (None, None))
+        if instance is None or pid != os.getpid():
+            instance = factory()
+            _instances[name] = (instance, os.getpid())
+        return instance
+
+
+def get_llm_cache():
+    """
+    Returns the process-wide LLM response cache, or None if caching is disabled.
+
+    Returns:
+        LLMResponseCache: The shared cache instance.
+    """
+
+    if not ConfigUtility.LLM_CACHE_ENABLED:
+        return None
+
+    return _get_per_process("llm_cache", lambda: LLMResponseCache(path=ConfigUtility.LLM_CACHE_PATH,
+                                                                  max_entries=ConfigUtility.LLM_CACHE_MAX_ENTRIES,
+                                                                  ttl_seconds=ConfigUtility.LLM_CACHE_TTL_SECONDS or None))
+
+
+def get_result_store():
+    """
+    Returns the process-wide document result store, or None if it is disabled.
+
+    Returns:
+        ResultStore: The shared store instance.
+    """
+
+    if not ConfigUtility.RESULT_CACHE_ENABLED:
+        return None
+
+    return _get_per_process("result_store", lambda: ResultStore(path=ConfigUtility.RESULT_CACHE_PATH))
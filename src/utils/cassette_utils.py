@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import threading
+import time
+
+from src.config import ConfigUtility
+
+logger = logging.getLogger(__name__)
+
+def unmatched_path(path):
+    """
+    Returns the path of the file the unmatched requests of a cassette are reported to.
+    """
+
+    return os.path.splitext(path)[0] + ".unmatched.jsonl"
+
+
+class CassetteMissError(LookupError):
+    """
+    Raised when a request is replayed that the cassette does not hold. Retrying it cannot succeed.
+    """
+
+
+class LLMCassette:
+    """
+    A JSONL file of LLM requests and responses, recorded from real calls and replayed without the network.
+
+    Requests are matched by the key `LLMInference` builds from the model, the method and the normalized
+    messages. A request recorded several times is replayed with its responses in the recorded order, the
+    last one being reused once they are exhausted. Only successful calls are recorded, with the time they took.
+
+    Replayed requests that the cassette does not hold are logged, appended to `<path>.unmatched.jsonl` so
+    that every worker process reports to the same file, and raise `CassetteMissError`.
+    """
+
+    def __init__(self, path, mode, replay_latency="original"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        if replay_latency not in ("original", "zero"):
+            raise ValueError(f"Unknown replay latency: {replay_latency}")
+
+        self.path = path
+        self.mode = mode
+        self.replay_latency = replay_latency
+        self.unmatched_path = unmatched_path(path)
+        self.recorded = 0
+        self.played = 0
+        self.unmatched = {}
+        self._entries = {}
+        self._cursors = {}
+        self._lock = threading.Lock()
+
+        if mode == "replay":
+            self._load()
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    @property
+    def replaying(self):
+        return self.mode == "replay"
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette not found: {self.path}")
+        with open(self.path, "r", encoding="utf-8") as cassette_file:
+            for line in cassette_file:
+                if line.strip():
+                    entry = json.loads(line)
+                    self._entries.setdefault(entry["key"], []).append(entry)
+        logger.info(f"Replaying {sum(len(entries) for entries in self._entries.values())} LLM responses "
+                    f"from {self.path} with {self.replay_latency} latency...")
+
+    def record(self, key, method, messages, response, latency_seconds, usage=None):
+        """
+        Appends a successful call to the cassette.
+
+        Args:
+            key (str): The key of the request.
+            method (str): The name of the `LLMInference` method.
+            messages (list): The chat messages of the request, kept for inspection.
+            response: The parsed JSON response.
+            latency_seconds (float): The time the call took.
+            usage (dict, optional): The token counts reported by the server.
+        """
+
+        line = json.dumps({"key": key, "method": method, "messages": messages, "response": response,
+                           "latency_seconds": round(latency_seconds, 6), "usage": usage}, ensure_ascii=False)
+        with self._lock:
+            # One write per line, so that the lines of several processes appending to the file do not interleave.
+            with open(self.path, "a", encoding="utf-8") as cassette_file:
+                cassette_file.write(line + "\n")
+            self.recorded += 1
+
+    def play(self, key, method, messages):
+        """
+        Looks up the response of a request.
+
+        Args:
+            key (str): The key of the request.
+            method (str): The name of the `LLMInference` method.
+            messages (list): The chat messages of the request, reported if it is unmatched.
+
+        Returns:
+            tuple: The response, the token usage (dict or None) and the number of seconds to wait before
+                   returning it, 0 with the "zero" replay latency.
+        """
+
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                first = key not in self.unmatched
+                self.unmatched[key] = self.unmatched.get(key, 0) + 1
+            else:
+                cursor = self._cursors.get(key, 0)
+                self._cursors[key] = cursor + 1
+                entry = entries[min(cursor, len(entries) - 1)]
+                self.played += 1
+
+        if not entries:
+            if first:
+                logger.error(f"No recorded response for a {method} request ({key[:12]})")
+                line = json.dumps({"key": key, "method": method, "messages": messages, "time": time.time()},
+                                  ensure_ascii=False)
+                with open(self.unmatched_path, "a", encoding="utf-8") as unmatched_file:
+                    unmatched_file.write(line + "\n")
+            raise CassetteMissError(f"No recorded response for the {method} request {key}")
+
+        latency = entry["latency_seconds"] if self.replay_latency == "original" else 0.0
+        return entry["response"], entry.get("usage"), latency
+
+    def report(self):
+        """
+        Returns the counters of the cassette.
+
+        Returns:
+            dict: The "mode", the number of "recorded" and "played" responses, and the "unmatched" requests
+                  of this process by key, with the number of times each was asked.
+        """
+
+        with self._lock:
+            return {"mode": self.mode, "recorded": self.recorded, "played": self.played,
+                    "unmatched": dict(self.unmatched)}
+
+
+def read_unmatched(path):
+    """
+    Reads the requests reported as unmatched while replaying a cassette, by every process.
+
+    Args:
+        path (str): The path of the cassette.
+
+    Returns:
+        list: The unmatched requests, each a dictionary with its "key", "method" and "messages".
+    """
+
+    report_path = unmatched_path(path)
+    if not os.path.exists(report_path):
+        return []
+    with open(report_path, "r", encoding="utf-8") as unmatched_file:
+        return [json.loads(line) for line in unmatched_file if line.strip()]
+
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette():
+    """
+    Returns the process-wide LLM cassette, or None if recording and replaying are disabled.
+
+    Returns:
+        LLMCassette: The shared cassette.
+    """
+
+    global _cassette
+    if ConfigUtility.LLM_CASSETTE_MODE == "off":
+        return None
+
+    with _cassette_lock:
+        if _cassette is None or (_cassette.path, _cassette.mode) != (ConfigUtility.LLM_CASSETTE_PATH,
+                                                                      ConfigUtility.LLM_CASSETTE_MODE):
+            _cassette = LLMCassette(path=ConfigUtility.LLM_CASSETTE_PATH, mode=ConfigUtility.LLM_CASSETTE_MODE,
+                                    replay_latency=ConfigUtility.LLM_CASSETTE_REPLAY_LATENCY)
+        return _cassette
@@ -0,0 +1,161 @@
+import json
+from collections import namedtuple
+
+from src.utils.ner_utils import NerModel
+
+# A field answered with a single value, located in the output document by its path of keys.
+LeafField = namedtuple("LeafField", ["path", "question"])
+# A field answered with a list of items, each holding the given item fields.
+ListField = namedtuple("ListField", ["path", "question", "item_fields"])
+
+
+def load_extraction_model(path):
+    """
+    Loads an extraction model from a JSON file.
+
+    Args:
+        path (str): The path of the JSON file, holding the same nested structure as `init_extraction_model`.
+
+    Returns:
+        dict: The extraction model.
+    """
+
+    with open(path, "r", encoding="utf-8") as schema_file:
+        return json.load(schema_file)
+
+
+class ExtractionPlan:
+    """
+    An extraction model compiled once into the fields to be extracted from every document.
+
+    Each field is compiled into its question: leaf fields are asked to the NER model in one batched pass
+    and fall back to the LLM by section, and list fields, such as the transit ports, are asked to the LLM
+    with one question each. Any document type described by an extraction model is extracted the same way.
+    """
+
+    def __init__(self, extraction_model):
+        if not isinstance(extraction_model, dict) or not extraction_model:
+            raise ValueError("The extraction model must be a non-empty dictionary of sections.")
+        self.extraction_model = extraction_model
+        self.sections = list(extraction_model)
+        self.leaf_fields = []
+        self.list_fields = []
+
+        for section, fields in extraction_model.items():
+            if not isinstance(fields, dict) or not fields:
+                raise ValueError(f"Section {section} must be a non-empty dictionary of fields.")
+            for field, sub_fields in fields.items():
+                path = f"{section}.{field}"
+                if isinstance(sub_fields, list):
+                    if len(sub_fields) != 1 or not isinstance(sub_fields[0], dict) or not sub_fields[0]:
+                        raise ValueError(f"List field {path} must hold exactly one non-empty dictionary of fields.")
+                    if any(leaf != {} for leaf in sub_fields[0].values()):
+                        raise ValueError(f"The item fields of {path} must be empty dictionaries.")
+                    item_fields = list(sub_fields[0])
+                    question = f"What are {' and '.join(item_fields)} of all the {field}?"
+                    self.list_fields.append(ListField((section, field), question, item_fields))
+                elif not isinstance(sub_fields, dict):
+                    raise ValueError(f"Field {path} must be a dictionary or a list.")
+                elif sub_fields:
+                    if any(leaf != {} for leaf in sub_fields.values()):
+                        raise ValueError(f"The sub-fields of {path} must be empty dictionaries.")
+                    for sub_field in sub_fields:
+                        question = NerModel.build_question(sub_field, sub_section=field, section=section)
+                        self.leaf_fields.append(LeafField((section, field, sub_field), question))
+                else:
+                    self.leaf_fields.append(LeafField((section, field), NerModel.build_question(field)))
+
+        self.section_fields = {section: [idx for idx, leaf in enumerate(self.leaf_fields) if leaf.path[0] == section]
+                               for section in self.sections}
+
+    def ner_queries(self, agg_sections):
+        """
+        Builds the NER queries of every leaf field, normalizing the text of each section once.
+
+        Args:
+            agg_sections (dict): A dictionary mapping section names to their aggregated text.
+
+        Returns:
+            list: A list of (question, section_text) tuples, one per leaf field in `self.leaf_fields` order.
+        """
+
+        texts = {section: NerModel.process_text(agg_sections.get(section, "")) for section in self.sections}
+        return [(leaf.question, texts[leaf.path[0]]) for leaf in self.leaf_fields]
+
+    @staticmethod
+    def entire_text(agg_sections):
+        """
+        Joins the sections of a document into the normalized text given to the LLM.
+
+        Args:
+            agg_sections (dict): A dictionary mapping section names to their aggregated text.
+
+        Returns:
+            str: The text of all sections.
+        """
+
+        return NerModel.process_text("\n".join(value for value in agg_sections.values()))
+
+    def build_section(self, section, answers):
+        """
+        Places the answers of the leaf fields of a section under their field.
+
+        Args:
+            section (str): The name of the section.
+            answers (list): The answers of the fields in `self.section_fields[section]`, in the same order.
+
+        Returns:
+            dict: The nested output of the section, without the list fields.
+        """
+
+        doc = {}
+        for idx, answer in zip(self.section_fields[section], answers):
+            node = doc
+            path = self.leaf_fields[idx].path
+            for key in path[1:-1]:
+                node = node.setdefault(key, {})
+            node[path[-1]] = answer
+        return doc
+
+    def assemble(self, section_docs, list_answers):
+        """
+        Puts the output document together in the order of the extraction model.
+
+        Args:
+            section_docs (dict): The output of each section, as returned by `build_section`.
+            list_answers (dict): The answer of each list field, by path.
+
+        Returns:
+            dict: The output document. A section that failed, with None as its output, only holds its list
+                  fields, or is None if it has none.
+        """
+
+        doc = {}
+        for section, fields in self.extraction_model.items():
+            section_doc = section_docs.get(section)
+            if section_doc is None and not any(field.path[0] == section for field in self.list_fields):
+                doc[section] = None
+                continue
+            section_doc = section_doc or {}
+            doc[section] = {}
+            for field in fields:
+                if (section, field) in list_answers:
+                    doc[section][field] = list_answers[(section, field)]
+                elif field in section_doc:
+                    doc[section][field] = section_doc[field]
+        return doc
+
+    def is_complete(self, doc):
+        """
+        Checks that no part of an output document failed.
+
+        Args:
+            doc (dict): The output document, as returned by `assemble`.
+
+        Returns:
+            bool: False if the document, one of its sections or one of its list fields is None.
+        """
+
+        if doc is None or any(doc.get(section) is None for section in self.sections):
+            return False
+        return all(doc[field.path[0]].get(field.path[1]) is not None for field in self.list_fields)
@@ -0,0 +1,143 @@
+import re
+
+# Common English function words, used to tell English apart from other languages written in the Latin script.
+ENGLISH_STOPWORDS = {
+    "the", "and", "of", "to", "in", "for", "is", "on", "that", "by", "this", "with", "you", "it", "not", "or",
+    "be", "are", "from", "at", "as", "your", "all", "have", "an", "was", "we", "will", "can", "if", "our",
+    "which", "shall", "been", "any", "such", "its", "these", "those", "than", "into", "under", "there",
+}
+
+# Frequent function words of other Latin-script languages seen in booking confirmations. Particles that are
+# common in company and place names ("Navieras del Sur", "Le Havre", "Los Angeles", "La Spezia", "Den Haag")
+# are left out, as they also appear in English documents.
+FOREIGN_STOPWORDS = {
+    # German
+    "die", "das", "und", "ist", "nicht", "mit", "für", "dem", "auf", "ein", "eine", "zu",
+    # French
+    "les", "et", "un", "une", "pour", "est", "avec", "au", "aux",
+    # Spanish / Portuguese
+    "para", "con", "por", "una", "em", "os", "que", "se",
+    # Dutch
+    "het", "een", "en", "voor", "op", "niet", "zijn",
+    # Italian
+    "che", "per", "non", "sono",
+}
+
+WORD_PATTERN = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+# Letters outside of the basic Latin alphabet and its accented variants (Cyrillic, Greek, CJK, Arabic, ...).
+NON_LATIN_PATTERN = re.compile(r"[^\x00-ɏḀ-ỿ\W\d_]", re.UNICODE)
+ACCENTED_PATTERN = re.compile(r"[À-ɏḀ-ỿ]", re.UNICODE)
+
+
+def build_label_phrases(extraction_model):
+    """
+    Builds the English label phrases of an extraction model, such as "booking number" or "cargo type".
+
+    Only the pairs of consecutive words of multi-word section and field names are kept: single words such as
+    "terminal" or "container" are also used as labels in other languages.
+
+    Args:
+        extraction_model (dict): The extraction model.
+
+    Returns:
+        set: The label phrases, as two lower-case words separated by a space.
+    """
+
+    names = []
+    for section, fields in extraction_model.items():
+        names.append(section)
+        for field, sub_fields in fields.items():
+            names.append(field)
+            if isinstance(sub_fields, list):
+                sub_fields = sub_fields[0] if sub_fields else {}
+            names.extend(sub_fields)
+    phrases = set()
+    for name in names:
+        words = name.lower().split("_")
+        phrases.update(" ".join(pair) for pair in zip(words, words[1:]))
+    return phrases
+
+
+def english_score(text, label_phrases=()):
+    """
+    Scores how likely a piece of text is to be English, without any network call.
+
+    The score combines the share of letters written in a non-Latin script, the share of accented Latin
+    letters, and the balance between English and foreign stopwords. The label phrases of the extraction
+    model found in the text count as English stopwords, so that pages of labels and values can be judged.
+
+    Args:
+        text (str): The text to be scored.
+        label_phrases (set, optional): The English label phrases, as returned by `build_label_phrases`.
+
+    Returns:
+        float: A score between 0 and 1, where 1 means the text is certainly English. Text without any
+               letters (numbers, codes, punctuation) scores 1. Latin-script text without any stopword or
+               label phrase gives no evidence of its language and scores None.
+    """
+
+    letters = [char for char in text if char.isalpha()]
+    if not letters:
+        return 1.0
+
+    non_latin_ratio = len(NON_LATIN_PATTERN.findall(text)) / len(letters)
+    if non_latin_ratio > 0.3:
+        return 0.0
+
+    accented_ratio = len(ACCENTED_PATTERN.findall(text)) / len(letters)
+
+    words = [word.lower() for word in WORD_PATTERN.findall(text)]
+    english_hits = sum(1 for word in words if word in ENGLISH_STOPWORDS)
+    english_hits += sum(1 for pair in zip(words, words[1:]) if " ".join(pair) in label_phrases)
+    foreign_hits = sum(1 for word in words if word in FOREIGN_STOPWORDS and word not in ENGLISH_STOPWORDS)
+
+    if not english_hits + foreign_hits:
+        return None
+    stopword_score = english_hits / (english_hits + foreign_hits)
+
+    score = stopword_score * (1 - non_latin_ratio) * (1 - min(accented_ratio * 10, 1.0))
+    return max(0.0, min(score, 1.0))
+
+
+def needs_translation(text, threshold=0.5, label_phrases=()):
+    """
+    Decides whether a piece of text must be translated into English.
+
+    Args:
+        text (str): The text to be checked.
+        threshold (float): The `english_score` below which the text is considered non-English.
+        label_phrases (set, optional): The English label phrases, as returned by `build_label_phrases`.
+
+    Returns:
+        bool: True if the text is not in English, or if its language cannot be told locally.
+    """
+
+    score = english_score(text, label_phrases)
+    return score is None or score < threshold
+
+
+def split_blocks(text, threshold=0.5, label_phrases=()):
+    """
+    Splits a page into blocks of consecutive lines that either need or do not need translation.
+
+    Args:
+        text (str): The text content of the page.
+        threshold (float): The `english_score` below which a line is considered non-English.
+        label_phrases (set, optional): The English label phrases, as returned by `build_label_phrases`.
+
+    Returns:
+        list: A list of (needs_translation, block_text) tuples which, joined with newlines, give back the page.
+    """
+
+    blocks = []
+    for line in text.split("\n"):
+        # Lines that cannot be judged (too short, or without any evidence) follow the block they belong to.
+        score = english_score(line, label_phrases) if len(WORD_PATTERN.findall(line)) >= 3 else None
+        flag = None if score is None else score < threshold
+        if blocks and (flag is None or flag == blocks[-1][0]):
+            blocks[-1][1].append(line)
+        else:
+            blocks.append((bool(flag), [line]))
+
+    return [(flag, "\n".join(lines)) for flag, lines in blocks]
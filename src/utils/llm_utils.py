@@ -1,6 +1,6 @@
+import asyncio
 import json
 import logging
-from groq import Groq
 import time
 from functools import wraps
 
@@ -10,6 +10,10 @@ from functools import wraps
 
 
 from src.config import ConfigUtility
+from src.utils.cache_utils import get_llm_cache, make_cache_key, normalize_prompt
+from src.utils.cassette_utils import CassetteMissError, get_cassette
+from src.utils.metrics_utils import inc, timed
+from src.utils.rate_limiter import estimate_tokens, get_rate_limiter, retry_wait
 
 # opai_client = openai.OpenAI(
 #     api_key=ConfigUtility.OPENAI_API_KEY,  # Please Replace with your OpenAI API key to run the code
@@ -132,13 +136,16 @@ from src.config import ConfigUtility
 logger = logging.getLogger(__name__)
 
 
-def retry(max_retries=3, delay=2, exceptions=(Exception,)):
+def retry(max_retries=3, delay=2, max_delay=60, exceptions=(Exception,)):
     """
     A decorator to retry a function if it raises specific exceptions.
 
+    The delay between attempts grows exponentially with random jitter, unless the server says how long to wait.
+
     Args:
-        max_retries (int): Maximum number of retry attempts.
-        delay (int): Delay in seconds between retries.
+        max_retries (int): Maximum number of attempts.
+        delay (float): Base delay in seconds between retries.
+        max_delay (float): Maximum delay in seconds between retries.
         exceptions (tuple): Exceptions to catch and retry.
 
     Returns:
@@ -151,163 +158,551 @@ def retry(max_retries=3, delay=2, exceptions=(Exception,)):
             while attempts < max_retries:
                 try:
                     return func(*args, **kwargs)
+                except CassetteMissError:
+                    # A request missing from the cassette is missing on every attempt.
+                    raise
                 except exceptions as e:
                     attempts += 1
-                    logger.info(f"Retrying {func.__name__} due to {e} ({attempts}/{max_retries})...")
-                    time.sleep(delay)
+                    if attempts >= max_retries:
+                        break
+                    wait = retry_wait(e, attempts, delay, max_delay)
+                    inc("llm_retries", method=func.__name__)
+                    logger.info(f"Retrying {func.__name__} in {wait:.2f}s due to {e} ({attempts}/{max_retries})...")
+                    time.sleep(wait)
             raise Exception(f"Function {func.__name__} failed after {max_retries} retries.")
         return wrapper
     return decorator
 
 
+def async_retry(max_retries=3, delay=2, max_delay=60, exceptions=(Exception,)):
+    """
+    A decorator to retry a coroutine function if it raises specific exceptions.
 
-class LLMInference:
-    def __init__(self):
-        self.groq_client = Groq(
-            api_key=ConfigUtility.GROQ_API_KEY,
-        )
-        self.groq_model = ConfigUtility.GROQ_MODEL
+    Unlike `retry`, the delay between attempts does not block the event loop.
 
-        self._decorate_methods()
+    Args:
+        max_retries (int): Maximum number of attempts.
+        delay (float): Base delay in seconds between retries.
+        max_delay (float): Maximum delay in seconds between retries.
+        exceptions (tuple): Exceptions to catch and retry.
 
-    def _decorate_methods(self):
-        for attr_name in dir(self):
-            if callable(getattr(self, attr_name)) and not attr_name.startswith("_"):
-                original_method = getattr(self, attr_name)
-                decorated_method = retry(max_retries=3, delay=1)(original_method)
-                setattr(self, attr_name, decorated_method)
+    Returns:
+        function: The wrapped coroutine function with retry logic.
+    """
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            attempts = 0
+            while attempts < max_retries:
+                try:
+                    return await func(*args, **kwargs)
+                except CassetteMissError:
+                    # A request missing from the cassette is missing on every attempt.
+                    raise
+                except exceptions as e:
+                    attempts += 1
+                    if attempts >= max_retries:
+                        break
+                    wait = retry_wait(e, attempts, delay, max_delay)
+                    inc("llm_retries", method=func.__name__)
+                    logger.info(f"Retrying {func.__name__} in {wait:.2f}s due to {e} ({attempts}/{max_retries})...")
+                    await asyncio.sleep(wait)
+            raise Exception(f"Function {func.__name__} failed after {max_retries} retries.")
+        return wrapper
+    return decorator
 
-    def determine_language_and_translate(self, text):
-        res = self.groq_client.chat.completions.create(
-            model=self.groq_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """You are a translator. Translate the given text to into English.
-                    You must remove the terms and conditions section if present before returning the output.
-    
-                    Output the translated text in the following json format:
-    
-                    class LangTransRes(BaseModel):
-                        lang: str # The language of the text
-                        text: str # The translated text
-                    """,
-                },
-                {
-                    "role": "user",
-                    "content": f"""
-                    The text to be translated: {text}
-                    """,
-                },
-            ],
-            n=1,
-            temperature=0.2,
-            response_format={"type": "json_object"}
-        )
 
-        return json.loads(res.choices[0].message.content)
+def _usage(res):
+    usage = getattr(res, "usage", None)
+    if usage is None:
+        return None
+    return {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens,
+            "total_tokens": usage.total_tokens}
 
 
-    def isolate_sections(self, sections, text):
-        res = self.groq_client.chat.completions.create(
-            model=self.groq_model,
-            messages=[
+def _record_usage(method, usage):
+    inc("llm_requests", method=method)
+    if usage is not None:
+        inc("llm_prompt_tokens", usage["prompt_tokens"] or 0, method=method)
+        inc("llm_completion_tokens", usage["completion_tokens"] or 0, method=method)
+
+
+def _translation_messages(text):
+    return [
+        {
+            "role": "system",
+            "content": """You are a translator. Translate the given text to into English.
+            You must remove the terms and conditions section if present before returning the output.
+
+            Output the translated text in the following json format:
+
+            class LangTransRes(BaseModel):
+                lang: str # The language of the text
+                text: str # The translated text
+            """,
+        },
+        {
+            "role": "user",
+            "content": f"""
+            The text to be translated: {text}
+            """,
+        },
+    ]
+
+
+def _sectioning_messages(sections, text):
+    return [
+        {
+            "role": "system",
+            "content": f"""You are a document analyzer. Your job is to split the given text as per the sections given.
+
+                The sections are: {sections}
+
+                Output the sectioned text in the following json format:
+                """ +
+                """
+                {
+                    "section1" : Text belonging to section1,
+                    "section2" : Text belonging to section2,
+                    ....
+                }
+                """,
+        },
+        {
+            "role": "user",
+            "content": f"""
+                The text to be sectioned: {text}
+                """,
+        },
+    ]
+
+
+def _translation_sectioning_messages(sections, text):
+    return [
+        {
+            "role": "system",
+            "content": f"""You are a document analyzer. Your job is to translate the given text into English and to split
+                the translated text as per the sections given.
+                You must remove the terms and conditions section if present before returning the output.
+
+                The sections are: {sections}
+
+                Every section must be present in the output. Use an empty string for a section that is not in the text.
+
+                Output the translated and sectioned text in the following json format:
+                """ +
+                """
                 {
-                    "role": "system",
-                    "content": f"""You are a document analyzer. Your job is to split the given text as per the sections given.
-                    
-                        The sections are: {sections}
-    
+                    "lang": The language of the text,
+                    "sections": {
+                        "section1" : English text belonging to section1,
+                        "section2" : English text belonging to section2,
+                        ....
+                    }
+                }
+                """,
+        },
+        {
+            "role": "user",
+            "content": f"""
+                The text to be translated and sectioned: {text}
+                """,
+        },
+    ]
+
+
+def _question_messages(question, text):
+    return [
+        {
+            "role": "system",
+            "content": f"""You are a document analyzer. Your job is to understand the given question and answer 
+                            it as per the text given in a precise manner without any additional explanations.
+                            If the answer is not available in the text, return the string "N/A"
+
                         Output the sectioned text in the following json format:
-                        """ +
-                        """
+                        class QA(BaseModel):
+                            text: str # Answer to the question
+                            score: float # range between 0 and 1 indicating the confidence of the answer
+                        """,
+        },
+        {
+            "role": "user",
+            "content": f"""
+                        The question: {question},
+                        The text: {text}
+                        """,
+        },
+    ]
+
+
+def _questions_messages(questions, text):
+    numbered_questions = "\n".join(f"q{idx}: {question.strip()}" for idx, question in enumerate(questions, start=1))
+    return [
+        {
+            "role": "system",
+            "content": """You are a document analyzer. Your job is to understand each of the given questions and answer 
+                            them as per the text given in a precise manner without any additional explanations.
+                            If the answer to a question is not available in the text, return the string "N/A" for it.
+
+                        Output the answers in the following json format, with one key per question id:
                         {
-                            "section1" : Text belonging to section1,
-                            "section2" : Text belonging to section2,
+                            "q1": {"text": Answer to the question q1, "score": Confidence between 0 and 1},
+                            "q2": {"text": Answer to the question q2, "score": Confidence between 0 and 1},
                             ....
                         }
                         """,
-                },
-                {
-                    "role": "user",
-                    "content": f"""
-                        The text to be sectioned: {text}
+        },
+        {
+            "role": "user",
+            "content": f"""
+                        The questions:
+                        {numbered_questions}
+                        The text: {text}
                         """,
-                },
-            ],
-            n=1,
-            temperature=0.2,
-            response_format={"type": "json_object"}
-        )
+        },
+    ]
+
+
+def _parse_answers(questions, res):
+    answers = {}
+    for idx, question in enumerate(questions, start=1):
+        answer = res.get(f"q{idx}") if isinstance(res, dict) else None
+        if isinstance(answer, dict) and "text" in answer and "score" in answer:
+            answers[question] = answer
+    return answers
+
+
+def _multiple_answers_messages(question, text):
+    return [
+        {
+            "role": "system",
+            "content": """You are a document analyzer. Your job is to understand the given question and answer 
+                            it as per the text given in a precise manner without any additional explanations.
+                            If the answer is not available in the text, return the string "N/A".
+                            The question may have multiple answers. You should return a list of answers in descending order of confidence.
+                            
+                            Here is an example on how to answer the question:
+                            Question: What are port_name and eta of all the transit_ports?
+                            Output: 
+                            {
+                                "answer": [{"port_name": {"text": "Port A", "score": 0.8}, "eta": {"text": "2023-01-01", "score": 0.8}}, {"port_name": {"text": "Port B", "score": 0.7}, "eta": {"text": "2023-02-01", "score": 0.7}}]
+                            }
+
+                        Each element of the list must follow the json format:
+                        class QA(BaseModel):
+                            text: str # Answer to the question
+                            score: float # range between 0 and 1 indicating the confidence of the answer
+                        """,
+        },
+        {
+            "role": "user",
+            "content": f"""
+                        The question: {question},
+                        The text: {text}
+                        """,
+        },
+    ]
 
-        return json.loads(res.choices[0].message.content)
 
-    def answer_question(self, question, text):
-        res = self.groq_client.chat.completions.create(
-            model=self.groq_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"""You are a document analyzer. Your job is to understand the given question and answer 
-                                    it as per the text given in a precise manner without any additional explanations.
-                                    If the answer is not available in the text, return the string "N/A"
-
-                                Output the sectioned text in the following json format:
-                                class QA(BaseModel):
-                                    text: str # Answer to the question
-                                    score: float # range between 0 and 1 indicating the confidence of the answer
-                                """,
-                },
-                {
-                    "role": "user",
-                    "content": f"""
-                                The question: {question},
-                                The text: {text}
-                                """,
-                },
-            ],
-            n=1,
-            temperature=0.2,
-            response_format={"type": "json_object"}
+class LLMInference:
+    def __init__(self, http_client=None):
+        # Imported here so that importing this module does not load the Groq SDK.
+        from groq import Groq
+
+        self.groq_client = Groq(
+            api_key=ConfigUtility.GROQ_API_KEY,
+            base_url=ConfigUtility.GROQ_BASE_URL,
+            http_client=http_client,
+            # Retries are handled by the `retry` decorator and the shared rate limiter.
+            max_retries=0,
         )
+        self.groq_model = ConfigUtility.GROQ_MODEL
+
+        self._decorate_methods()
+
+    # Public methods made of several retried requests, which are not retried as a whole.
+    _UNDECORATED = ("answer_questions",)
 
-        return json.loads(res.choices[0].message.content)
+    def _with_retry(self, func):
+        return retry(max_retries=ConfigUtility.GROQ_MAX_RETRIES,
+                     delay=ConfigUtility.GROQ_RETRY_BASE_DELAY,
+                     max_delay=ConfigUtility.GROQ_RETRY_MAX_DELAY)(func)
+
+    def _decorate_methods(self):
+        for attr_name in dir(self):
+            if callable(getattr(self, attr_name)) and not attr_name.startswith("_") and attr_name not in self._UNDECORATED:
+                setattr(self, attr_name, self._with_retry(getattr(self, attr_name)))
+
+    def _chat_completion(self, method, messages):
+        cassette = get_cassette()
+        # The cassette must see every request, so the cache is bypassed while recording or replaying.
+        cache = get_llm_cache() if cassette is None else None
+        key = make_cache_key(self.groq_model, method, normalize_prompt(messages))
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                inc("llm_cache_hits", method=method)
+                return cached
+
+        if cassette is not None and cassette.replaying:
+            with timed("llm_request", method=method):
+                content, usage, latency = cassette.play(key, method, messages)
+                time.sleep(latency)
+            _record_usage(method, usage)
+            return content
+
+        limiter = get_rate_limiter()
+        tokens = estimate_tokens(messages)
+        if limiter is not None:
+            limiter.acquire(tokens)
+
+        start = time.perf_counter()
+        try:
+            with timed("llm_request", method=method):
+                res = self.groq_client.chat.completions.create(
+                    model=self.groq_model,
+                    messages=messages,
+                    n=1,
+                    temperature=0.2,
+                    response_format={"type": "json_object"}
+                )
+        except Exception:
+            inc("llm_errors", method=method)
+            raise
+        latency = time.perf_counter() - start
+        usage = _usage(res)
+        _record_usage(method, usage)
+
+        if limiter is not None:
+            limiter.record_usage(tokens, usage["total_tokens"] if usage is not None else None)
+
+        content = json.loads(res.choices[0].message.content)
+        if cache is not None:
+            cache.set(key, content, method=method)
+        if cassette is not None:
+            cassette.record(key, method, messages, content, latency, usage)
+        return content
+
+    def determine_language_and_translate(self, text):
+        return self._chat_completion(method="determine_language_and_translate",
+                                     messages=_translation_messages(text=text))
+
+    def isolate_sections(self, sections, text):
+        return self._chat_completion(method="isolate_sections",
+                                     messages=_sectioning_messages(sections=sections, text=text))
+
+    def translate_and_isolate_sections(self, sections, text):
+        return self._chat_completion(method="translate_and_isolate_sections",
+                                     messages=_translation_sectioning_messages(sections=sections, text=text))
+
+    def answer_question(self, question, text):
+        return self._chat_completion(method="answer_question",
+                                     messages=_question_messages(question=question, text=text))
+
+    def _ask_questions(self, questions, text):
+        return _parse_answers(questions, self._chat_completion(method="answer_questions",
+                                                               messages=_questions_messages(questions=questions,
+                                                                                            text=text)))
+
+    def answer_questions(self, questions, text):
+        """
+        Answers several questions about the same text with a single request.
+
+        The questions the response leaves out, or answers in the wrong format, are asked again one by one.
+        The batch request and each single question are retried on their own, so a failed re-ask never
+        sends the whole batch again.
+
+        Args:
+            questions (list): The questions to be answered.
+            text (str): The text the answers are searched in.
+
+        Returns:
+            dict: A dictionary mapping each question to its answer, with "text" and "score".
+        """
+
+        answers = self._with_retry(self._ask_questions)(questions=questions, text=text)
+        missing = [question for question in questions if question not in answers]
+        if missing:
+            logger.info(f"{len(missing)} of {len(questions)} questions missing from the batch answer, asking them one by one...")
+            for question in missing:
+                answers[question] = self.answer_question(question=question, text=text)
+        return answers
 
     def find_multiple_answers(self, question, text):
-        res = self.groq_client.chat.completions.create(
-            model=self.groq_model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """You are a document analyzer. Your job is to understand the given question and answer 
-                                    it as per the text given in a precise manner without any additional explanations.
-                                    If the answer is not available in the text, return the string "N/A".
-                                    The question may have multiple answers. You should return a list of answers in descending order of confidence.
-                                    
-                                    Here is an example on how to answer the question:
-                                    Question: What are port_name and eta of all the transit_ports?
-                                    Output: 
-                                    {
-                                        "answer": [{"port_name": {"text": "Port A", "score": 0.8}, "eta": {"text": "2023-01-01", "score": 0.8}}, {"port_name": {"text": "Port B", "score": 0.7}, "eta": {"text": "2023-02-01", "score": 0.7}}]
-                                    }
-
-                                Each element of the list must follow the json format:
-                                class QA(BaseModel):
-                                    text: str # Answer to the question
-                                    score: float # range between 0 and 1 indicating the confidence of the answer
-                                """,
-                },
-                {
-                    "role": "user",
-                    "content": f"""
-                                The question: {question},
-                                The text: {text}
-                                """,
-                },
-            ],
-            n=1,
-            temperature=0.2,
-            response_format={"type": "json_object"}
-        )
+        return self._chat_completion(method="find_multiple_answers",
+                                     messages=_multiple_answers_messages(question=question, text=text))
+
 
-        return json.loads(res.choices[0].message.content)
\ No newline at end of file
+class AsyncLLMInference:
+    """
+    The asyncio counterpart of `LLMInference`.
+
+    It uses the async Groq client on top of a single HTTP connection pool, so the requests of many documents
+    can be in flight at the same time from one process. The client is created on first use, inside the
+    running event loop, and recreated if it is later used from another event loop, the previous client
+    being closed so that its connections are released.
+    """
+
+    def __init__(self):
+        self.groq_client = None
+        self._client_loop = None
+        self._client_closer = None
+        self.groq_model = ConfigUtility.GROQ_MODEL
+
+        self._decorate_methods()
+
+    # Public methods made of several retried requests, which are not retried as a whole, and `close`, which
+    # sends no request.
+    _UNDECORATED = ("answer_questions", "close")
+
+    def _with_retry(self, func):
+        return async_retry(max_retries=ConfigUtility.GROQ_MAX_RETRIES,
+                           delay=ConfigUtility.GROQ_RETRY_BASE_DELAY,
+                           max_delay=ConfigUtility.GROQ_RETRY_MAX_DELAY)(func)
+
+    def _decorate_methods(self):
+        for attr_name in dir(self):
+            if callable(getattr(self, attr_name)) and not attr_name.startswith("_") and attr_name not in self._UNDECORATED:
+                setattr(self, attr_name, self._with_retry(getattr(self, attr_name)))
+
+    async def _get_client(self):
+        # The connection pool belongs to the event loop it was created in.
+        loop = asyncio.get_running_loop()
+        if self.groq_client is None or self._client_loop is not loop:
+            import httpx
+            from groq import AsyncGroq
+
+            stale_client = self.groq_client
+            self._client_loop = loop
+            self.groq_client = AsyncGroq(
+                api_key=ConfigUtility.GROQ_API_KEY,
+                base_url=ConfigUtility.GROQ_BASE_URL,
+                max_retries=0,
+                http_client=httpx.AsyncClient(
+                    limits=httpx.Limits(max_connections=ConfigUtility.GROQ_MAX_CONNECTIONS,
+                                        max_keepalive_connections=ConfigUtility.GROQ_MAX_CONNECTIONS),
+                ),
+            )
+            # The client is closed when its event loop shuts its async generators down, as `asyncio.run` does,
+            # while the loop can still close the connections.
+            self._client_closer = self._close_on_shutdown(self.groq_client)
+            await self._client_closer.__anext__()
+            if stale_client is not None:
+                await self._close_stale_client(stale_client)
+        return self.groq_client
+
+    @staticmethod
+    async def _close_on_shutdown(client):
+        try:
+            yield
+        finally:
+            await client.close()
+
+    @staticmethod
+    async def _close_stale_client(client):
+        # A client whose event loop ended without shutting down its async generators is closed here. Its
+        # loop is usually closed by now, so the error of closing its connections is expected and only logged.
+        try:
+            await client.close()
+        except Exception as e:
+            logger.debug(f"Error while closing the client of a previous event loop: {e}")
+
+    async def _chat_completion(self, method, messages):
+        cassette = get_cassette()
+        # The cassette must see every request, so the cache is bypassed while recording or replaying.
+        cache = get_llm_cache() if cassette is None else None
+        key = make_cache_key(self.groq_model, method, normalize_prompt(messages))
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                inc("llm_cache_hits", method=method)
+                return cached
+
+        if cassette is not None and cassette.replaying:
+            with timed("llm_request", method=method):
+                content, usage, latency = cassette.play(key, method, messages)
+                await asyncio.sleep(latency)
+            _record_usage(method, usage)
+            return content
+
+        limiter = get_rate_limiter()
+        tokens = estimate_tokens(messages)
+        if limiter is not None:
+            await limiter.acquire_async(tokens)
+
+        start = time.perf_counter()
+        try:
+            with timed("llm_request", method=method):
+                res = await (await self._get_client()).chat.completions.create(
+                    model=self.groq_model,
+                    messages=messages,
+                    n=1,
+                    temperature=0.2,
+                    response_format={"type": "json_object"}
+                )
+        except Exception:
+            inc("llm_errors", method=method)
+            raise
+        latency = time.perf_counter() - start
+        usage = _usage(res)
+        _record_usage(method, usage)
+
+        if limiter is not None:
+            limiter.record_usage(tokens, usage["total_tokens"] if usage is not None else None)
+
+        content = json.loads(res.choices[0].message.content)
+        if cache is not None:
+            cache.set(key, content, method=method)
+        if cassette is not None:
+            cassette.record(key, method, messages, content, latency, usage)
+        return content
+
+    async def close(self):
+        if self.groq_client is not None:
+            await self.groq_client.close()
+            self.groq_client = None
+
+    async def determine_language_and_translate(self, text):
+        return await self._chat_completion(method="determine_language_and_translate",
+                                           messages=_translation_messages(text=text))
+
+    async def isolate_sections(self, sections, text):
+        return await self._chat_completion(method="isolate_sections",
+                                           messages=_sectioning_messages(sections=sections, text=text))
+
+    async def translate_and_isolate_sections(self, sections, text):
+        return await self._chat_completion(method="translate_and_isolate_sections",
+                                           messages=_translation_sectioning_messages(sections=sections, text=text))
+
+    async def answer_question(self, question, text):
+        return await self._chat_completion(method="answer_question",
+                                           messages=_question_messages(question=question, text=text))
+
+    async def _ask_questions(self, questions, text):
+        return _parse_answers(questions, await self._chat_completion(method="answer_questions",
+                                                                     messages=_questions_messages(questions=questions,
+                                                                                                  text=text)))
+
+    async def answer_questions(self, questions, text):
+        """
+        The asyncio counterpart of `LLMInference.answer_questions`, asking the missing questions concurrently.
+
+        Args:
+            questions (list): The questions to be answered.
+            text (str): The text the answers are searched in.
+
+        Returns:
+            dict: A dictionary mapping each question to its answer, with "text" and "score".
+        """
+
+        answers = await self._with_retry(self._ask_questions)(questions=questions, text=text)
+        missing = [question for question in questions if question not in answers]
+        if missing:
+            logger.info(f"{len(missing)} of {len(questions)} questions missing from the batch answer, asking them one by one...")
+            retried = await asyncio.gather(*[self.answer_question(question=question, text=text) for question in missing])
+            answers.update(zip(missing, retried))
+        return answers
+
+    async def find_multiple_answers(self, question, text):
+        return await self._chat_completion(method="find_multiple_answers",
+                                           messages=_multiple_answers_messages(question=question, text=text))
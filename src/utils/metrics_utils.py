@@ -0,0 +1,265 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from functools import wraps
+
+_current = ContextVar("metrics", default=None)
+
+
+def _label_key(labels):
+    return ",".join(f"{name}={labels[name]}" for name in sorted(labels))
+
+
+def _parse_label_key(key):
+    return dict(item.split("=", 1) for item in key.split(",")) if key else {}
+
+
+class Metrics:
+    """
+    A thread-safe set of counters and summaries, each identified by a name and a set of labels.
+
+    Summaries keep the count, sum and maximum of the observed values, such as durations in seconds or
+    batch sizes.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.summaries = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            count, total, maximum = self.summaries.get(key, (0, 0.0, value))
+            self.summaries[key] = (count + 1, total + value, max(maximum, value))
+
+    def counter(self, name, **labels):
+        """
+        Returns the value of a counter, summed over every label set when no label is given.
+        """
+
+        with self._lock:
+            if labels:
+                return self.counters.get((name, _label_key(labels)), 0)
+            return sum(value for (counter, _), value in self.counters.items() if counter == name)
+
+    def derived(self):
+        """
+        Computes the rates that are easier to read than the counters they come from.
+
+        Returns:
+            dict: The share of NER questions falling back to the LLM ("ner_fallback_rate") and of LLM calls
+                  served by the cache ("llm_cache_hit_rate"), when they are defined.
+        """
+
+        derived = {}
+        questions = self.counter("ner_questions")
+        if questions:
+            derived["ner_fallback_rate"] = round(self.counter("ner_fallbacks") / questions, 4)
+        calls = self.counter("llm_requests") + self.counter("llm_cache_hits")
+        if calls:
+            derived["llm_cache_hit_rate"] = round(self.counter("llm_cache_hits") / calls, 4)
+        return derived
+
+    def to_dict(self):
+        """
+        Returns the metrics as a JSON-serialisable dictionary, the `_metrics` block of a document.
+
+        Returns:
+            dict: The "counters" and "summaries" by name and label set ("" when there is no label), and the
+                  "derived" rates.
+        """
+
+        with self._lock:
+            counters, summaries = dict(self.counters), dict(self.summaries)
+
+        res = {"counters": {}, "summaries": {}, "derived": self.derived()}
+        for (name, key), value in sorted(counters.items()):
+            res["counters"].setdefault(name, {})[key] = value
+        for (name, key), (count, total, maximum) in sorted(summaries.items()):
+            res["summaries"].setdefault(name, {})[key] = {"count": count, "sum": round(total, 6),
+                                                          "max": round(maximum, 6)}
+        return res
+
+    def merge(self, other):
+        """
+        Adds the metrics of a dictionary returned by `to_dict`, typically those of a document processed
+        in another process.
+
+        Args:
+            other (dict): The metrics to be added.
+        """
+
+        for name, values in other.get("counters", {}).items():
+            for key, value in values.items():
+                self.inc(name, value, **_parse_label_key(key))
+        with self._lock:
+            for name, values in other.get("summaries", {}).items():
+                for key, summary in values.items():
+                    count, total, maximum = self.summaries.get((name, key), (0, 0.0, summary["max"]))
+                    self.summaries[(name, key)] = (count + summary["count"], total + summary["sum"],
+                                                   max(maximum, summary["max"]))
+
+    def to_prometheus(self, prefix="doc_reader"):
+        """
+        Formats the metrics in the Prometheus text exposition format.
+
+        Counters get a `_total` suffix, and each summary is exposed as `_count`, `_sum` and `_max` series.
+
+        Args:
+            prefix (str): The prefix of every metric name.
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+
+        def _series(name, key, value):
+            labels = ",".join(f'{label}="{val}"' for label, val in _parse_label_key(key).items())
+            return f"{name}{{{labels}}} {value}" if labels else f"{name} {value}"
+
+        data = self.to_dict()
+        lines = []
+        for name, values in data["counters"].items():
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.extend(_series(f"{prefix}_{name}_total", key, value) for key, value in values.items())
+        for name, values in data["summaries"].items():
+            lines.append(f"# TYPE {prefix}_{name} summary")
+            for key, summary in values.items():
+                lines.append(_series(f"{prefix}_{name}_count", key, summary["count"]))
+                lines.append(_series(f"{prefix}_{name}_sum", key, summary["sum"]))
+            lines.append(f"# TYPE {prefix}_{name}_max gauge")
+            lines.extend(_series(f"{prefix}_{name}_max", key, summary["max"]) for key, summary in values.items())
+        for name, value in data["derived"].items():
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path, prefix="doc_reader"):
+        """
+        Writes the metrics to a Prometheus text file, such as one read by the textfile collector of the
+        node exporter. The file is replaced atomically, so it is never read half-written.
+
+        Args:
+            path (str): The path of the file.
+            prefix (str): The prefix of every metric name.
+        """
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path + ".tmp", "w", encoding="utf-8") as output:
+            output.write(self.to_prometheus(prefix=prefix))
+        os.replace(path + ".tmp", path)
+
+
+_process_metrics = Metrics()
+
+
+def get_metrics():
+    """
+    Returns the metrics of the document being processed in the current context, or None outside of a document.
+    """
+
+    return _current.get()
+
+
+def get_process_metrics():
+    """
+    Returns the metrics of every document processed by the current process.
+    """
+
+    return _process_metrics
+
+
+@contextmanager
+def collect_metrics():
+    """
+    Collects the metrics recorded in the current context, and in the threads and tasks it starts with
+    `submit` or asyncio, into one `Metrics` instance. Nested calls share the outermost instance.
+
+    Yields:
+        Metrics: The metrics of the block.
+    """
+
+    metrics = _current.get()
+    if metrics is not None:
+        yield metrics
+        return
+
+    metrics = Metrics()
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+def inc(name, value=1, **labels):
+    """
+    Increments a counter of the current document and of the process.
+    """
+
+    _process_metrics.inc(name, value, **labels)
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.inc(name, value, **labels)
+
+
+def observe(name, value, **labels):
+    """
+    Records an observation in a summary of the current document and of the process.
+    """
+
+    _process_metrics.observe(name, value, **labels)
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.observe(name, value, **labels)
+
+
+class timed:
+    """
+    Records the duration of a block or a function, in seconds, in the `<name>_seconds` summary.
+
+    Usable as a context manager (`with timed("ner"):`) or as a decorator of a synchronous function.
+    """
+
+    def __init__(self, name, **labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(f"{self.name}_seconds", time.perf_counter() - self._start, **self.labels)
+        return False
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            # A new timer per call, so that concurrent calls do not share their start time.
+            with timed(self.name, **self.labels):
+                return func(*args, **kwargs)
+        return wrapper
+
+
+def submit(executor, func, *args, **kwargs):
+    """
+    Submits a function to an executor so that it records its metrics in the document of the caller.
+
+    Args:
+        executor (Executor): The thread pool.
+        func (callable): The function to be run.
+
+    Returns:
+        Future: The future of the call.
+    """
+
+    return executor.submit(copy_context().run, func, *args, **kwargs)
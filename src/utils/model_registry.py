@@ -0,0 +1,224 @@
+import logging
+import os
+import threading
+
+from src.config import ConfigUtility
+from src.utils.llm_utils import LLMInference, AsyncLLMInference
+
+logger = logging.getLogger(__name__)
+
+_models = {}
+_warmed_up = set()
+_llm_inst = None
+_llm_inst_pid = None
+_async_llm_inst = None
+_async_llm_inst_pid = None
+_lock = threading.Lock()
+_export_lock = threading.Lock()
+
+
+ONNX_MODEL_FILES = {"onnx": "model.onnx", "int8": "model_quantized.onnx"}
+
+
+def onnx_export_dir(model_id=None):
+    model_id = model_id or ConfigUtility.GLINER_MODEL
+    return os.path.join(ConfigUtility.NER_ONNX_DIR, model_id.replace("/", "__"))
+
+
+def export_onnx_model(model_id=None, quantize=True):
+    """
+    Exports the GLiNER model to ONNX, once, and optionally quantizes its weights to int8.
+
+    The exported files are cached under `NER onnx_dir` together with the configuration and tokenizer of
+    the model, so later runs load them directly. Both files are written to a temporary name first, so an
+    interrupted export is never mistaken for a complete one.
+
+    Args:
+        model_id (str, optional): The Hugging Face id of the model. Defaults to the configured model.
+        quantize (bool): Whether to also write the dynamically quantized int8 model.
+
+    Returns:
+        str: The directory holding the exported model.
+    """
+
+    model_id = model_id or ConfigUtility.GLINER_MODEL
+    export_dir = onnx_export_dir(model_id)
+    onnx_path = os.path.join(export_dir, ONNX_MODEL_FILES["onnx"])
+    quantized_path = os.path.join(export_dir, ONNX_MODEL_FILES["int8"])
+
+    with _export_lock:
+        _export(model_id, export_dir, onnx_path, quantized_path if quantize else None)
+    return export_dir
+
+
+def _export(model_id, export_dir, onnx_path, quantized_path):
+    if not os.path.exists(onnx_path):
+        import torch
+
+        model = get_gliner_model(model_id, backend="torch")
+        os.makedirs(export_dir, exist_ok=True)
+        model.save_pretrained(export_dir)
+
+        logger.info(f"Exporting GLiNER model {model_id} to ONNX...")
+        # A dummy input of the shape the model expects, as prepared by GLiNER itself.
+        inputs, _ = model.prepare_model_inputs(["What is the booking number?\nBooking number: ABC123"], ["answer"])
+        input_names = ["input_ids", "attention_mask", "words_mask", "text_lengths"]
+        dynamic_axes = {name: {0: "batch_size", 1: "sequence_length"} for name in input_names}
+        dynamic_axes["text_lengths"] = {0: "batch_size", 1: "value"}
+        if model.config.span_mode == "token_level":
+            dynamic_axes["logits"] = {0: "position", 1: "batch_size", 2: "sequence_length", 3: "num_classes"}
+        else:
+            input_names += ["span_idx", "span_mask"]
+            dynamic_axes["span_idx"] = {0: "batch_size", 1: "num_spans", 2: "idx"}
+            dynamic_axes["span_mask"] = {0: "batch_size", 1: "num_spans"}
+            dynamic_axes["logits"] = {0: "batch_size", 1: "sequence_length", 2: "num_spans", 3: "num_classes"}
+
+        with torch.no_grad():
+            torch.onnx.export(model.model, tuple(inputs[name] for name in input_names), onnx_path + ".tmp",
+                              input_names=input_names, output_names=["logits"], dynamic_axes=dynamic_axes,
+                              opset_version=14)
+        os.replace(onnx_path + ".tmp", onnx_path)
+        logger.info(f"GLiNER model {model_id} exported to {onnx_path}.")
+
+    if quantized_path and not os.path.exists(quantized_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        logger.info(f"Quantizing GLiNER model {model_id} to int8...")
+        quantize_dynamic(onnx_path, quantized_path + ".tmp", weight_type=QuantType.QUInt8)
+        os.replace(quantized_path + ".tmp", quantized_path)
+        logger.info(f"GLiNER model {model_id} quantized to {quantized_path}.")
+
+
+def get_gliner_model(model_id=None, backend=None):
+    """
+    Returns the process-wide GLiNER model, loading it on first use.
+
+    The weights are loaded from safetensors files, which are memory-mapped, and the model is only loaded
+    once per process. When the model is loaded before worker processes are forked (see `preload_models`),
+    the workers share its pages copy-on-write instead of holding a copy each.
+
+    With the "onnx" and "int8" backends the model runs on ONNX Runtime, from the files written by
+    `export_onnx_model`, which exports them on first use.
+
+    Args:
+        model_id (str, optional): The Hugging Face id of the model. Defaults to the configured model.
+        backend (str, optional): "torch", "onnx" or "int8". Defaults to the configured backend.
+
+    Returns:
+        GLiNER: The loaded model, in evaluation mode.
+    """
+
+    model_id = model_id or ConfigUtility.GLINER_MODEL
+    backend = backend or ConfigUtility.NER_BACKEND
+    if backend not in ("torch", *ONNX_MODEL_FILES):
+        raise ValueError(f"Unknown NER backend: {backend}")
+
+    if backend != "torch":
+        # Exported outside of the lock, since the export loads the torch model through this function.
+        export_onnx_model(model_id, quantize=backend == "int8")
+
+    with _lock:
+        if (model_id, backend) not in _models:
+            _models[(model_id, backend)] = load_gliner_model(model_id, backend)
+        return _models[(model_id, backend)]
+
+
+def load_gliner_model(model_id, backend):
+    """
+    Loads a new copy of a GLiNER model, without sharing it. The ONNX files must have been exported already.
+
+    Args:
+        model_id (str): The Hugging Face id of the model.
+        backend (str): "torch", "onnx" or "int8".
+
+    Returns:
+        GLiNER: The loaded model, in evaluation mode.
+    """
+
+    # Imported here so that torch and transformers are only loaded by the paths that need the model.
+    from gliner import GLiNER
+
+    logger.info(f"Loading GLiNER model {model_id} ({backend})...")
+    if backend == "torch":
+        model = GLiNER.from_pretrained(model_id)
+        model.eval()
+    else:
+        model = GLiNER.from_pretrained(onnx_export_dir(model_id), load_onnx_model=True, load_tokenizer=True,
+                                       onnx_model_file=ONNX_MODEL_FILES[backend])
+    logger.info(f"GLiNER model {model_id} ({backend}) loaded.")
+    return model
+
+
+def warm_up_gliner_model(model_id=None, backend=None):
+    """
+    Runs a dummy inference through the GLiNER model, once per process, so that the first document does
+    not pay for the lazy initialisation of the model and its tokenizer.
+
+    Args:
+        model_id (str, optional): The Hugging Face id of the model. Defaults to the configured model.
+        backend (str, optional): "torch", "onnx" or "int8". Defaults to the configured backend.
+    """
+
+    model_id = model_id or ConfigUtility.GLINER_MODEL
+    backend = backend or ConfigUtility.NER_BACKEND
+    model = get_gliner_model(model_id, backend=backend)
+    with _lock:
+        if (model_id, backend) in _warmed_up:
+            return
+        _warmed_up.add((model_id, backend))
+
+    try:
+        logger.info(f"Warming up GLiNER model {model_id}...")
+        model.batch_predict_entities(["What is the booking number?\nBooking number: ABC123"], ["answer"])
+    except Exception as e:
+        logger.error(f"Error while warming up GLiNER model {model_id}: {e}")
+
+
+def get_llm_inference():
+    """
+    Returns the process-wide `LLMInference`, whose Groq client keeps a pool of HTTP connections that is
+    shared by every caller in the process.
+
+    Returns:
+        LLMInference: The shared instance.
+    """
+
+    global _llm_inst, _llm_inst_pid
+    with _lock:
+        # The connections of the pool must not be shared with a forked child process.
+        if _llm_inst is None or _llm_inst_pid != os.getpid():
+            import httpx
+
+            _llm_inst_pid = os.getpid()
+            _llm_inst = LLMInference(http_client=httpx.Client(
+                limits=httpx.Limits(max_connections=ConfigUtility.GROQ_MAX_CONNECTIONS,
+                                    max_keepalive_connections=ConfigUtility.GROQ_MAX_CONNECTIONS),
+            ))
+        return _llm_inst
+
+
+def get_async_llm_inference():
+    """
+    Returns the process-wide `AsyncLLMInference`, so that all the documents awaited in the process share
+    the connection pool of a single async Groq client.
+
+    Returns:
+        AsyncLLMInference: The shared instance.
+    """
+
+    global _async_llm_inst, _async_llm_inst_pid
+    with _lock:
+        if _async_llm_inst is None or _async_llm_inst_pid != os.getpid():
+            _async_llm_inst_pid = os.getpid()
+            _async_llm_inst = AsyncLLMInference()
+        return _async_llm_inst
+
+
+def preload_models():
+    """
+    Loads the models in the current process, typically before forking worker processes. Nothing is loaded
+    when NER runs on the inference server.
+    """
+
+    if not ConfigUtility.NER_SERVER_ENABLED:
+        get_gliner_model()
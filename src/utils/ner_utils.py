@@ -1,137 +1,414 @@
+import asyncio
 import logging
-from gliner import GLiNER
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
-from src.utils.llm_utils import LLMInference
+from src.config import ConfigUtility
+from src.utils.metrics_utils import inc, observe, submit, timed
+from src.utils.pattern_utils import extract_field
+from src.utils.retrieval_utils import estimate_text_tokens, get_index
+from src.utils.window_utils import count_words, iter_windows, merge_spans
+from src.utils.model_registry import get_gliner_model, get_llm_inference, get_async_llm_inference, \
+    warm_up_gliner_model
 
 logger = logging.getLogger(__name__)
 
 class NerModel:
     def __init__(self):
         logger.info("Initializing GLiNER model...")
-        self.model = GLiNER.from_pretrained("knowledgator/gliner-multitask-v1.0")
+        if ConfigUtility.NER_SERVER_ENABLED:
+            # The model is held, batched and warmed up by the NER inference server.
+            from src.ner_server import NerServiceClient
+
+            self.model = NerServiceClient()
+        else:
+            self.model = get_gliner_model()
+            if ConfigUtility.NER_WARM_UP:
+                warm_up_gliner_model()
         logger.info("GLiNER model initialized.")
-        self.llm_inst = LLMInference()
+        self.llm_inst = get_llm_inference()
+        self.async_llm_inst = get_async_llm_inference()
 
-        self.ner_threshold = 0.9
+        self.ner_threshold = ConfigUtility.NER_THRESHOLD
+        self.ner_batch_size = ConfigUtility.NER_BATCH_SIZE
+        self.pattern_extraction = ConfigUtility.PATTERN_EXTRACTION
+        self.max_words = ConfigUtility.NER_MAX_WORDS or getattr(getattr(self.model, "config", None), "max_len", 384)
+        self.window_overlap = ConfigUtility.NER_WINDOW_OVERLAP
+        self.llm_max_concurrency = ConfigUtility.GROQ_MAX_CONCURRENCY
+        self.llm_executor = ThreadPoolExecutor(max_workers=self.llm_max_concurrency)
 
     @staticmethod
     def process_text(text):
         return text.replace("\r\n", "")
 
-    def predict_ner_labels(self, text, labels):
+    @staticmethod
+    def build_question(question, sub_section=None, section=None):
+        """
+        Builds the question prefix that is prepended to the section text before running NER.
+
+        Args:
+            question (str): The field to be asked for.
+            sub_section (str, optional): The subsection containing the field.
+            section (str, optional): The section containing the subsection.
+
+        Returns:
+            str: The question prompt, terminated by a newline.
+        """
+
+        if sub_section is None:
+            return f"What is the {question}?\n"
+        return f"What is the {question} of the {sub_section} of the {section}?\n"
+
+    def predict_ner_labels_batch(self, texts, labels):
         """
-        Predicts Named Entity Recognition (NER) labels for the given text.
+        Predicts Named Entity Recognition (NER) labels for several texts using batched inference.
 
-        This function uses a pre-trained NER model to predict entity labels based on the provided
-        text and a list of target labels.
+        The texts are split into batches of `self.ner_batch_size` and each batch is run through the
+        model in a single forward pass.
 
         Args:
-            text (str): The input text for which NER labels need to be predicted.
+            texts (list): A list of input texts for which NER labels need to be predicted.
             labels (list): A list of entity labels to predict.
 
         Returns:
-            dict: A dictionary containing the predicted entities, where the keys are the entity labels
-                  and the values are the corresponding extracted text or entities.
+            list: A list with one entry per input text, in the same order, holding the predicted entities
+                  for that text. If a batch fails, its entries are None.
+        """
+
+        res = []
+        logger.info(f"Predicting NER labels for {len(texts)} inputs in batches of {self.ner_batch_size}...")
+        for start in range(0, len(texts), self.ner_batch_size):
+            batch = texts[start:start + self.ner_batch_size]
+            try:
+                res.extend(self.model.batch_predict_entities(batch, labels))
+            except Exception as e:
+                logger.error(f"Error while predicting NER labels for batch starting at {start}: {e}")
+                res.extend([None] * len(batch))
+        return res
+
+    def iter_query_windows(self, queries):
         """
+        Splits the section text of each query into windows that fit in the model with the question prefix.
 
-        try:
-            logger.info("Predicting NER labels...")
-            return self.model.predict_entities(text, labels)
-        except Exception as e:
-            logger.error(f"Error while predicting NER labels: {e}")
+        Consecutive queries on the same section text, such as the fields of one section, share the windows
+        of the text instead of splitting it again.
 
-    def process_section_l1(self, questions, section_text, entire_text):
+        Args:
+            queries (list): A list of (question, section_text) tuples, the text normalized with `process_text`.
+
+        Yields:
+            tuple: (query_index, prefix_length, char_offset, input_text), where input_text is the question
+                   followed by a window of the section text starting at char_offset.
         """
-        Processes a section of text to extract answers for specified questions using NER and LLM models.
 
-        This function processes a given section of text and uses a combination of Named Entity Recognition (NER)
-        and a language model (LLM) to extract answers for a list of questions. If the NER prediction confidence
-        is below a specified threshold, the LLM is used as a fallback to provide an answer.
+        last_key, windows = None, None
+        for idx, (question, section_text) in enumerate(queries):
+            max_words = self.max_words - count_words(question)
+            if last_key is None or last_key[0] is not section_text or last_key[1] != max_words:
+                last_key, windows = (section_text, max_words), list(iter_windows(section_text, max_words,
+                                                                                   self.window_overlap))
+            for offset, window in windows:
+                yield idx, len(question), offset, question + window
+
+    @staticmethod
+    def shift_spans(entities, prefix_length, offset):
+        """
+        Maps the entities predicted on a window back to the source text.
 
         Args:
-            questions (list): A list of questions for which answers need to be extracted.
-            section_text (str): The specific section text to be processed.
-            entire_text (str): The full text that can be used as context for fallback answers.
+            entities (list): The entities predicted on the input text, or None if the prediction failed.
+            prefix_length (int): The length of the question prefix of the input text.
+            offset (int): The position of the window in the source text.
 
         Returns:
-            dict: A dictionary where the keys are the questions and the values are dictionaries containing:
-                  - "value" (str): The extracted answer text.
-                  - "confidence" (float): The confidence score of the prediction.
+            list: The entities with their offsets relative to the source text. Entities found in the
+                  question prefix are dropped.
+        """
+
+        shifted = []
+        for entity in entities or []:
+            if entity["start"] < prefix_length:
+                continue
+            shifted.append({**entity, "start": entity["start"] - prefix_length + offset,
+                            "end": entity["end"] - prefix_length + offset})
+        return shifted
 
+    def predict_windows(self, windows, labels, count):
         """
+        Runs the NER model over a stream of windows in batches and merges the entities of each source text.
 
-        try:
+        At most `self.ner_batch_size` input texts are held in memory at a time, besides the windows of the
+        section text being queried, however many queries there are.
 
-            processed_text = self.process_text(section_text)
-            entire_text = self.process_text(entire_text)
+        Args:
+            windows (iterable): (source_index, prefix_length, char_offset, input_text) tuples, as yielded by
+                                `iter_query_windows`.
+            labels (list): A list of entity labels to predict.
+            count (int): The number of source texts.
 
-            section_res = {}
+        Returns:
+            list: A list with one entry per source text holding its merged entities, as returned by `merge_spans`.
+        """
 
-            for question in questions:
-                _q = f"What is the {question}?\n"
-                _input = _q + processed_text
-                ner_res = self.predict_ner_labels(text=_input, labels=["answer"])
+        spans = [[] for _ in range(count)]
+        while True:
+            batch = list(islice(windows, self.ner_batch_size))
+            if not batch:
+                break
+            with timed("ner_batch"):
+                ner_results = self.predict_ner_labels_batch(texts=[text for *_, text in batch], labels=labels)
+            observe("ner_batch_size", len(batch))
+            for (idx, prefix_length, offset, _), ner_res in zip(batch, ner_results):
+                spans[idx].extend(self.shift_spans(ner_res, prefix_length, offset))
+        return [merge_spans(entities) for entities in spans]
+
+    def predict_patterns(self, queries, fields=None):
+        """
+        Runs the pattern extractors, the first tier of the extraction cascade, over the queries of the fields
+        that have one, such as the booking number, the weights, the container sizes and the dates.
 
-                if ner_res:
-                    ner_pred = max(ner_res, key=lambda x: x['score'])
-                    if ner_pred["score"] < self.ner_threshold:
-                        ner_pred = self.llm_inst.answer_question(question=_q, text=entire_text)
-                else:
-                    ner_pred = self.llm_inst.answer_question(question=_q, text=entire_text)
+        Args:
+            queries (list): A list of (question, section_text) tuples.
+            fields (list, optional): The path of the field of each query. Without it, no pattern is run.
 
-                section_res[question] = {
-                        "value": ner_pred["text"],
-                        "confidence": ner_pred["score"]
-                    }
+        Returns:
+            list: A list with one entry per query, in the same order, holding the pattern prediction (a dictionary
+                  with "text", "score" and "normalized"), or None if there is no confident match and the
+                  next tier must be used.
+        """
+
+        if not self.pattern_extraction or fields is None:
+            return [None] * len(queries)
+
+        predictions = []
+        for path, (_, section_text) in zip(fields, queries):
+            pred = extract_field(tuple(path), section_text)
+            predictions.append(pred if pred is not None and pred["score"] >= self.ner_threshold else None)
+        inc("pattern_hits", sum(pred is not None for pred in predictions))
+        return predictions
+
+    def predict_questions(self, queries, fields=None):
+        """
+        Runs the pattern extractors and then the NER model over a list of question-prefixed queries in batches.
+
+        The queries answered with confidence by their pattern extractor are not run through the NER model.
+        Section texts longer than the model can take are split into overlapping windows, each prefixed with the
+        question, and the entities found in the windows of a query are merged.
+
+        Args:
+            queries (list): A list of (question, section_text) tuples, where question is a prompt
+                            built with `build_question` and section_text is the text to search, normalized
+                            with `process_text`.
+            fields (list, optional): The path of the field of each query, such as ("booking_details",
+                                     "booking_number"), used to find its pattern extractor.
+
+        Returns:
+            list: A list with one entry per query, in the same order, holding the best prediction
+                  (a dictionary with "text" and "score"), or None if the prediction is missing or its
+                  score is below the threshold and the LLM must be used as a fallback.
+        """
+
+        predictions = self.predict_patterns(queries, fields)
+        remaining = [idx for idx, pred in enumerate(predictions) if pred is None]
+        ner_results = self.predict_windows(self.iter_query_windows([queries[idx] for idx in remaining]),
+                                           labels=["answer"], count=len(remaining))
 
-            return section_res
-        except Exception as e:
-            logger.error(f"Error while processing section: {e}")
+        for idx, ner_res in zip(remaining, ner_results):
+            ner_pred = max(ner_res, key=lambda x: x['score']) if ner_res else None
+            if ner_pred is not None and ner_pred["score"] < self.ner_threshold:
+                ner_pred = None
+            predictions[idx] = ner_pred
 
-    def process_section_l2(self, questions, sub_section, section, section_text, entire_text):
+        inc("ner_questions", len(remaining))
+        inc("ner_fallbacks", sum(predictions[idx] is None for idx in remaining))
+        return predictions
+
+    def fallback_context(self, questions, entire_text):
         """
-        Processes a subsection of text to extract answers for specified questions using NER and LLM models.
+        Selects the part of the document sent to the LLM along with fallback questions.
 
-        This function processes a given subsection within a section of text and uses a combination of Named Entity Recognition (NER)
-        and a language model (LLM) to extract answers for a list of questions. If the NER prediction confidence
-        is below a specified threshold, the LLM is used as a fallback to provide an answer.
+        Documents that fit in the retrieval token budget are sent whole. For longer documents, only the
+        chunks a BM25 index ranks as most relevant to each question are sent. The index is built once per document.
 
         Args:
-            questions (list): A list of questions for which answers need to be extracted.
-            sub_section (str): The name of the specific subsection being processed.
-            section (str): The parent section that contains the subsection.
-            section_text (str): The specific subsection text to be processed.
+            questions (list): The question prompts asked in the same request.
+            entire_text (str): The full text of the document.
+
+        Returns:
+            str: The context for the questions.
+        """
+
+        if not ConfigUtility.RETRIEVAL_ENABLED or estimate_text_tokens(entire_text) <= ConfigUtility.RETRIEVAL_TOKEN_BUDGET:
+            return entire_text
+
+        index = get_index(entire_text, chunk_words=ConfigUtility.RETRIEVAL_CHUNK_WORDS,
+                          overlap_words=ConfigUtility.RETRIEVAL_OVERLAP_WORDS)
+        context = index.select_context_for_all(questions, top_k=ConfigUtility.RETRIEVAL_TOP_K,
+                                               token_budget=ConfigUtility.RETRIEVAL_TOKEN_BUDGET)
+        return context or entire_text
+
+    def group_fallbacks(self, questions):
+        """
+        Splits the fallback questions into the groups sent together in one LLM request.
+
+        Args:
+            questions (list): The question prompts to be answered.
+
+        Returns:
+            list: The groups of questions, each holding at most `GROQ batch_fallback_size` questions,
+                  or a group per question if batching is disabled.
+        """
+
+        size = ConfigUtility.GROQ_BATCH_FALLBACK_SIZE if ConfigUtility.GROQ_BATCH_FALLBACK else 1
+        return [questions[start:start + size] for start in range(0, len(questions), max(size, 1))]
+
+    def answer_group(self, questions, entire_text):
+        """
+        Answers a group of fallback questions with the LLM, in one request if there are several.
+
+        Args:
+            questions (list): The question prompts to be answered.
+            entire_text (str): The full text of the document.
+
+        Returns:
+            list: One answer per question, in the same order, each a dictionary containing "text" and "score".
+        """
+
+        context = self.fallback_context(questions, entire_text)
+        if len(questions) == 1:
+            return [self.llm_inst.answer_question(question=questions[0], text=context)]
+        answers = self.llm_inst.answer_questions(questions=questions, text=context)
+        return [answers[question] for question in questions]
+
+    async def answer_group_async(self, questions, entire_text):
+        """
+        The asyncio counterpart of `answer_group`.
+
+        Args:
+            questions (list): The question prompts to be answered.
+            entire_text (str): The full text of the document.
+
+        Returns:
+            list: One answer per question, in the same order, each a dictionary containing "text" and "score".
+        """
+
+        context = self.fallback_context(questions, entire_text)
+        if len(questions) == 1:
+            return [await self.async_llm_inst.answer_question(question=questions[0], text=context)]
+        answers = await self.async_llm_inst.answer_questions(questions=questions, text=context)
+        return [answers[question] for question in questions]
+
+    def answer_fallbacks(self, questions, entire_text):
+        """
+        Answers a list of questions with the LLM, sending the requests concurrently.
+
+        The questions are grouped by `group_fallbacks` so that several of them are asked in one request, and
+        each request is sent with the context selected by `fallback_context` rather than the entire text.
+        The requests go through a thread pool shared by all callers of this instance, so at most
+        `self.llm_max_concurrency` requests are in flight at the same time, even when several sections
+        are answered in parallel.
+
+        Args:
+            questions (list): A list of question prompts to be answered.
+            entire_text (str): The full text that is used as context for the answers.
+
+        Returns:
+            list: A list with one answer per question, in the same order, each a dictionary
+                  containing "text" and "score".
+        """
+
+        if not questions:
+            return []
+
+        logger.info(f"Answering {len(questions)} low-confidence questions with the LLM...")
+        futures = [submit(self.llm_executor, self.answer_group, group, entire_text)
+                   for group in self.group_fallbacks(questions)]
+        answers = []
+        for future in futures:
+            answers.extend(future.result())
+        return answers
+
+    async def answer_fallbacks_async(self, questions, entire_text):
+        """
+        Answers a list of questions with the async LLM client, awaiting the requests concurrently.
+
+        The questions are grouped as in `answer_fallbacks`, and at most `self.llm_max_concurrency` requests
+        are in flight at the same time.
+
+        Args:
+            questions (list): A list of question prompts to be answered.
+            entire_text (str): The full text that is used as context for the answers.
+
+        Returns:
+            list: A list with one answer per question, in the same order, each a dictionary
+                  containing "text" and "score".
+        """
+
+        if not questions:
+            return []
+
+        logger.info(f"Answering {len(questions)} low-confidence questions with the LLM...")
+        semaphore = asyncio.Semaphore(self.llm_max_concurrency)
+
+        async def _answer(group):
+            async with semaphore:
+                return await self.answer_group_async(group, entire_text)
+
+        answers = []
+        for group_answers in await asyncio.gather(*[_answer(group) for group in self.group_fallbacks(questions)]):
+            answers.extend(group_answers)
+        return answers
+
+    @staticmethod
+    def _merge_predictions(predictions, fallback_indices, fallback_answers):
+        for idx, answer in zip(fallback_indices, fallback_answers):
+            predictions[idx] = answer
+
+        # The values found by the pattern extractors also carry their normalized form.
+        return [{"value": pred["text"], "confidence": pred["score"],
+                 **({"normalized": pred["normalized"]} if "normalized" in pred else {})} for pred in predictions]
+
+    def resolve_predictions(self, questions, predictions, entire_text):
+        """
+        Completes the NER predictions of a list of questions with LLM answers where they are missing.
+
+        Args:
+            questions (list): A list of question prompts.
+            predictions (list): The predictions returned by `predict_questions` for these questions.
             entire_text (str): The full text that can be used as context for fallback answers.
 
         Returns:
-            dict: A dictionary where the keys are the questions and the values are dictionaries containing:
+            list: A list with one entry per question, in the same order, each a dictionary containing:
                   - "value" (str): The extracted answer text.
                   - "confidence" (float): The confidence score of the prediction.
+                  - "normalized" (optional): The normalized value, for the answers of the pattern extractors.
         """
 
-        try:
-            processed_text = self.process_text(section_text)
-            entire_text = self.process_text(entire_text)
+        entire_text = self.process_text(entire_text)
 
-            section_res = {}
+        predictions = list(predictions)
+        fallback_indices = [idx for idx, pred in enumerate(predictions) if pred is None]
+        fallback_answers = self.answer_fallbacks(questions=[questions[idx] for idx in fallback_indices],
+                                                 entire_text=entire_text)
+        return self._merge_predictions(predictions, fallback_indices, fallback_answers)
 
-            for question in questions:
-                _q = f"What is the {question} of the {sub_section} of the {section}?\n"
-                _input = _q + processed_text
-                ner_res = self.predict_ner_labels(text=_input, labels=["answer"])
+    async def resolve_predictions_async(self, questions, predictions, entire_text):
+        """
+        The asyncio counterpart of `resolve_predictions`, awaiting the LLM answers concurrently.
+
+        Args:
+            questions (list): A list of question prompts.
+            predictions (list): The predictions returned by `predict_questions` for these questions.
+            entire_text (str): The full text that can be used as context for fallback answers.
 
-                if ner_res:
-                    ner_pred = max(ner_res, key=lambda x: x['score'])
-                    if ner_pred["score"] < self.ner_threshold:
-                        ner_pred = self.llm_inst.answer_question(question=_q, text=entire_text)
-                else:
-                    ner_pred = self.llm_inst.answer_question(question=_q, text=entire_text)
+        Returns:
+            list: The same structure as returned by `resolve_predictions`.
+        """
 
-                section_res[question] = {
-                    "value": ner_pred["text"],
-                    "confidence": ner_pred["score"]
-                }
+        entire_text = self.process_text(entire_text)
 
-            return section_res
-        except Exception as e:
-            logger.error(f"Error while processing section: {e}")
\ No newline at end of file
+        predictions = list(predictions)
+        fallback_indices = [idx for idx, pred in enumerate(predictions) if pred is None]
+        fallback_answers = await self.answer_fallbacks_async(questions=[questions[idx] for idx in fallback_indices],
+                                                             entire_text=entire_text)
+        return self._merge_predictions(predictions, fallback_indices, fallback_answers)
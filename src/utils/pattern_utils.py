@@ -0,0 +1,267 @@
+import re
+from datetime import date
+
+# Confidence of a value found after its label, and of one of several different values found for a field.
+LABELLED_SCORE = 0.97
+AMBIGUOUS_SCORE = 0.6
+
+MONTHS = {"jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6, "jul": 7, "aug": 8, "sep": 9, "oct": 10,
+          "nov": 11, "dec": 12}
+MONTH_NAME = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?"
+
+DATE_PATTERN = (
+    rf"(?P<iso>(?P<iy>\d{{4}})-(?P<im>\d{{1,2}})-(?P<id>\d{{1,2}}))"
+    rf"|(?P<num>(?P<nd>\d{{1,2}})[./-](?P<nm>\d{{1,2}})[./-](?P<ny>\d{{4}}|\d{{2}}))"
+    rf"|(?P<dmy>(?P<dd>\d{{1,2}})(?:st|nd|rd|th)?[\s-]+(?P<dm>{MONTH_NAME})[\s,-]+(?P<dy>\d{{4}}|\d{{2}}))"
+    rf"|(?P<mdy>(?P<mm>{MONTH_NAME})\s+(?P<md>\d{{1,2}})(?:st|nd|rd|th)?,?\s+(?P<my>\d{{4}}))"
+)
+
+# An optional time of day following a date, such as "21:00" or "T21:00:00".
+TIME_PATTERN = r"(?:(?:\s*,\s*|\s+|T)(?P<hour>[01]?\d|2[0-3])[:h](?P<minute>[0-5]\d)(?::[0-5]\d)?\b)?"
+# A code shaped like a date, which is never a booking or contract number.
+DATE_VALUE_PATTERN = re.compile(rf"(?:{DATE_PATTERN})", re.IGNORECASE)
+
+# A label, then an optional "no.", "number" or "#", a separator and the code, which holds at least one digit.
+CODE_SUFFIX = r"\s*(?:no\.?|nr\.?|number|ref(?:erence)?\.?|#)?\s*[:#.]?\s*(?P<value>(?=[A-Z0-9-]*\d)[A-Z0-9][A-Z0-9-]{3,24})\b"
+
+BOOKING_NUMBER_PATTERN = re.compile(r"\bbooking" + CODE_SUFFIX, re.IGNORECASE)
+SERVICE_CONTRACT_PATTERN = re.compile(r"\b(?:service\s+contract|contract|s/c)" + CODE_SUFFIX, re.IGNORECASE)
+
+WEIGHT_UNITS = {"kg": 1.0, "kgs": 1.0, "kilo": 1.0, "kilos": 1.0, "kilogram": 1.0, "kilograms": 1.0,
+                "t": 1000.0, "mt": 1000.0, "ton": 1000.0, "tons": 1000.0, "tonne": 1000.0, "tonnes": 1000.0,
+                "lb": 0.45359237, "lbs": 0.45359237, "pound": 0.45359237, "pounds": 0.45359237}
+WEIGHT_PATTERN = re.compile(
+    r"\b(?P<label>(?:total\s+)?(?:gross\s+)?weight)\b[^\d\n]{0,20}?"
+    r"(?P<value>(?P<amount>\d{1,3}(?:[,. ]\d{3})+(?:[.,]\d+)?|\d+(?:[.,]\d+)?)\s*"
+    r"(?P<unit>kilograms?|kilos?|kgs?|tonnes?|tons?|mt|t|pounds?|lbs?)\b)",
+    re.IGNORECASE)
+
+CONTAINER_SIZE = r"(?P<size>20|40|45)(?!\d)(?:\s*(?:'|′|’|ft\b|foot\b|feet\b))?"
+CONTAINER_PATTERN = re.compile(r"\b(?P<quantity>\d{1,3})\s*[x×]\s*" + CONTAINER_SIZE, re.IGNORECASE)
+# A quantity is only read in a container context, as a bare "Quantity:" may count packages or bags.
+CONTAINER_QUANTITY_PATTERN = re.compile(
+    r"\b(?:containers?\s+(?:quantity|qty|count)|(?:number|no\.?)\s+of\s+containers)\.?\s*[:#]?\s*"
+    r"(?P<quantity>\d{1,3})\b", re.IGNORECASE)
+CONTAINER_COUNT_PATTERN = re.compile(r"(?<![x×\d])(?<![x×]\s)\b(?P<quantity>\d{1,3})\s*(?:containers?|cntrs?)\b",
+                                     re.IGNORECASE)
+CONTAINER_SIZE_PATTERN = re.compile(r"\b(?:container\s+)?size\s*[:#]?\s*" + CONTAINER_SIZE, re.IGNORECASE)
+
+DEPARTURE_LABEL = r"\b(?:etd|e\.t\.d\.?|estimated\s+(?:time\s+of\s+)?departure(?:\s+date)?|departure\s+date|sailing\s+date)"
+ARRIVAL_LABEL = r"\b(?:eta|e\.t\.a\.?|estimated\s+(?:time\s+of\s+)?arrival(?:\s+date)?|arrival\s+date)"
+DEPARTURE_PATTERN = re.compile(DEPARTURE_LABEL + r"\s*[:\-]?\s*(?:" + DATE_PATTERN + ")" + TIME_PATTERN, re.IGNORECASE)
+ARRIVAL_PATTERN = re.compile(ARRIVAL_LABEL + r"\s*[:\-]?\s*(?:" + DATE_PATTERN + ")" + TIME_PATTERN, re.IGNORECASE)
+
+
+def parse_amount(text, lone_separator_is_decimal=False):
+    """
+    Parses a number written with thousands separators and a decimal point or comma.
+
+    A single separator followed by exactly three digits, as in "12,500" or "12.500", is read as a
+    thousands separator, unless `lone_separator_is_decimal` is set.
+
+    Args:
+        text (str): The number, such as "12,500.50", "12.500,50" or "12 500".
+        lone_separator_is_decimal (bool): Whether a single separator followed by exactly three digits is
+                                          a decimal point, as in weights given in tonnes ("24.500 MT").
+
+    Returns:
+        float: The parsed number.
+    """
+
+    text = text.replace(" ", "")
+    separators = [char for char in text if char in ",."]
+    if not separators:
+        return float(text)
+    decimal = separators[-1]
+    integer, _, fraction = text.rpartition(decimal)
+    lone_thousands = len(separators) == 1 and len(fraction) == 3 and not lone_separator_is_decimal
+    if len(set(separators)) == 1 and (len(separators) > 1 or lone_thousands):
+        return float(text.replace(decimal, ""))
+    return float(integer.replace(",", "").replace(".", "") + "." + fraction)
+
+
+def parse_date_match(match):
+    """
+    Builds the date found by `DATE_PATTERN`.
+
+    Numeric dates are read day first, as in most booking confirmations, unless the day cannot be a month.
+
+    Args:
+        match (re.Match): A match of a pattern holding `DATE_PATTERN`.
+
+    Returns:
+        date: The date, or None if the match is not a valid date.
+    """
+
+    groups = match.groupdict()
+    try:
+        if groups["iso"]:
+            return date(int(groups["iy"]), int(groups["im"]), int(groups["id"]))
+        if groups["num"]:
+            day, month, year = int(groups["nd"]), int(groups["nm"]), int(groups["ny"])
+            if month > 12 >= day:
+                day, month = month, day
+        elif groups["dmy"]:
+            day, month, year = int(groups["dd"]), MONTHS[groups["dm"][:3].lower()], int(groups["dy"])
+        else:
+            day, month, year = int(groups["md"]), MONTHS[groups["mm"][:3].lower()], int(groups["my"])
+        return date(year + 2000 if year < 100 else year, month, day)
+    except (ValueError, KeyError):
+        return None
+
+
+def _date_span(match):
+    name = next(name for name in ("iso", "num", "dmy", "mdy") if match.group(name))
+    return match.start(name), match.end() if match.group("minute") else match.end(name)
+
+
+def _best(candidates):
+    """
+    Picks the answer of a field among the values found for it.
+
+    Args:
+        candidates (list): (normalized, start, end, score) tuples, in text order.
+
+    Returns:
+        tuple: The highest-scored candidate, the first one on ties, its score lowered to `AMBIGUOUS_SCORE` if
+               the candidates disagree on the normalized value, or None if there is none.
+    """
+
+    if not candidates:
+        return None
+    normalized, start, end, score = max(candidates, key=lambda candidate: candidate[3])
+    if len({repr(candidate[0]) for candidate in candidates}) > 1:
+        score = min(score, AMBIGUOUS_SCORE)
+    return normalized, start, end, score
+
+
+def _prediction(text, candidate):
+    if candidate is None:
+        return None
+    normalized, start, end, score = candidate
+    return {"text": text[start:end], "score": score, "start": start, "end": end, "normalized": normalized}
+
+
+def _code(pattern, text):
+    return _prediction(text, _best([(match.group("value").upper(), match.start("value"), match.end("value"),
+                                     LABELLED_SCORE) for match in pattern.finditer(text)
+                                    if not DATE_VALUE_PATTERN.fullmatch(match.group("value"))]))
+
+
+def extract_booking_number(text):
+    return _code(BOOKING_NUMBER_PATTERN, text)
+
+
+def extract_service_contract_number(text):
+    return _code(SERVICE_CONTRACT_PATTERN, text)
+
+
+def extract_total_weight(text):
+    candidates = []
+    for match in WEIGHT_PATTERN.finditer(text):
+        factor = WEIGHT_UNITS[match.group("unit").lower()]
+        # Weights in tonnes are written with three decimals ("24.500 MT"), never with thousands of tonnes.
+        kilograms = round(parse_amount(match.group("amount"), lone_separator_is_decimal=factor >= 1000) * factor, 3)
+        # A weight labelled as a total wins over the weights of the single containers.
+        score = LABELLED_SCORE + 0.01 if "total" in match.group("label").lower() else LABELLED_SCORE
+        candidates.append(({"amount": kilograms, "unit": "kg"}, match.start("value"), match.end("value"), score))
+    totals = [candidate for candidate in candidates if candidate[3] > LABELLED_SCORE]
+    return _prediction(text, _best(totals or candidates))
+
+
+def extract_container_quantity(text):
+    candidates = [(int(match.group("quantity")), match.start("quantity"), match.end("quantity"), LABELLED_SCORE)
+                  for pattern in (CONTAINER_PATTERN, CONTAINER_QUANTITY_PATTERN, CONTAINER_COUNT_PATTERN)
+                  for match in pattern.finditer(text)]
+    return _prediction(text, _best(sorted(candidates, key=lambda candidate: candidate[1])))
+
+
+def extract_container_size(text):
+    candidates = [(f"{match.group('size')}ft", match.start("size"), match.end(), LABELLED_SCORE)
+                  for pattern in (CONTAINER_PATTERN, CONTAINER_SIZE_PATTERN) for match in pattern.finditer(text)]
+    return _prediction(text, _best(sorted(candidates, key=lambda candidate: candidate[1])))
+
+
+def _dated(pattern, text):
+    """
+    Extracts the labelled dates of a field, with their time of day when one follows, so that
+    "24 Oct 2024 12:00" is normalized to "2024-10-24T12:00" rather than losing its time.
+    """
+
+    candidates = []
+    for match in pattern.finditer(text):
+        parsed = parse_date_match(match)
+        if parsed is not None:
+            normalized = parsed.isoformat()
+            if match.group("minute"):
+                normalized += f"T{int(match.group('hour')):02d}:{match.group('minute')}"
+            candidates.append((normalized, *_date_span(match), LABELLED_SCORE))
+    return _prediction(text, _best(candidates))
+
+
+def extract_estimated_departure(text):
+    return _dated(DEPARTURE_PATTERN, text)
+
+
+def extract_estimated_arrival(text):
+    return _dated(ARRIVAL_PATTERN, text)
+
+
+# The extractors of the fields, by field name or by the dotted end of the field path for subsection fields.
+PATTERN_EXTRACTORS = {
+    "booking_number": extract_booking_number,
+    "service_contract_number": extract_service_contract_number,
+    "total_weight": extract_total_weight,
+    "container_details.quantity": extract_container_quantity,
+    "container_details.size": extract_container_size,
+    "estimated_departure": extract_estimated_departure,
+    "estimated_arrival": extract_estimated_arrival,
+}
+
+
+def register_extractor(key, extractor):
+    """
+    Adds the pattern extractor of a field, for example one of another document type.
+
+    Args:
+        key (str): The field name, or the dotted end of its path, such as "container_details.size".
+        extractor (callable): A function of the section text returning the prediction of the field (a
+                              dictionary with "text", "score", "start", "end" and "normalized"), or None.
+    """
+
+    PATTERN_EXTRACTORS[key] = extractor
+
+
+def find_extractor(path):
+    """
+    Finds the pattern extractor of a field, preferring the most specific key.
+
+    Args:
+        path (tuple): The path of keys locating the field in the output document.
+
+    Returns:
+        callable: The extractor, or None if the field has none.
+    """
+
+    for length in range(len(path), 0, -1):
+        extractor = PATTERN_EXTRACTORS.get(".".join(path[-length:]))
+        if extractor is not None:
+            return extractor
+    return None
+
+
+def extract_field(path, text):
+    """
+    Extracts a field from a section text with its pattern extractor.
+
+    Args:
+        path (tuple): The path of keys locating the field in the output document.
+        text (str): The section text.
+
+    Returns:
+        dict: The prediction of the field, with the matched "text", its "score", its "start" and "end"
+              offsets and its "normalized" value, or None if the field has no extractor or no match.
+    """
+
+    extractor = find_extractor(path)
+    return extractor(text) if extractor is not None and text else None
@@ -1,17 +1,161 @@
 import logging
-import pdfplumber
+import multiprocessing
+import os
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+
+from src.config import ConfigUtility
 
 logger = logging.getLogger(__name__)
 
 
-# Extract text from a PDF
+PageText = namedtuple("PageText", ["number", "text", "error"])
+
+
+def parse_page_range(spec, page_count):
+    """
+    Parses a page range such as "1-3,7,10-" into the indices of the selected pages.
+
+    Args:
+        spec (str): Comma-separated page numbers and ranges, starting at 1. Open ranges ("10-", "-3") run to
+                    the end or from the start of the document. None or an empty string selects every page.
+        page_count (int): The number of pages of the document.
+
+    Returns:
+        list: The sorted 0-based indices of the selected pages that exist in the document.
+    """
+
+    if not spec:
+        return list(range(page_count))
+
+    indices = set()
+    for part in str(spec).split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            first, last = part.split("-", 1)
+            first = int(first) if first.strip() else 1
+            last = int(last) if last.strip() else page_count
+        else:
+            first = last = int(part)
+        if first < 1 or last < first:
+            raise ValueError(f"Invalid page range: {part}")
+        indices.update(range(first - 1, min(last, page_count)))
+    return sorted(indices)
+
+
+def _extract_page(pdf, index):
+    page = pdf.pages[index]
+    try:
+        return PageText(index + 1, page.extract_text() or "", None)
+    except Exception as e:
+        logger.error(f"Error while extracting the text of page {index + 1}: {e}")
+        return PageText(index + 1, "", f"{type(e).__name__}: {e}")
+    finally:
+        # The parsed objects and layout of a page are cached on it until the file is closed.
+        page.close()
+
+
+def _extract_pages(pdf_path, indices):
+    import pdfplumber
+
+    with pdfplumber.open(pdf_path) as pdf:
+        return [_extract_page(pdf, index) for index in indices]
+
+
+_pdf_pool = None
+_pdf_pool_pid = None
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_pdf_pool():
+    global _pdf_pool, _pdf_pool_pid
+    with _pdf_pool_lock:
+        if _pdf_pool is None or _pdf_pool_pid != os.getpid():
+            # Spawned rather than forked, so that the workers do not inherit the models and threads of the parent.
+            _pdf_pool_pid = os.getpid()
+            _pdf_pool = ProcessPoolExecutor(max_workers=ConfigUtility.PDF_WORKERS,
+                                            mp_context=multiprocessing.get_context("spawn"))
+        return _pdf_pool
+
+
+def _reset_pdf_pool(broken_pool):
+    global _pdf_pool
+    with _pdf_pool_lock:
+        # Another document may already have replaced the broken pool.
+        if _pdf_pool is broken_pool:
+            _pdf_pool = None
+    broken_pool.shutdown(wait=False)
+
+
+def iter_pdf_pages(pdf_path, pages=None):
+    """
+    Extracts the text of the pages of a PDF, yielding each page as soon as it is parsed.
+
+    Only one page is parsed at a time and its cached layout is freed right after, so memory does not grow
+    with the number of pages. PDFs with at least `PDF parallel_min_pages` selected pages are split into
+    chunks of `PDF chunk_pages` pages extracted by a pool of `PDF workers` processes, with at most two
+    chunks per worker in flight. A page that cannot be parsed is reported with its error instead of
+    failing the whole document.
+
+    Args:
+        pdf_path (str): The file path to the PDF document.
+        pages (str, optional): The pages to extract, as accepted by `parse_page_range`. Defaults to every page.
+
+    Yields:
+        PageText: The number (starting at 1), the extracted text and the error, if any, of each page, in page order.
+    """
+
+    import pdfplumber
+
+    logger.info(f"Extracting the text from the PDF: {pdf_path}")
+    with pdfplumber.open(pdf_path) as pdf:
+        indices = parse_page_range(pages, len(pdf.pages))
+        if ConfigUtility.PDF_WORKERS <= 1 or len(indices) < ConfigUtility.PDF_PARALLEL_MIN_PAGES:
+            for index in indices:
+                yield _extract_page(pdf, index)
+            return
+
+    def _submit(chunk, attempt=0):
+        pool = _get_pdf_pool()
+        return chunk, attempt, pool, pool.submit(_extract_pages, pdf_path, chunk)
+
+    size = max(ConfigUtility.PDF_CHUNK_PAGES, 1)
+    chunks = iter([indices[start:start + size] for start in range(0, len(indices), size)])
+    pending = deque(_submit(chunk) for chunk in islice(chunks, 2 * ConfigUtility.PDF_WORKERS))
+    while pending:
+        chunk, attempt, pool, future = pending.popleft()
+        try:
+            results = future.result()
+        except BrokenProcessPool as e:
+            logger.error(f"Error while extracting pages {chunk[0] + 1}-{chunk[-1] + 1} in the pool: {e}")
+            _reset_pdf_pool(pool)
+            if attempt == 0:
+                # A worker that died breaks the whole pool, so this chunk and the other chunks in flight in it
+                # are resubmitted to a fresh pool. A chunk that breaks the pool twice is extracted here instead.
+                pending = deque([_submit(chunk, attempt + 1)] + [_submit(*entry[:2]) if entry[2] is pool else entry
+                                                                 for entry in pending])
+                continue
+            results = _extract_pages(pdf_path, chunk)
+        except Exception as e:
+            logger.error(f"Error while extracting pages {chunk[0] + 1}-{chunk[-1] + 1} in the pool: {e}")
+            results = _extract_pages(pdf_path, chunk)
+        for next_chunk in islice(chunks, 1):
+            pending.append(_submit(next_chunk))
+        yield from results
+
+
+
 def extract_text_from_pdf(pdf_path):
     """
     Extracts text content from a PDF file.
 
-    This function reads a PDF file page by page and extracts the text content from each page.
-    The extracted text is returned as a list of strings, where each string represents the text
-    content of a single page.
+    The pages are read with `iter_pdf_pages`. Pages that cannot be parsed are logged and returned as empty
+    strings, and a file that cannot be opened raises its error.
 
     Args:
         pdf_path (str): The file path to the PDF document.
@@ -20,26 +164,4 @@ def extract_text_from_pdf(pdf_path):
         list: A list of strings, where each string contains the extracted text from a corresponding page in the PDF.
     """
 
-    try:
-        res_pages = []
-        logger.info(f"Extracting the text from the PDF: {pdf_path}")
-        with pdfplumber.open(pdf_path) as pdf:
-            for page in pdf.pages:
-                # text = page.extract_tables()
-                # print(text)
-                # formatted_text = page.extract_text(layout=True)  # Preserves layout
-                formatted_text = page.extract_text()
-                res_pages.append(formatted_text)
-                # tables = page.extract_tables()
-                # for table in tables:
-                #     print("Table:", table)
-                #     print("--"*30)
-                #
-                # return {
-                #     "tables": tables,
-                #     "formatted_text": formatted_text
-                # }
-
-        return res_pages
-    except Exception as e:
-        logger.error(f"Error while extracting text from PDF: {e}")
+    return [page.text for page in iter_pdf_pages(pdf_path)]
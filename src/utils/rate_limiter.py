@@ -0,0 +1,295 @@
+import asyncio
+import email.utils
+import logging
+import random
+import re
+import threading
+import time
+
+from src.config import ConfigUtility
+from src.utils.metrics_utils import observe
+
+logger = logging.getLogger(__name__)
+
+DURATION_PATTERN = re.compile(r"(?:(\d+(?:\.\d+)?)h)?(?:(\d+(?:\.\d+)?)m(?!s))?(?:(\d+(?:\.\d+)?)s)?(?:(\d+(?:\.\d+)?)ms)?$")
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket refilled continuously at `rate_per_minute`, holding at most `capacity` tokens.
+
+    Callers reserve tokens up front and are told how long to wait before using them. The bucket may go into
+    debt, so concurrent callers are queued one behind the other instead of all retrying at the same moment.
+    """
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+        self.updated_at = now
+
+    def reserve(self, amount):
+        """
+        Takes tokens from the bucket.
+
+        Args:
+            amount (float): The number of tokens needed. Requests larger than the capacity are capped to it.
+
+        Returns:
+            float: The number of seconds to wait before the tokens may be used.
+        """
+
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= min(amount, self.capacity)
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate_per_second
+
+    def adjust(self, amount):
+        """
+        Gives back (positive amount) or takes (negative amount) tokens after the actual usage is known.
+
+        Args:
+            amount (float): The number of tokens to give back.
+        """
+
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class RateLimiter:
+    """
+    A client-side rate limiter for the Groq API, with a requests-per-minute and a tokens-per-minute budget.
+
+    It is shared by all the threads of a process. When the server asks to slow down, every caller is held
+    back until the time given by the server instead of only the one that received the error.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens):
+        """
+        Reserves one request and the given number of tokens.
+
+        Args:
+            tokens (int): The estimated number of tokens of the request.
+
+        Returns:
+            float: The number of seconds to wait before sending the request.
+        """
+
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        with self._lock:
+            return max(wait, self.paused_until - time.monotonic(), 0.0)
+
+    def acquire(self, tokens):
+        wait = self.reserve(tokens)
+        observe("rate_limit_wait_seconds", max(wait, 0.0))
+        if wait > 0:
+            logger.info(f"Rate limit reached, waiting {wait:.2f}s before calling the LLM...")
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens):
+        wait = self.reserve(tokens)
+        observe("rate_limit_wait_seconds", max(wait, 0.0))
+        if wait > 0:
+            logger.info(f"Rate limit reached, waiting {wait:.2f}s before calling the LLM...")
+            await asyncio.sleep(wait)
+
+    def record_usage(self, estimated_tokens, actual_tokens):
+        """
+        Corrects the tokens budget with the usage reported by the server.
+
+        Args:
+            estimated_tokens (int): The number of tokens reserved for the request.
+            actual_tokens (int): The number of tokens the server counted.
+        """
+
+        if actual_tokens is not None:
+            self.tokens.adjust(estimated_tokens - actual_tokens)
+
+    def pause(self, seconds):
+        """
+        Holds back every caller for the given number of seconds, following a hint from the server.
+
+        Args:
+            seconds (float): The number of seconds to wait.
+        """
+
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def estimate_tokens(messages, completion_tokens=None):
+    """
+    Estimates the number of tokens a chat request will consume, at about four characters per token.
+
+    Args:
+        messages (list): The chat messages of the request.
+        completion_tokens (int, optional): The number of tokens expected in the answer.
+
+    Returns:
+        int: The estimated number of prompt and completion tokens.
+    """
+
+    if completion_tokens is None:
+        completion_tokens = ConfigUtility.GROQ_COMPLETION_TOKENS_ESTIMATE
+    characters = sum(len(str(message.get("content", ""))) for message in messages)
+    return characters // 4 + completion_tokens
+
+
+def parse_duration(value):
+    """
+    Parses a duration given by the server, either in seconds ("7.5"), in the Groq format ("1m2.5s", "250ms")
+    or as an HTTP date.
+
+    Args:
+        value (str): The header value.
+
+    Returns:
+        float: The duration in seconds, or None if the value cannot be parsed.
+    """
+
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    match = DURATION_PATTERN.match(value)
+    if match and any(match.groups()):
+        hours, minutes, seconds, millis = (float(group) if group else 0.0 for group in match.groups())
+        return hours * 3600 + minutes * 60 + seconds + millis / 1000
+
+    try:
+        return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def retry_after_seconds(exception):
+    """
+    Reads how long the server asked to wait from the error of a failed request.
+
+    Args:
+        exception (Exception): The error raised by the Groq client.
+
+    Returns:
+        float: The number of seconds to wait, or None if the server gave no hint.
+    """
+
+    response = getattr(exception, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    # The reset headers come with every response; they are only a hint when the request was rate limited.
+    names = ["retry-after"]
+    if is_rate_limited(exception):
+        names += ["x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"]
+    for header in names:
+        seconds = parse_duration(headers.get(header))
+        if seconds is not None:
+            return seconds
+    return None
+
+
+def is_rate_limited(exception):
+    return getattr(exception, "status_code", None) == 429 or type(exception).__name__ == "RateLimitError"
+
+
+def backoff_delay(attempt, base_delay, max_delay):
+    """
+    Computes an exponential backoff delay with full jitter.
+
+    Args:
+        attempt (int): The number of the attempt that failed, starting at 1.
+        base_delay (float): The delay of the first attempt.
+        max_delay (float): The upper bound of the delay.
+
+    Returns:
+        float: A random delay between 0 and min(max_delay, base_delay * 2 ** (attempt - 1)).
+    """
+
+    return random.uniform(0, min(max_delay, base_delay * 2 ** (attempt - 1)))
+
+
+def retry_wait(exception, attempt, base_delay, max_delay):
+    """
+    Decides how long to wait before retrying a failed request.
+
+    The wait time given by the server is honoured when there is one. On a rate limit error, the whole
+    process is paused for that time, so that the other callers do not hit the limit as well.
+
+    Args:
+        exception (Exception): The error of the failed attempt.
+        attempt (int): The number of the attempt that failed, starting at 1.
+        base_delay (float): The delay of the first attempt when the server gives no hint.
+        max_delay (float): The upper bound of the delay when the server gives no hint.
+
+    Returns:
+        float: The number of seconds to wait.
+    """
+
+    hint = retry_after_seconds(exception)
+    wait = hint + random.uniform(0, base_delay) if hint is not None else backoff_delay(attempt, base_delay, max_delay)
+
+    limiter = get_rate_limiter()
+    if limiter is not None and is_rate_limited(exception):
+        limiter.pause(wait)
+    return wait
+
+
+_rate_limiter = None
+_rate_limiter_share = 1.0
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """
+    Returns the process-wide rate limiter, or None if rate limiting is disabled.
+
+    Returns:
+        RateLimiter: The shared rate limiter.
+    """
+
+    global _rate_limiter
+    if ConfigUtility.GROQ_REQUESTS_PER_MINUTE <= 0 and ConfigUtility.GROQ_TOKENS_PER_MINUTE <= 0:
+        return None
+
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            # A budget of 0 means unlimited; it is approximated with a very large bucket.
+            rpm = ConfigUtility.GROQ_REQUESTS_PER_MINUTE or 10 ** 9
+            tpm = ConfigUtility.GROQ_TOKENS_PER_MINUTE or 10 ** 12
+            _rate_limiter = RateLimiter(requests_per_minute=rpm * _rate_limiter_share,
+                                        tokens_per_minute=tpm * _rate_limiter_share)
+        return _rate_limiter
+
+
+def set_rate_limiter_share(share):
+    """
+    Sets the fraction of the configured budgets this process may use, for example 1/N for each of N
+    worker processes calling the API with the same key.
+
+    Args:
+        share (float): The fraction of the budgets, between 0 and 1.
+    """
+
+    global _rate_limiter, _rate_limiter_share
+    with _rate_limiter_lock:
+        _rate_limiter_share = share
+        _rate_limiter = None
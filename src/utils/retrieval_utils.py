@@ -0,0 +1,170 @@
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+
+TOKEN_PATTERN = re.compile(r"[^\W_]+", re.UNICODE)
+
+# The words of the question templates, which carry no information about where the answer is.
+QUERY_STOPWORDS = {"what", "are", "is", "the", "of", "and", "all", "a", "an"}
+
+
+def tokenize(text):
+    return [token.lower() for token in TOKEN_PATTERN.findall(text)]
+
+
+def estimate_text_tokens(text):
+    # About four characters per token, as for the LLM rate limits.
+    return len(text) // 4 + 1
+
+
+def chunk_text(text, chunk_words=60, overlap_words=15):
+    """
+    Splits a text into overlapping chunks of whole lines.
+
+    Lines are added to a chunk until it holds `chunk_words` words, and each chunk starts with the last lines
+    of the previous one, up to `overlap_words` words, so that an answer spanning a chunk boundary is kept whole
+    in at least one chunk.
+
+    Args:
+        text (str): The text to be split.
+        chunk_words (int): The number of words after which a chunk is closed.
+        overlap_words (int): The maximum number of words repeated from the previous chunk.
+
+    Returns:
+        list: A list of (start_line, chunk_text) tuples, in document order.
+    """
+
+    lines = []
+    for line in text.split("\n"):
+        # Lines longer than a chunk (text without line breaks) are cut into pieces of `chunk_words` words.
+        words = line.split()
+        if len(words) <= chunk_words:
+            lines.append(line)
+        else:
+            lines.extend(" ".join(words[idx:idx + chunk_words]) for idx in range(0, len(words), chunk_words))
+
+    chunks = []
+    start = 0
+    while start < len(lines):
+        end, words = start, 0
+        while end < len(lines) and (words < chunk_words or end == start):
+            words += len(lines[end].split())
+            end += 1
+        chunks.append((start, "\n".join(lines[start:end])))
+        if end >= len(lines):
+            break
+
+        # Step back over the last lines of the chunk to build the overlap, always moving forward.
+        next_start, overlap = end, 0
+        while next_start - 1 > start and overlap + len(lines[next_start - 1].split()) <= overlap_words:
+            next_start -= 1
+            overlap += len(lines[next_start].split())
+        start = next_start
+    return chunks
+
+
+class BM25Index:
+    """
+    A BM25 lexical index over the chunks of a document.
+    """
+
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks = chunks
+        self.k1 = k1
+        self.b = b
+
+        self.term_frequencies = [Counter(tokenize(chunk)) for _, chunk in chunks]
+        self.lengths = [sum(tf.values()) for tf in self.term_frequencies]
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+        document_frequencies = Counter()
+        for tf in self.term_frequencies:
+            document_frequencies.update(tf.keys())
+        count = len(chunks)
+        self.idf = {term: math.log(1 + (count - freq + 0.5) / (freq + 0.5)) for term, freq in document_frequencies.items()}
+
+    def score(self, query_terms, idx):
+        tf = self.term_frequencies[idx]
+        norm = self.k1 * (1 - self.b + self.b * self.lengths[idx] / (self.average_length or 1))
+        return sum(self.idf.get(term, 0.0) * tf[term] * (self.k1 + 1) / (tf[term] + norm)
+                   for term in query_terms if term in tf)
+
+    def search(self, query, top_k):
+        """
+        Ranks the chunks of the document by relevance to a query.
+
+        Args:
+            query (str): The query, typically a question.
+            top_k (int): The maximum number of chunks returned.
+
+        Returns:
+            list: The indices of the best chunks, most relevant first. Chunks without any query term are left out.
+        """
+
+        query_terms = set(tokenize(query)) - QUERY_STOPWORDS
+        scores = [(self.score(query_terms, idx), idx) for idx in range(len(self.chunks))]
+        ranked = sorted((item for item in scores if item[0] > 0), key=lambda item: (-item[0], item[1]))
+        return [idx for _, idx in ranked[:top_k]]
+
+    def _select_lines(self, query, top_k, token_budget, lines):
+        used = 0
+        for idx in self.search(query, top_k):
+            start, chunk = self.chunks[idx]
+            tokens = estimate_text_tokens(chunk)
+            if used and used + tokens > token_budget:
+                continue
+            used += tokens
+            for offset, line in enumerate(chunk.split("\n")):
+                lines[start + offset] = line
+        return lines
+
+    def select_context(self, query, top_k, token_budget):
+        """
+        Selects the chunks most relevant to a query that fit in a token budget.
+
+        Args:
+            query (str): The query, typically a question.
+            top_k (int): The maximum number of chunks selected.
+            token_budget (int): The maximum estimated number of tokens of the selected chunks.
+
+        Returns:
+            str: The lines of the selected chunks, in document order and without the overlaps, joined with newlines.
+        """
+
+        return self.select_context_for_all([query], top_k=top_k, token_budget=token_budget)
+
+    def select_context_for_all(self, queries, top_k, token_budget):
+        """
+        Selects the chunks relevant to any of several queries, each query getting its own chunks and budget.
+
+        Args:
+            queries (list): The queries, typically the questions asked together in one request.
+            top_k (int): The maximum number of chunks selected per query.
+            token_budget (int): The maximum estimated number of tokens of the chunks selected per query.
+
+        Returns:
+            str: The lines of the selected chunks, in document order and without the overlaps, joined with newlines.
+        """
+
+        lines = {}
+        for query in queries:
+            self._select_lines(query, top_k, token_budget, lines)
+        return "\n".join(lines[line_no] for line_no in sorted(lines))
+
+
+@lru_cache(maxsize=32)
+def get_index(text, chunk_words=60, overlap_words=15):
+    """
+    Returns the BM25 index of a document, building it only once for the same text.
+
+    Args:
+        text (str): The entire text of the document.
+        chunk_words (int): The number of words after which a chunk is closed.
+        overlap_words (int): The maximum number of words repeated from the previous chunk.
+
+    Returns:
+        BM25Index: The index over the chunks of the text.
+    """
+
+    return BM25Index(chunk_text(text, chunk_words=chunk_words, overlap_words=overlap_words))
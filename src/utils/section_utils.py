@@ -0,0 +1,177 @@
+import re
+from difflib import SequenceMatcher
+
+# Headings and field labels commonly found in the sections of booking confirmations.
+SECTION_KEYWORDS = {
+    "booking_details": ["booking details", "booking confirmation", "booking number", "booking no", "booking ref",
+                        "booking reference", "service contract", "contract number", "contract no", "reference"],
+    "shipment_route": ["routing", "route", "routing information", "shipment route", "port of loading", "pol",
+                       "port of discharge", "pod", "place of receipt", "place of delivery", "final destination",
+                       "origin", "destination", "transhipment", "transshipment", "transit port", "via"],
+    "cargo_information": ["cargo", "cargo details", "cargo information", "commodity", "container", "containers",
+                          "equipment", "container type", "weight", "gross weight", "total weight",
+                          "description of goods", "goods description", "packages", "quantity"],
+    "vessel_information": ["vessel", "vessel name", "vessel voyage", "voyage", "voyage no", "vessel information",
+                           "sailing", "sailing schedule", "etd", "eta", "estimated departure", "estimated arrival",
+                           "estimated time of departure", "estimated time of arrival", "cut off", "cutoff"],
+    "parties_information": ["parties", "parties information", "shipper", "consignee", "notify party", "carrier",
+                            "forwarder", "freight forwarder", "booking party", "contact", "agent"],
+}
+
+WORD_PATTERN = re.compile(r"[^\W_]+", re.UNICODE)
+
+# Headings of the terms and conditions, which hold no booking data and run to the end of the page.
+TERMS_HEADING_PATTERN = re.compile(
+    r"^\W*(?:(?:general\s+|standard\s+)?terms\s+(?:and|&)\s+conditions|general\s+terms|"
+    r"(?:standard\s+|general\s+)?conditions\s+of\s+(?:carriage|contract|booking)|"
+    r"(?:standard\s+)?trading\s+conditions)\b",
+    re.IGNORECASE)
+
+
+def normalize_label(text):
+    return " ".join(word.lower() for word in WORD_PATTERN.findall(text))
+
+
+def build_keywords(extraction_model):
+    """
+    Builds the keywords of each section of an extraction model.
+
+    The keywords of the known sections are completed with the names of the section and of its fields, so that
+    sections of other document types are also recognised by their own vocabulary.
+
+    Args:
+        extraction_model (dict): The extraction model.
+
+    Returns:
+        dict: A dictionary mapping each section to its list of normalized keywords.
+    """
+
+    keywords = {}
+    for section, fields in extraction_model.items():
+        words = list(SECTION_KEYWORDS.get(section, [])) + [section]
+        for field, sub_fields in fields.items():
+            words.append(field)
+            if isinstance(sub_fields, list):
+                sub_fields = sub_fields[0] if sub_fields else {}
+            words.extend(f"{field} {sub_field}" for sub_field in sub_fields)
+        keywords[section] = list(dict.fromkeys(normalize_label(word) for word in words))
+    return keywords
+
+
+def strip_terms(text):
+    """
+    Drops the terms and conditions from a page of English text, from their heading to the end of the page.
+
+    Args:
+        text (str): The text of the page.
+
+    Returns:
+        str: The text before the terms and conditions, or the whole text if the page holds none.
+    """
+
+    lines = text.split("\n")
+    for idx, line in enumerate(lines):
+        if TERMS_HEADING_PATTERN.match(line.strip()):
+            return "\n".join(lines[:idx])
+    return text
+
+
+def match_section(label, keywords, min_ratio=0.85):
+    """
+    Finds the section a label belongs to, tolerating small spelling and OCR differences.
+
+    Args:
+        label (str): The normalized label, such as a heading or the part of a line before a colon.
+        keywords (dict): The keywords of each section, as returned by `build_keywords`.
+        min_ratio (float): The minimum similarity for a fuzzy match.
+
+    Returns:
+        str: The best matching section, or None if no keyword is close enough.
+    """
+
+    if not label:
+        return None
+
+    best_section, best_ratio = None, min_ratio
+    for section, words in keywords.items():
+        for word in words:
+            if label == word:
+                return section
+            # Long labels such as "port of loading shanghai" start with the keyword.
+            if label.startswith(word + " ") and len(word) > 3:
+                ratio = 0.95
+            else:
+                ratio = SequenceMatcher(None, label, word).ratio()
+            if ratio > best_ratio:
+                best_section, best_ratio = section, ratio
+    return best_section
+
+
+def is_heading(line):
+    """
+    Tells whether a line looks like a heading: short, and either upper case, title case or ending with a colon.
+
+    Args:
+        line (str): The line to be checked.
+
+    Returns:
+        bool: True if the line is laid out as a heading.
+    """
+
+    stripped = line.strip()
+    words = stripped.rstrip(":").split()
+    if not words or len(words) > 6:
+        return False
+    letters = [char for char in stripped if char.isalpha()]
+    if not letters:
+        return False
+    return stripped.endswith(":") or stripped.isupper() or all(word[:1].isupper() for word in words if word[:1].isalpha())
+
+
+def split_sections(text, extraction_model, keywords=None):
+    """
+    Splits a page into the sections of an extraction model with heading patterns, fuzzy keyword matching
+    and layout cues, without any network call.
+
+    A heading switches the current section. A "label: value" line whose label belongs to another section
+    goes to that section without switching. The other lines go to the current section. The terms and
+    conditions are dropped first, so that their lines never end up in the section above them.
+
+    Args:
+        text (str): The English text of the page.
+        extraction_model (dict): The extraction model whose sections are isolated.
+        keywords (dict, optional): The keywords of each section, as returned by `build_keywords`.
+
+    Returns:
+        tuple: A dictionary mapping every section to its text (empty if not found), and a confidence score
+               between 0 and 1 combining the share of sections found and the share of lines assigned.
+    """
+
+    keywords = keywords or build_keywords(extraction_model)
+    sections = {section: [] for section in extraction_model}
+    current = None
+    assigned = total = 0
+
+    for line in strip_terms(text).split("\n"):
+        if not line.strip():
+            continue
+        total += 1
+
+        label, has_value = line, False
+        if ":" in line:
+            label, value = line.split(":", 1)
+            has_value = bool(value.strip())
+        section = match_section(normalize_label(label), keywords)
+
+        if section is not None and is_heading(line) and not has_value:
+            current = section
+        target = section if section is not None else current
+        if target is not None:
+            sections[target].append(line)
+            assigned += 1
+
+    found = sum(1 for lines in sections.values() if lines)
+    score = 0.0
+    if total and sections:
+        score = 0.7 * found / len(sections) + 0.3 * assigned / total
+    return {section: "\n".join(lines) for section, lines in sections.items()}, score
@@ -0,0 +1,107 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from src.utils.metrics_utils import submit, timed
+
+logger = logging.getLogger(__name__)
+
+
+class TaskGraph:
+    """
+    A small dependency graph of tasks that runs every task as soon as all of its dependencies are done.
+
+    Each task is a callable that receives the results of its dependencies as keyword arguments named after
+    them. A dependency may also be one of the inputs given to `run`. Independent tasks run in parallel on a
+    thread pool.
+    """
+
+    def __init__(self, max_workers=None):
+        self.tasks = {}
+        self.max_workers = max_workers
+
+    def add_task(self, name, func, dependencies=()):
+        """
+        Adds a task to the graph.
+
+        Args:
+            name (str): The unique name of the task, under which its result is stored.
+            func (callable): The function to run, called with the results of the dependencies as keyword arguments.
+            dependencies (list): The names of the tasks or inputs this task depends on.
+
+        Returns:
+            TaskGraph: The graph itself, so that calls can be chained.
+        """
+
+        if name in self.tasks:
+            raise ValueError(f"Task {name} is already defined.")
+        self.tasks[name] = (func, list(dependencies))
+        return self
+
+    def _validate(self, inputs):
+        for name, (_, dependencies) in self.tasks.items():
+            for dep in dependencies:
+                if dep not in self.tasks and dep not in inputs:
+                    raise ValueError(f"Task {name} depends on unknown task or input {dep}.")
+
+        visited, in_progress = set(), set()
+
+        def _visit(name):
+            if name in visited or name in inputs:
+                return
+            if name in in_progress:
+                raise ValueError(f"Task graph has a cycle through {name}.")
+            in_progress.add(name)
+            for dep in self.tasks[name][1]:
+                _visit(dep)
+            in_progress.remove(name)
+            visited.add(name)
+
+        for name in self.tasks:
+            _visit(name)
+
+    def run(self, **inputs):
+        """
+        Runs all the tasks of the graph.
+
+        Args:
+            **inputs: The values available to the tasks as dependencies, in addition to the task results.
+
+        Returns:
+            dict: A dictionary mapping each task name (and input name) to its result.
+
+        Raises:
+            Exception: The exception of the first task that fails. The tasks that have not started yet are cancelled.
+        """
+
+        self._validate(inputs)
+
+        results = dict(inputs)
+        pending = dict(self.tasks)
+        max_workers = self.max_workers or max(len(self.tasks), 1)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            running = {}
+
+            def _submit_ready():
+                for name in list(pending):
+                    func, dependencies = pending[name]
+                    if all(dep in results for dep in dependencies):
+                        del pending[name]
+                        kwargs = {dep: results[dep] for dep in dependencies}
+                        running[submit(executor, timed("task", task=name)(func), **kwargs)] = name
+
+            _submit_ready()
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception:
+                        logger.error(f"Task {name} failed, cancelling the remaining tasks.")
+                        for other in running:
+                            other.cancel()
+                        raise
+                _submit_ready()
+
+        return results
@@ -0,0 +1,72 @@
+import re
+from collections import deque
+
+# The word splitter of GLiNER, whose maximum sequence length is counted in these words.
+GLINER_WORD_PATTERN = re.compile(r"\w+(?:[-_]\w+)*|\S")
+
+
+def count_words(text):
+    return sum(1 for _ in GLINER_WORD_PATTERN.finditer(text))
+
+
+def iter_windows(text, max_words, overlap_words):
+    """
+    Splits a text into overlapping windows of at most `max_words` GLiNER words.
+
+    The text is scanned once and only the word offsets of the current window are kept, so memory does not
+    grow with the length of the text. Consecutive windows share `overlap_words` words, so that an answer
+    crossing a window boundary is whole in at least one of them.
+
+    Args:
+        text (str): The text to be split.
+        max_words (int): The maximum number of words of a window.
+        overlap_words (int): The number of words repeated at the start of the next window, at most half a window.
+
+    Yields:
+        tuple: (char_offset, window_text), where char_offset is the position of the window in the text.
+    """
+
+    max_words = max(max_words, 1)
+    # The overlap is capped at half a window so that the text is always consumed at a steady pace.
+    step = max_words - min(overlap_words, max_words // 2)
+
+    words = deque()
+    yielded = pending = False
+    for match in GLINER_WORD_PATTERN.finditer(text):
+        words.append(match.span())
+        pending = True
+        if len(words) == max_words:
+            start, end = words[0][0], words[-1][1]
+            yield start, text[start:end]
+            yielded, pending = True, False
+            for _ in range(step):
+                words.popleft()
+
+    if not yielded:
+        # A text that fits in one window is passed whole.
+        yield 0, text
+    elif pending:
+        start, end = words[0][0], words[-1][1]
+        yield start, text[start:end]
+
+
+def merge_spans(spans):
+    """
+    Merges the entities predicted on overlapping windows into one list of non-overlapping spans.
+
+    The same answer found in two windows is kept once, and of two overlapping spans the one with the
+    highest score is kept.
+
+    Args:
+        spans (list): The predicted entities, each a dictionary with "start", "end" and "score", whose
+                      offsets are relative to the source text.
+
+    Returns:
+        list: The kept entities, ordered by their position in the source text.
+    """
+
+    kept = []
+    for span in sorted(spans, key=lambda x: (-x["score"], x["start"], x["end"])):
+        if all(span["end"] <= other["start"] or span["start"] >= other["end"] for other in kept):
+            kept.append(span)
+    return sorted(kept, key=lambda x: (x["start"], x["end"]))
@@ -0,0 +1,22 @@
+import pytest
+
+from src.Extraction_engine import ExtractionEngine
+from src.utils.extraction_plan import ExtractionPlan
+
+
+def test_default_model_is_valid():
+    assert ExtractionEngine.validate_extraction_model(ExtractionEngine.init_extraction_model()) == []
+
+
+@pytest.mark.parametrize("extraction_model", [
+    {},
+    {"booking_details": {}},
+    {"booking_details": {"booking_number": "text"}},
+    {"booking_details": {"references": {"booking_number": "text"}}},
+    {"shipment_route": {"transit_ports": [{"port_name": {}}, {"eta": {}}]}},
+    {"shipment_route": {"transit_ports": [{"port_name": []}]}},
+])
+def test_invalid_models_are_rejected(extraction_model):
+    with pytest.raises(ValueError):
+        ExtractionPlan(extraction_model)
+    assert len(ExtractionEngine.validate_extraction_model(extraction_model)) == 1
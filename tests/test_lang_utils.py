@@ -0,0 +1,28 @@
+from src.utils.lang_utils import build_label_phrases, english_score, needs_translation
+from src.utils.section_utils import strip_terms
+
+EXTRACTION_MODEL = {"booking_details": {"booking_number": {}, "service_contract_number": {}},
+                    "cargo_information": {"cargo_type": {}, "total_weight": {}}}
+
+
+def test_place_names_are_not_foreign():
+    text = "Port of Loading: Le Havre\nPort of Discharge: Los Angeles\nVia: La Spezia"
+    assert english_score(text) == 1.0
+
+
+def test_label_pages_are_english():
+    labels = build_label_phrases(EXTRACTION_MODEL)
+    page = "Booking Details\nBooking Number: BK123\nService Contract: SC1\nCargo Type: General\nTotal Weight: 1 KG"
+    assert english_score(page) is None
+    assert not needs_translation(page, label_phrases=labels)
+
+
+def test_foreign_label_pages_need_translation():
+    labels = build_label_phrases(EXTRACTION_MODEL)
+    assert needs_translation("Buchungsnummer: BK123\nSchiff: MSC X\nVersender: ACME GmbH", label_phrases=labels)
+
+
+def test_strip_terms():
+    page = "Shipper: ACME\nTerms and Conditions (1)\n1. The carrier shall not be liable."
+    assert strip_terms(page) == "Shipper: ACME"
+    assert strip_terms("Shipper: ACME") == "Shipper: ACME"
@@ -0,0 +1,53 @@
+import threading
+
+import pytest
+
+from src.ner_server import MicroBatcher
+
+
+class EchoModel:
+    def batch_predict_entities(self, texts, labels):
+        return [[{"text": text, "label": labels[0]}] for text in texts]
+
+
+class BlockedModel:
+    def __init__(self):
+        self.release = threading.Event()
+
+    def batch_predict_entities(self, texts, labels):
+        self.release.wait()
+        return [[] for _ in texts]
+
+
+class CrashingBatcher(MicroBatcher):
+    def _collect(self, first):
+        raise RuntimeError("worker crashed")
+
+
+def test_submit():
+    batcher = MicroBatcher([EchoModel()], max_batch_size=4, max_wait=0.001, timeout=5)
+    try:
+        assert batcher.submit(["a", "b"], ["answer"]) == [[{"text": "a", "label": "answer"}],
+                                                          [{"text": "b", "label": "answer"}]]
+    finally:
+        batcher.close()
+
+
+def test_submit_times_out():
+    model = BlockedModel()
+    batcher = MicroBatcher([model], max_batch_size=1, max_wait=0.001, timeout=0.05)
+    try:
+        with pytest.raises(TimeoutError):
+            batcher.submit(["a", "b"], ["answer"])
+    finally:
+        model.release.set()
+        batcher.close()
+
+
+def test_pending_callers_fail_when_the_worker_stops():
+    batcher = CrashingBatcher([EchoModel()], max_batch_size=4, max_wait=0.001, timeout=5)
+    with pytest.raises(RuntimeError, match="worker crashed"):
+        batcher.submit(["a", "b", "c"], ["answer"])
+    with pytest.raises(RuntimeError, match="has stopped"):
+        batcher.submit(["d"], ["answer"])
+    batcher.close()
@@ -0,0 +1,20 @@
+import pytest
+
+from src.utils.pattern_utils import extract_total_weight, parse_amount
+
+
+@pytest.mark.parametrize("text, kilograms", [
+    ("Gross Weight: 24.500 MT", 24500.0),
+    ("Total weight: 1.234 t", 1234.0),
+    ("Gross Weight: 24,500 kg", 24500.0),
+    ("Gross Weight: 12.500,50 KGS", 12500.5),
+    ("Total weight: 24 tonnes", 24000.0),
+])
+def test_total_weight(text, kilograms):
+    assert extract_total_weight(text)["normalized"] == {"amount": kilograms, "unit": "kg"}
+
+
+def test_parse_amount_lone_separator():
+    assert parse_amount("24.500") == 24500.0
+    assert parse_amount("24.500", lone_separator_is_decimal=True) == 24.5
+    assert parse_amount("1,234.5", lone_separator_is_decimal=True) == 1234.5
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from src.config import ConfigUtility
+from src.Extraction_engine import ExtractionEngine
+
+
+class FailingEngine(ExtractionEngine):
+    def iter_pages(self, pdf_path, pdf_hash=None, pages=None):
+        return iter(["Booking Number: BK123"])
+
+    async def process_page_async(self, page):
+        return {section: page for section in self.plan.sections}
+
+    async def find_list_field_async(self, question, entire_text):
+        self.list_started += 1
+        try:
+            await asyncio.sleep(60)
+        except asyncio.CancelledError:
+            self.list_cancelled += 1
+            raise
+
+    def predict_sections(self, agg_sections):
+        raise RuntimeError("NER failed")
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(ConfigUtility, "RESULT_CACHE_ENABLED", False)
+    engine = FailingEngine()
+    engine.list_started = engine.list_cancelled = 0
+    return engine
+
+
+def test_list_tasks_are_cancelled_when_ner_fails(engine):
+    assert asyncio.run(engine.process_pdf_async("document.pdf")) is None
+    assert engine.list_started == engine.list_cancelled == len(engine.plan.list_fields)
+
+
+def test_raise_errors(engine):
+    with pytest.raises(RuntimeError, match="NER failed"):
+        asyncio.run(engine.process_pdf_async("document.pdf", raise_errors=True))
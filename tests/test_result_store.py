@@ -0,0 +1,79 @@
+from src.config import ConfigUtility
+from src.Extraction_engine import ExtractionEngine
+from src.utils import cache_utils
+
+
+class FakeGraph:
+    def __init__(self, doc):
+        self.doc = doc
+
+    def run(self, **inputs):
+        return {"document": self.doc}
+
+
+def make_engine(doc):
+    engine = ExtractionEngine()
+    engine.runs = 0
+
+    def build_task_graph():
+        engine.runs += 1
+        return FakeGraph(doc)
+
+    engine.build_task_graph = build_task_graph
+    return engine
+
+
+def complete_document(engine):
+    doc = {section: {} for section in engine.plan.sections}
+    for field in engine.plan.list_fields:
+        doc[field.path[0]][field.path[1]] = []
+    return doc
+
+
+def use_store(monkeypatch, tmp_path):
+    monkeypatch.setattr(ConfigUtility, "RESULT_CACHE_ENABLED", True)
+    monkeypatch.setattr(ConfigUtility, "RESULT_CACHE_PATH", str(tmp_path / "results.sqlite"))
+    monkeypatch.setattr(ConfigUtility, "METRICS_IN_OUTPUT", False)
+    monkeypatch.setattr(cache_utils, "_get_per_process", lambda name, factory: factory())
+    pdf_path = tmp_path / "document.pdf"
+    pdf_path.write_bytes(b"%PDF-1.4 test")
+    return str(pdf_path)
+
+
+def test_failed_list_field_is_not_stored(monkeypatch, tmp_path):
+    pdf_path = use_store(monkeypatch, tmp_path)
+    engine = make_engine(None)
+    doc = complete_document(engine)
+    field = engine.plan.list_fields[0]
+    doc[field.path[0]][field.path[1]] = None
+    engine = make_engine(doc)
+
+    engine.process_pdf(pdf_path, raise_errors=True)
+    engine.process_pdf(pdf_path, raise_errors=True)
+
+    assert engine.runs == 2
+
+
+def test_failed_section_is_not_stored(monkeypatch, tmp_path):
+    pdf_path = use_store(monkeypatch, tmp_path)
+    engine = make_engine(None)
+    doc = complete_document(engine)
+    doc[engine.plan.sections[0]] = None
+    engine = make_engine(doc)
+
+    engine.process_pdf(pdf_path, raise_errors=True)
+    engine.process_pdf(pdf_path, raise_errors=True)
+
+    assert engine.runs == 2
+
+
+def test_complete_result_is_stored(monkeypatch, tmp_path):
+    pdf_path = use_store(monkeypatch, tmp_path)
+    engine = make_engine(None)
+    engine = make_engine(complete_document(engine))
+
+    first = engine.process_pdf(pdf_path, raise_errors=True)
+    second = engine.process_pdf(pdf_path, raise_errors=True)
+
+    assert engine.runs == 1
+    assert first == second
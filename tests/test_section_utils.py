@@ -0,0 +1,12 @@
+from src.utils.section_utils import split_sections
+
+EXTRACTION_MODEL = {"booking_details": {"booking_number": {}},
+                    "parties_information": {"shipper": {"name": {}, "contact_details": {}}}}
+
+
+def test_terms_are_not_assigned_to_a_section():
+    page = ("Booking Details\nBooking Number: BK123\nParties\nShipper: ACME Ltd\n"
+            "Terms and Conditions\n1. The carrier shall not be liable for any loss.")
+    sections, _ = split_sections(page, EXTRACTION_MODEL)
+    assert sections["parties_information"] == "Parties\nShipper: ACME Ltd"
+    assert "liable" not in "\n".join(sections.values())